@@ -1,91 +1,273 @@
-from flask import Flask, jsonify, request
+"""
+The Flask backend of the checkbox viewer.
+
+create_app builds the application, importing this module sets nothing up.
+The translation client comes from translation_clients and only imports and
+configures Gemini on the first translation; without GEMINI_API_KEY the server
+runs offline with translation disabled. numpy is only imported by the first
+check of an attribute constraint.
+"""
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from xml.etree.ElementTree import ParseError
-from xml_parser import load_and_parse_xml, parse_constraints
-import google.generativeai as genai
-import os
+from xml_parser import load_and_parse_xml_string, parse_constraints
+from model_registry import ModelRegistry
+from incremental_validator import ModelError, ValidationSessions
+from model_diff import compare_models
+from tree_serializer import iter_tree_response
+from translation_clients import TranslationUnavailable, create_translation_client
 from dotenv import load_dotenv
-load_dotenv()
-
-genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-app = Flask(__name__)
-CORS(app, origins="http://localhost:3000")
-model = genai.GenerativeModel('gemini-1.5-flash')
-
-
-@app.after_request
-def add_cors_headers(response):
-    response.headers['Access-Control-Allow-Origin'] = 'http://localhost:3000'
-    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
-    return response
-
-@app.route('/parse-xml', methods=['POST'])
-def parse_xml():
-    try:
-        # Get the XML data from the request
-        xml_data = request.json.get("xml")
-        temp_file = "feature_model_temp.xml"
-
-        # Write XML to a temporary file for parsing
-        with open(temp_file, "w") as file:
-            file.write(xml_data)
-
-        # Parse the XML and constraints
-        root, root_feature = load_and_parse_xml(temp_file)
-        constraints = parse_constraints(root)
-
-        def feature_to_dict(feature):
-            """
-            Convert the Feature object to a dictionary for serialization.
-            """
-            return {
-                "label": feature.name,
-                "value": feature.name,
-                "groupType": feature.group_type,
-                "mandatory": feature.mandatory,
-                "children": [feature_to_dict(child) for child in feature.children]
+
+# Seconds the diagnosis of an invalid configuration may spend minimizing its answer
+DIAGNOSIS_TIME_BUDGET = 1.0
+
+
+def create_app(translation_client=None, models=None, sessions=None):
+    """
+    Creates the Flask application with its own model registry.
+
+    Args:
+        translation_client: An object with translate(prompt) -> str; chosen by
+                            create_translation_client from the environment if None.
+        models (ModelRegistry): The registry of parsed models, a new one if None.
+        sessions (ValidationSessions): The incremental validators of the clients, a new one if None.
+
+    Returns:
+        Flask: The application.
+    """
+    load_dotenv()
+    if translation_client is None:
+        translation_client = create_translation_client()
+    if models is None:
+        models = ModelRegistry()
+    if sessions is None:
+        sessions = ValidationSessions()
+
+    app = Flask(__name__)
+    CORS(app, origins="http://localhost:3000")
+    app.extensions["model_registry"] = models
+    app.extensions["translation_client"] = translation_client
+    app.extensions["validation_sessions"] = sessions
+
+    @app.after_request
+    def add_cors_headers(response):
+        response.headers['Access-Control-Allow-Origin'] = 'http://localhost:3000'
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+        return response
+
+    @app.route('/parse-xml', methods=['POST'])
+    def parse_xml():
+        try:
+            # Get the XML data from the request
+            xml_data = request.json.get("xml")
+            model_id = request.json.get("modelId")
+            base_version = request.json.get("baseVersion")
+            depth = request.json.get("depth")
+            # Like /subtree, a negative depth means the whole tree
+            if depth is not None and (not isinstance(depth, int) or isinstance(depth, bool)):
+                return jsonify({"error": "'depth' must be an integer"}), 400
+            if depth is not None and depth < 0:
+                depth = None
+            encoding = request.json.get("encoding", "nested")
+            if encoding not in ("nested", "flat"):
+                return jsonify({"error": f"Unknown tree encoding '{encoding}'"}), 400
+
+            # Parse the XML and constraints in memory, concurrent requests share no files
+            root, root_feature = load_and_parse_xml_string(xml_data)
+            constraints = parse_constraints(root, interactive=False)
+
+            # Store the model as a new version so later edits can be sent as a diff
+            parsed = models.register(root_feature, constraints, model_id=model_id)
+
+            response = {
+                "modelId": parsed.model_id,
+                "version": parsed.version,
+                "constraints": constraints
             }
+            diff = None
+            if parsed.model_id == model_id and base_version is not None:
+                diff = models.diff(parsed.model_id, base_version, parsed.version)
+            if diff is not None:
+                response["diff"] = diff
+                return jsonify(response)
 
-        # Convert the root feature to a dictionary
-        feature_model = feature_to_dict(root_feature)
+            # Unknown or evicted base version, fall back to the full tree. It is
+            # streamed as it is serialized instead of being built as one dictionary.
+            return Response(iter_tree_response(response, root_feature, depth, encoding),
+                            mimetype="application/json")
 
-        return jsonify({
-            "treeData": feature_model,
-            "constraints": constraints
-        })
+        except ParseError as e:
+            return jsonify({"error": "Invalid XML file", "details": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
-    except ParseError as e:
-        return jsonify({"error": "Invalid XML file", "details": str(e)}), 400
-    except Exception as e:
-        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
-    
 
-@app.route('/validate-configuration', methods=['POST'])
-def validate_configuration():
-    data = request.json
+    @app.route('/models/<model_id>/diff', methods=['GET'])
+    def model_diff(model_id):
+        diff = models.diff(model_id, request.args.get("from", type=int), request.args.get("to", type=int))
+        if diff is None:
+            return jsonify({"error": "Unknown model or version"}), 404
+        return jsonify(diff)
 
-    # Extract the fields from the incoming JSON
-    mandatory_nodes = data.get("mandatory")
-    or_groups = data.get("or")
-    xor_groups = data.get("xor")
-    and_groups = data.get("and")
-    selected_nodes = data.get("selected")
-    
-    # Print the data for debugging
-    print("Mandatory Nodes:", mandatory_nodes)
-    print("OR Groups:", or_groups)
-    print("XOR Groups:", xor_groups)
-    print("AND Groups:", and_groups)
-    print("Selected Nodes:", selected_nodes)
-    # print("x")
-
-    validation_result = validate_tree_configuration(mandatory_nodes, or_groups, xor_groups, and_groups, selected_nodes)
-    
-    pass
 
-    return jsonify(validation_result)
-    # return jsonify({"isValid": True, "messages": []})
+    @app.route('/compare-models', methods=['POST'])
+    def compare_model_versions():
+        # Compares either two stored versions ({modelId, fromVersion, toVersion})
+        # or two XML documents ({oldXml, newXml})
+        data = request.json
+        examples = data.get("examples", 5)
+        if not isinstance(examples, int) or isinstance(examples, bool) or examples < 0:
+            return jsonify({"error": "'examples' must be a non-negative integer"}), 400
+        try:
+            if data.get("modelId"):
+                old = models.get(data["modelId"], data.get("fromVersion"))
+                new = models.get(data["modelId"], data.get("toVersion"))
+                if old is None or new is None:
+                    return jsonify({"error": "Unknown model or version"}), 404
+                old_root, old_constraints = old.root, old.constraints
+                new_root, new_constraints = new.root, new.constraints
+            else:
+                old_xml, old_root = load_and_parse_xml_string(data.get("oldXml"))
+                new_xml, new_root = load_and_parse_xml_string(data.get("newXml"))
+                old_constraints = parse_constraints(old_xml, interactive=False)
+                new_constraints = parse_constraints(new_xml, interactive=False)
+            return jsonify(compare_models(old_root, old_constraints, new_root, new_constraints, examples))
+
+        except ParseError as e:
+            return jsonify({"error": "Invalid XML file", "details": str(e)}), 400
+        except ValueError as e:
+            # Unparsable or attribute constraints cannot be compared
+            return jsonify({"error": "The models cannot be compared", "details": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+    @app.route('/subtree/<model_id>/<node_id>', methods=['GET'])
+    def subtree(model_id, node_id):
+        # Children are fetched on demand, one level at a time unless asked otherwise
+        depth = request.args.get("depth", default=1, type=int)
+        if depth < 0:
+            depth = None
+        encoding = request.args.get("encoding", default="nested")
+        if encoding not in ("nested", "flat"):
+            return jsonify({"error": f"Unknown tree encoding '{encoding}'"}), 400
+        parsed = models.get(model_id, request.args.get("version", type=int))
+        if parsed is None or node_id not in parsed.nodes:
+            return jsonify({"error": "Unknown model, version or node"}), 404
+        fields = {
+            "modelId": parsed.model_id,
+            "version": parsed.version,
+            "parentId": parsed.parents[node_id]
+        }
+        return Response(iter_tree_response(fields, parsed.nodes[node_id], depth, encoding),
+                        mimetype="application/json")
+
+
+    @app.route('/validate-configuration', methods=['POST'])
+    def validate_configuration():
+        data = request.json
+
+        # Extract the fields from the incoming JSON
+        mandatory_nodes = data.get("mandatory")
+        or_groups = data.get("or")
+        xor_groups = data.get("xor")
+        and_groups = data.get("and")
+        selected_nodes = data.get("selected")
+
+        # Print the data for debugging
+        print("Mandatory Nodes:", mandatory_nodes)
+        print("OR Groups:", or_groups)
+        print("XOR Groups:", xor_groups)
+        print("AND Groups:", and_groups)
+        print("Selected Nodes:", selected_nodes)
+        # print("x")
+
+        validation_result = validate_tree_configuration(mandatory_nodes, or_groups, xor_groups, and_groups, selected_nodes)
+
+        # With the stored model, explain the configuration including its cross-tree constraints
+        parsed = models.get(data.get("modelId"), data.get("version")) if data.get("modelId") else None
+        if parsed is not None and data.get("checked") is not None:
+            try:
+                diagnosis = parsed.diagnose(data.get("checked"), DIAGNOSIS_TIME_BUDGET)
+                evaluator = parsed.attribute_evaluator()
+            except ValueError as e:
+                # The stored constraints are broken whatever the selection, as in /toggle-feature
+                return jsonify({"error": "The model constraints cannot be checked", "details": str(e),
+                                "modelError": True}), 422
+            if diagnosis is not None:
+                validation_result["isValid"] = False
+                validation_result["messages"].extend(item["message"] for item in diagnosis["conflict"])
+                validation_result["diagnosis"] = diagnosis
+
+            # Aggregates over feature attributes are checked directly on the selection
+            if evaluator is not None:
+                for text in evaluator.violated(set(data.get("checked"))):
+                    validation_result["isValid"] = False
+                    validation_result["messages"].append(f"Attribute constraint violated: {text}")
+
+        return jsonify(validation_result)
+        # return jsonify({"isValid": True, "messages": []})
+
+    @app.route('/toggle-feature', methods=['POST'])
+    def toggle_feature():
+        # Revalidates after a click from the features that changed ({sessionId, changes}),
+        # or starts a session from the whole selection ({modelId, version, checked})
+        data = request.json
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object"}), 400
+        changes = data.get("changes") or {}
+        if not isinstance(changes, dict) or not all(isinstance(value, bool) for value in changes.values()):
+            return jsonify({"error": "'changes' must map feature names to true or false"}), 400
+        changes = dict(changes)
+        if data.get("feature") is not None:
+            if not isinstance(data["feature"], str) or not isinstance(data.get("selected", True), bool):
+                return jsonify({"error": "'feature' must be a name and 'selected' true or false"}), 400
+            changes[data["feature"]] = data.get("selected", True)
+        checked = data.get("checked")
+        if checked is not None and (not isinstance(checked, list)
+                                    or not all(isinstance(name, str) for name in checked)):
+            return jsonify({"error": "'checked' must be a list of feature names"}), 400
+
+        session = sessions.get(data["sessionId"]) if data.get("sessionId") else None
+        if session is not None and data.get("modelId") and (
+                session.model_id != data["modelId"] or session.version != data.get("version", session.version)):
+            session = None
+        try:
+            if checked is not None:
+                parsed = models.get(data.get("modelId"), data.get("version"))
+                if parsed is None:
+                    return jsonify({"error": "Unknown model or version"}), 404
+                session = sessions.start(parsed, checked)
+            elif session is None:
+                return jsonify({"error": "Unknown validation session, send the whole selection as 'checked'"}), 404
+            with session.lock:
+                session.validator.update(changes)
+                result = session.validator.result()
+        except ModelError as e:
+            # Retrying cannot help until the model is fixed, the viewer stops asking
+            return jsonify({"error": "The model constraints cannot be checked", "details": str(e),
+                            "modelError": True}), 422
+        except ValueError as e:
+            return jsonify({"error": "Invalid selection", "details": str(e)}), 400
+        result["sessionId"] = session.session_id
+        return jsonify(result)
+
+    @app.route('/translate', methods=['POST'])
+    def translate():
+        try:
+            data = request.get_json()
+            prompt = data.get('prompt')
+            translate_prompt = f"Translate \"{prompt}\" from English to Propositional Logic. An example: . Make sure to not include any styles in the text, and add new line tags where needed as the response will be shown on another webpage."
+            return jsonify(translation_client.translate(translate_prompt)), 200
+        except TranslationUnavailable as err:
+            return jsonify({"error": f"Translation is not available: {err}"}), 503
+        except Exception as err:
+            print(f"Error translating: {err}")
+            return jsonify({"error": "Error translating from English to Propositional Logic. Please check logs for details."}), 500
+
+    return app
+
 
 def validate_tree_configuration(mandatory_nodes, or_groups, xor_groups, and_groups, selected_nodes):
     
@@ -131,21 +313,9 @@ def validate_tree_configuration(mandatory_nodes, or_groups, xor_groups, and_grou
     return result
 
 
-@app.route('/translate', methods=['POST'])
-def translate():
-    try:
-        data = request.get_json()
-        prompt = data.get('prompt')
-        translate_prompt = f"Translate \"{prompt}\" from English to Propositional Logic. An example: . Make sure to not include any styles in the text, and add new line tags where needed as the response will be shown on another webpage."
-        translate = model.generate_content(translate_prompt)
-        print(translate.prompt_feedback)
-        return jsonify(translate.text), 200
-    except Exception as err:
-        print(f"Error translating: {err}")
-        return jsonify({"error": "Error translating from English to Propositional Logic. Please check logs for details."}), 500
-
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Development server only, see wsgi.py for the production entry point
+    create_app().run(debug=True)
 
 
 
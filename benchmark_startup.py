@@ -0,0 +1,85 @@
+"""
+Benchmarks how fast a backend worker gets from a cold start to its first answer.
+
+Every run starts a fresh interpreter, as a new gunicorn worker would, and
+times three steps: importing backend, create_app(), and the first
+/parse-xml request through the Flask test client. It also reports whether
+the heavy optional modules (google.generativeai, numpy) were loaded by then;
+with the lazy setup neither is needed before the first translation or the
+first attribute constraint.
+
+Usage:
+    python benchmark_startup.py --runs 10
+    python benchmark_startup.py --client gemini --translate
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Runs in the fresh interpreter and prints the timings as JSON
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import backend
+imported = time.perf_counter()
+app = backend.create_app()
+created = time.perf_counter()
+client = app.test_client()
+xml = '<featureModel><feature name="Root"><feature name="A" mandatory="true"/><feature name="B"/></feature></featureModel>'
+response = client.post("/parse-xml", json={"xml": xml})
+answered = time.perf_counter()
+result = {"import": imported - start, "create_app": created - imported, "first_request": answered - created,
+          "status": response.status_code}
+if TRANSLATE:
+    response = client.post("/translate", json={"prompt": "A requires B"})
+    result["first_translation"] = time.perf_counter() - answered
+    result["translate_status"] = response.status_code
+result["modules"] = {name: name in sys.modules for name in ("google.generativeai", "numpy")}
+print(json.dumps(result))
+"""
+
+
+def run_once(client, translate):
+    """
+    Starts one interpreter and returns its timings.
+    """
+    env = dict(os.environ)
+    if client:
+        env["FM_TRANSLATION_CLIENT"] = client
+    code = CHILD.replace("TRANSLATE", repr(translate))
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if output.returncode != 0:
+        raise RuntimeError(f"The backend failed to start:\n{output.stderr}")
+    # The last line is the JSON, anything before it is the backend's own output
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of the backend.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to time")
+    parser.add_argument("--client", choices=("gemini", "static", "disabled"),
+                        help="Translation client (default: from the environment)")
+    parser.add_argument("--translate", action="store_true", help="Also time the first /translate request")
+    args = parser.parse_args()
+
+    runs = [run_once(args.client, args.translate) for _ in range(args.runs)]
+    steps = ["import", "create_app", "first_request"] + (["first_translation"] if args.translate else [])
+    print(f"{'step':<20}{'median (ms)':>12}{'min (ms)':>10}{'max (ms)':>10}")
+    for step in steps:
+        values = [run[step] * 1000 for run in runs]
+        print(f"{step:<20}{statistics.median(values):>12.1f}{min(values):>10.1f}{max(values):>10.1f}")
+    total = [sum(run[step] for step in ("import", "create_app", "first_request")) * 1000 for run in runs]
+    print(f"{'import to answer':<20}{statistics.median(total):>12.1f}{min(total):>10.1f}{max(total):>10.1f}")
+    statuses = sorted({run["status"] for run in runs} | {run.get("translate_status") for run in runs} - {None})
+    print(f"\nHTTP status codes: {', '.join(map(str, statuses))}")
+    for name in runs[0]["modules"]:
+        loaded = sum(run["modules"][name] for run in runs)
+        print(f"{name} loaded in {loaded} of {len(runs)} runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmarks the tree traversals of the model pipeline on deep and wide models.
+
+Each pipeline step is timed on a chain of N nested features (depth N) and on a
+flat model with the same number of features (depth 1). With the iterative
+traversals both shapes cost about the same per node, and chains far deeper
+than Python's recursion limit are handled. print_feature_hierarchy is the
+exception: its indentation makes the printed text itself grow with depth.
+
+Usage:
+    python benchmark_traversal.py --size 10000
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+from cross_tree_handler import extract_feature_name
+from feature_model import print_feature_hierarchy
+from logic_translator import translate_to_logic
+from main import get_mandatory_features
+from tree_serializer import feature_to_dict, iter_flat_json, iter_nested_json
+from xml_parser import load_and_parse_xml_string
+
+
+def chain_xml(size):
+    """
+    Builds a model where every feature is the only child of the previous one.
+    """
+    opening = "".join(f'<feature name="F{i}" mandatory="{str(i % 2 == 0).lower()}">' for i in range(size))
+    return f"<featureModel>{opening}{'</feature>' * size}</featureModel>"
+
+
+def flat_xml(size):
+    """
+    Builds a model where every feature is a child of the root.
+    """
+    children = "".join(f'<feature name="F{i}" mandatory="{str(i % 2 == 0).lower()}"/>' for i in range(1, size))
+    return f'<featureModel><feature name="F0">{children}</feature></featureModel>'
+
+
+def pipeline_steps():
+    """
+    Returns the (name, function) pairs to time; each function takes the parsed root feature.
+    """
+    steps = [
+        ("extract_feature_name", extract_feature_name),
+        ("translate_to_logic", translate_to_logic),
+        ("print_feature_hierarchy", print_feature_hierarchy),
+        ("get_mandatory_features", get_mandatory_features),
+        ("feature_to_dict", feature_to_dict),
+        ("iter_nested_json", lambda root: sum(map(len, iter_nested_json(root)))),
+        ("iter_flat_json", lambda root: sum(map(len, iter_flat_json(root)))),
+    ]
+    return steps
+
+
+def timed(function, *args):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        function(*args)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tree traversals on deep models.")
+    parser.add_argument("--size", type=int, default=10000, help="Number of features in each model")
+    args = parser.parse_args()
+
+    print(f"Recursion limit: {sys.getrecursionlimit()}, model size: {args.size} features\n")
+    shapes = {"chain": chain_xml(args.size), "flat": flat_xml(args.size)}
+
+    results = {}
+    roots = {}
+    for shape, xml in shapes.items():
+        results[("load_and_parse_xml_string", shape)] = timed(load_and_parse_xml_string, xml)
+        roots[shape] = load_and_parse_xml_string(xml)[1]
+
+    names = ["load_and_parse_xml_string"]
+    for name, function in pipeline_steps():
+        names.append(name)
+        for shape, root in roots.items():
+            results[(name, shape)] = timed(function, root)
+
+    print(f"{'step':<28}{'chain (ms)':>12}{'flat (ms)':>12}{'ratio':>8}")
+    for name in names:
+        chain, flat = results[(name, "chain")], results[(name, "flat")]
+        print(f"{name:<28}{chain * 1000:>12.1f}{flat * 1000:>12.1f}{chain / flat:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+import operator
+import re
+
+# Operators accepted in cross-tree constraints, in both ASCII and logic notation
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<iff><->|<=>|↔)
+      | (?P<implies>->|=>|→)
+      | (?P<compare><=|>=|==|!=|<|>|=|≤|≥|≠)
+      | (?P<or>\|\||\||∨)
+      | (?P<and>&&|&|∧)
+      | (?P<not>!|~|¬)
+      | (?P<lparen>\()
+      | (?P<rparen>\))
+      | (?P<number>-[0-9.]+)
+      | (?P<quoted>"[^"]*")
+      | (?P<name>[A-Za-z0-9_.]+(?:-(?!>)[A-Za-z0-9_.]+)*)
+    )""", re.VERBOSE)
+
+KEYWORDS = {"and": "and", "or": "or", "not": "not", "implies": "implies"}
+CONSTANTS = {"true": True, "false": False}
+
+# Aggregates over the attributes of the selected features, e.g. "sum(memory) <= 512"
+AGGREGATES = ("sum", "count")
+COMPARISONS = {"<=": "<=", ">=": ">=", "==": "==", "!=": "!=", "<": "<", ">": ">",
+               "=": "==", "≤": "<=", "≥": ">=", "≠": "!="}
+COMPARISON_OPERATORS = {"<=": operator.le, ">=": operator.ge, "==": operator.eq,
+                        "!=": operator.ne, "<": operator.lt, ">": operator.gt}
+
+
+def tokenize(text):
+    """
+    Splits a constraint into operator and name tokens.
+
+    Consecutive words are joined into one name, so multi-word feature names
+    produced by the English translation (e.g. "Basic Screen") stay intact.
+
+    Args:
+        text (str): The constraint in propositional logic.
+
+    Returns:
+        list: A list of (kind, value) tuples.
+    """
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Unexpected character {text[position]!r} in constraint '{text}'")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "quoted":
+            value = value[1:-1]  # A name with spaces, operators or keywords in it
+        if kind == "name" and value.lower() in KEYWORDS:
+            kind = KEYWORDS[value.lower()]
+        if kind == "name" and tokens and tokens[-1][0] == "name":
+            tokens[-1] = ("name", f"{tokens[-1][1]} {value}")
+        else:
+            tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser over the token list, lowest precedence first:
+    iff, implies (right associative), or, and, not. Aggregate comparisons are
+    atoms like feature names.
+    """
+    def __init__(self, tokens, text):
+        self.tokens = tokens
+        self.text = text
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][0]
+        return None
+
+    def take(self, kind):
+        if self.peek() != kind:
+            found = self.tokens[self.position][1] if self.peek() else "end of input"
+            raise ValueError(f"Expected {kind} but found {found!r} in constraint '{self.text}'")
+        self.position += 1
+        return self.tokens[self.position - 1][1]
+
+    def parse(self):
+        expression = self.parse_iff()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected {self.tokens[self.position][1]!r} in constraint '{self.text}'")
+        return expression
+
+    def parse_iff(self):
+        left = self.parse_implies()
+        while self.peek() == "iff":
+            self.take("iff")
+            left = ("iff", left, self.parse_implies())
+        return left
+
+    def parse_implies(self):
+        left = self.parse_or()
+        if self.peek() == "implies":
+            self.take("implies")
+            return ("implies", left, self.parse_implies())
+        return left
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.peek() == "or":
+            self.take("or")
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else ("or", operands)
+
+    def parse_and(self):
+        operands = [self.parse_not()]
+        while self.peek() == "and":
+            self.take("and")
+            operands.append(self.parse_not())
+        return operands[0] if len(operands) == 1 else ("and", operands)
+
+    def parse_not(self):
+        if self.peek() == "not":
+            self.take("not")
+            return ("not", self.parse_not())
+        if self.peek() == "lparen":
+            self.take("lparen")
+            expression = self.parse_iff()
+            self.take("rparen")
+            return expression
+        if self.peek() == "quoted":
+            return ("var", self.take("quoted"))
+        name = self.take("name")
+        if name.lower() in AGGREGATES and self.peek() == "lparen":
+            return self.parse_aggregate(name.lower())
+        if name.lower() in CONSTANTS:
+            return ("const", CONSTANTS[name.lower()])
+        return ("var", name)
+
+    def parse_aggregate(self, function):
+        self.take("lparen")
+        attribute = self.take("name") if self.peek() == "name" else None
+        self.take("rparen")
+        if (function == "sum") != (attribute is not None):
+            raise ValueError(f"{function}() takes {'one attribute' if function == 'sum' else 'no argument'} "
+                             f"in constraint '{self.text}'")
+        comparison = COMPARISONS[self.take("compare")]
+        # Negative bounds are their own token, positive ones read like names
+        bound = self.take("number" if self.peek() == "number" else "name")
+        try:
+            bound = float(bound)
+        except ValueError:
+            raise ValueError(f"Expected a number but found {bound!r} in constraint '{self.text}'")
+        return ("aggregate", function, attribute, comparison, bound)
+
+
+def parse_expression(text):
+    """
+    Parses a cross-tree constraint into an expression tree.
+
+    The tree is built from tuples: ("var", name), ("const", bool), ("not", e),
+    ("and", [e, ...]), ("or", [e, ...]), ("implies", a, b), ("iff", a, b) and
+    ("aggregate", function, attribute, comparison, bound) for comparisons like
+    "sum(memory) <= 512" or "count() > 3" over the selected features.
+
+    Args:
+        text (str): The constraint, e.g. "Java -> Memory" or "!Location | !Payment".
+
+    Returns:
+        tuple: The root of the expression tree.
+
+    Raises:
+        ValueError: If the constraint is not a valid propositional formula.
+    """
+    return _Parser(tokenize(text), text).parse()
+
+
+# Binding strength of each operator, used to put back only the parentheses that are needed
+PRECEDENCE = {"iff": 1, "implies": 2, "or": 3, "and": 4, "not": 5}
+SYMBOLS = {"iff": " <-> ", "implies": " -> ", "or": " | ", "and": " & "}
+NAME_PATTERN = re.compile(r"[A-Za-z0-9_.]+(?:-(?!>)[A-Za-z0-9_.]+)*")
+
+
+def format_name(name):
+    """
+    Writes a feature name so that parse_expression reads it back unchanged.
+
+    Names made of plain words are written as they are, anything else is quoted.
+
+    Raises:
+        ValueError: If the name contains a double quote, which cannot be written.
+    """
+    words = name.split(" ")
+    if all(NAME_PATTERN.fullmatch(word) and word.lower() not in KEYWORDS and word.lower() not in CONSTANTS
+           for word in words):
+        return name
+    if '"' in name:
+        raise ValueError(f"Feature name {name!r} contains a double quote and cannot be written in a constraint")
+    return f'"{name}"'
+
+
+def format_expression(expression, symbols=None, name_format=None):
+    """
+    Writes an expression tree back as constraint text in ASCII notation.
+
+    parse_expression(format_expression(e)) gives back the same tree, so this
+    is also how constraints are normalized when models are converted.
+
+    Args:
+        expression (tuple): An expression tree from parse_expression.
+        symbols (dict): Replacements for the binary operators, e.g. {"implies": " => "}.
+        name_format (callable): Writes a feature name, format_name by default.
+
+    Returns:
+        str: The constraint, e.g. "Java -> Memory & !Location".
+    """
+    symbols = dict(SYMBOLS, **(symbols or {}))
+    name_format = name_format or format_name
+    # Each entry is either a node to write or text to emit, the tree is walked without recursion
+    parts = []
+    stack = [(expression, 0)]
+    while stack:
+        node, outer = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            continue
+        kind = node[0]
+        if kind == "var":
+            parts.append(name_format(node[1]))
+            continue
+        if kind == "const":
+            parts.append("true" if node[1] else "false")
+            continue
+        if kind == "aggregate":
+            function, attribute, comparison, bound = node[1:]
+            bound = int(bound) if bound == int(bound) else bound
+            parts.append(f"{function}({attribute or ''}) {comparison} {bound}")
+            continue
+        precedence = PRECEDENCE[kind]
+        wrap = precedence <= outer
+        if kind == "not":
+            operands, separator = [node[1]], ""
+        elif kind in ("and", "or"):
+            operands, separator = node[1], symbols[kind]
+        else:
+            operands, separator = [node[1], node[2]], symbols[kind]
+        # Operands are wrapped when they bind at most as tightly as this operator, except
+        # where the grammar already groups them: !!A, A -> (B -> C) and (A <-> B) <-> C
+        inner = [precedence] * len(operands)
+        if kind == "not":
+            inner = [precedence - 1]
+        elif kind == "implies":
+            inner = [precedence, PRECEDENCE["iff"]]
+        elif kind == "iff":
+            inner = [0, precedence]
+        pending = [(")", None)] if wrap else []
+        for index in range(len(operands) - 1, -1, -1):
+            pending.append((operands[index], inner[index]))
+            if index > 0:
+                pending.append((separator, None))
+        if kind == "not":
+            pending.append(("!", None))
+        if wrap:
+            pending.append(("(", None))
+        stack.extend(pending)
+    return "".join(parts)
+
+
+def expression_variables(expression):
+    """
+    Collects the feature names used in an expression.
+
+    Args:
+        expression (tuple): An expression tree from parse_expression.
+
+    Returns:
+        set: The names of all variables in the expression.
+    """
+    names = set()
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        if node[0] == "var":
+            names.add(node[1])
+        elif node[0] == "not":
+            stack.append(node[1])
+        elif node[0] in ("and", "or"):
+            stack.extend(node[1])
+        elif node[0] in ("implies", "iff"):
+            stack.extend(node[1:])
+    return names
+
+
+def expression_aggregates(expression):
+    """
+    Collects the aggregate comparisons used in an expression.
+
+    Args:
+        expression (tuple): An expression tree from parse_expression.
+
+    Returns:
+        list: The ("aggregate", ...) nodes of the expression.
+    """
+    aggregates = []
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        if node[0] == "aggregate":
+            aggregates.append(node)
+        elif node[0] == "not":
+            stack.append(node[1])
+        elif node[0] in ("and", "or"):
+            stack.extend(node[1])
+        elif node[0] in ("implies", "iff"):
+            stack.extend(node[1:])
+    return aggregates
+
+
+def evaluate_expression(expression, selected, attributes=None):
+    """
+    Evaluates an expression for a set of selected features.
+
+    Args:
+        expression (tuple): An expression tree from parse_expression.
+        selected (set): The names of the selected features; all others are deselected.
+        attributes (AttributeTable): The feature attributes, needed for aggregate comparisons.
+
+    Returns:
+        bool: The truth value of the expression.
+    """
+    kind = expression[0]
+    if kind == "var":
+        return expression[1] in selected
+    if kind == "const":
+        return expression[1]
+    if kind == "aggregate":
+        if attributes is None:
+            raise ValueError("Aggregate constraints need the feature attributes to be evaluated.")
+        value = attributes.aggregate(expression[1], expression[2], selected)
+        return COMPARISON_OPERATORS[expression[3]](value, expression[4])
+    if kind == "not":
+        return not evaluate_expression(expression[1], selected, attributes)
+    if kind == "and":
+        return all(evaluate_expression(e, selected, attributes) for e in expression[1])
+    if kind == "or":
+        return any(evaluate_expression(e, selected, attributes) for e in expression[1])
+    if kind == "implies":
+        return (not evaluate_expression(expression[1], selected, attributes)
+                or evaluate_expression(expression[2], selected, attributes))
+    return evaluate_expression(expression[1], selected, attributes) == evaluate_expression(expression[2], selected, attributes)
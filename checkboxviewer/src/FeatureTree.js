@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from "react";
+import React, { useState, useEffect, useCallback, useRef } from "react";
 import styled from "styled-components";
 import { FontAwesomeIcon } from "@fortawesome/react-fontawesome";
 import {
@@ -92,6 +92,9 @@ const ExpandIconWrapper = styled.div`
     cursor: pointer;
 `;
 
+// Levels sent with the first response; deeper children are fetched when expanded
+const INITIAL_DEPTH = 2;
+
 const FeatureTree = () => {
     const [checked, setChecked] = useState([]);
     const [expanded, setExpanded] = useState([]);
@@ -101,6 +104,15 @@ const FeatureTree = () => {
     const [checkXOR, setCheckXOR] = useState(false);
     const [english, setEnglish] = useState(false);
     const [propositionalLogic, setPropositionalLogic] = useState(false);
+    // Flat copy of the server tree keyed by node id, used to apply diffs
+    const [model, setModel] = useState(null);
+    // Result of the incremental validation after the last click, and the
+    // backend session that keeps the selection of this model version
+    const [liveValidation, setLiveValidation] = useState(null);
+    const validationSession = useRef(null);
+    const pendingValidation = useRef(Promise.resolve());
+    // Model version whose constraints the backend cannot check, no use asking again
+    const invalidModel = useRef(null);
 
     const formatTreeData = useCallback((features) => {
         const processNode = (node, parent = null) => {
@@ -115,11 +127,13 @@ const FeatureTree = () => {
             }
 
             const formattedNode = {
+                id: node.id,
                 label: node.label,
                 value: node.value,
                 mandatory: node.mandatory || false,
                 groupType: type,
                 parent: parent,
+                childCount: node.childCount || 0,
             };
 
             if (node.children && node.children.length > 0) {
@@ -134,6 +148,110 @@ const FeatureTree = () => {
         return features.map(processNode);
     }, []);
 
+    // Flatten the nested treeData sent by the backend into a node map.
+    // Nodes cut off by the depth limit keep their childCount but no childIds yet.
+    const flattenTree = (root, rootParentId = null) => {
+        const nodes = {};
+        const stack = [[root, rootParentId]];
+        while (stack.length > 0) {
+            const [node, parentId] = stack.pop();
+            const children = node.children;
+            nodes[node.id] = {
+                id: node.id,
+                label: node.label,
+                value: node.value,
+                groupType: node.groupType,
+                mandatory: node.mandatory,
+                parentId: parentId,
+                childCount: node.childCount,
+                childIds: children ? children.map((child) => child.id) : null,
+            };
+            (children || []).forEach((child) => stack.push([child, node.id]));
+        }
+        return nodes;
+    };
+
+    // Decode the compact flat encoding (one row per node in pre-order, with the
+    // row index of its parent) into the same node map as flattenTree.
+    const decodeFlatTree = (flat, rootParentId = null) => {
+        const column = {};
+        flat.fields.forEach((field, index) => (column[field] = index));
+        const ids = flat.nodes.map((row) => row[column.id]);
+        const nodes = {};
+        flat.nodes.forEach((row) => {
+            const parentRow = row[column.parent];
+            nodes[row[column.id]] = {
+                id: row[column.id],
+                label: row[column.label],
+                value: row[column.label],
+                groupType: row[column.groupType],
+                mandatory: row[column.mandatory],
+                parentId: parentRow < 0 ? rootParentId : ids[parentRow],
+                childCount: row[column.childCount],
+                childIds: [],
+            };
+            if (parentRow >= 0) nodes[ids[parentRow]].childIds.push(row[column.id]);
+        });
+        // Nodes cut off by the depth limit have no child rows yet
+        Object.values(nodes).forEach((node) => {
+            if (node.childIds.length < node.childCount) node.childIds = null;
+        });
+        return nodes;
+    };
+
+    // Apply an added/changed/removed diff to a node map without touching the rest
+    const applyDiff = (nodes, diff) => {
+        const updated = { ...nodes };
+        diff.removed.forEach((id) => delete updated[id]);
+        diff.added.forEach((node) => (updated[node.id] = node));
+        diff.changed.forEach((node) => (updated[node.id] = node));
+        return updated;
+    };
+
+    // Rebuild the nested tree the renderer expects from a node map.
+    // Children are only attached once all of them have been fetched.
+    const buildTree = (nodes, id) => {
+        const node = nodes[id];
+        const childIds = node.childIds;
+        const loaded = childIds && childIds.every((childId) => nodes[childId]);
+        return {
+            id: node.id,
+            label: node.label,
+            value: node.value,
+            groupType: node.groupType,
+            mandatory: node.mandatory,
+            childCount: childIds ? childIds.length : node.childCount,
+            children: loaded ? childIds.map((childId) => buildTree(nodes, childId)) : undefined,
+        };
+    };
+
+    const showModel = (nextModel) => {
+        // A new version needs a new validation session
+        if (!model || model.modelId !== nextModel.modelId || model.version !== nextModel.version) {
+            validationSession.current = null;
+            setLiveValidation(null);
+        }
+        setModel(nextModel);
+        setTreeData(formatTreeData([buildTree(nextModel.nodes, nextModel.rootId)]));
+    };
+
+    // Fetch the children of a node that was cut off by the depth limit
+    const loadChildren = (node) => {
+        const url = `http://127.0.0.1:5000/subtree/${model.modelId}/${node.id}?version=${model.version}&depth=1&encoding=flat`;
+        fetch(url)
+            .then((response) => {
+                if (!response.ok) {
+                    throw new Error(`Error fetching subtree: ${response.statusText}`);
+                }
+                return response.json();
+            })
+            .then((data) => {
+                const subtreeNodes = decodeFlatTree(data.flatTree, data.parentId);
+                showModel({ ...model, nodes: { ...model.nodes, ...subtreeNodes } });
+            })
+            .catch((err) => setError(`Failed to load children: ${err.message}`));
+    };
+
     const handleFileUpload = (event) => {
         const file = event.target.files[0];
         if (!file) return;
@@ -142,12 +260,19 @@ const FeatureTree = () => {
         reader.onload = (e) => {
             const xmlContent = e.target.result;
 
+            // Send the version we already have so the backend can answer with a diff
+            const body = { xml: xmlContent, depth: INITIAL_DEPTH, encoding: "flat" };
+            if (model) {
+                body.modelId = model.modelId;
+                body.baseVersion = model.version;
+            }
+
             fetch("http://127.0.0.1:5000/parse-xml", {
                 method: "POST",
                 headers: {
                     "Content-Type": "application/json",
                 },
-                body: JSON.stringify({ xml: xmlContent }),
+                body: JSON.stringify(body),
             })
                 .then((response) => {
                     if (!response.ok) {
@@ -156,14 +281,24 @@ const FeatureTree = () => {
                     return response.json();
                 })
                 .then((data) => {
-                    if (!data.treeData || typeof data.treeData !== "object" || !data.treeData.children) {
+                    let nodes;
+                    let rootId;
+                    if (data.diff && model) {
+                        nodes = applyDiff(model.nodes, data.diff);
+                        rootId = data.diff.rootId;
+                    } else if (data.flatTree && data.flatTree.nodes.length > 0) {
+                        nodes = decodeFlatTree(data.flatTree);
+                        rootId = data.flatTree.nodes[0][data.flatTree.fields.indexOf("id")];
+                    } else if (data.treeData && typeof data.treeData === "object") {
+                        nodes = flattenTree(data.treeData);
+                        rootId = data.treeData.id;
+                    } else {
                         setTreeData([]);
                         setError("Invalid tree data received.");
                         return;
                     }
 
-                    const formattedTreeData = formatTreeData([data.treeData]);
-                    setTreeData(formattedTreeData);
+                    showModel({ modelId: data.modelId, version: data.version, rootId, nodes });
                     const formattedConstraints = Array.isArray(data.constraints)
                         ? data.constraints
                         : [];
@@ -174,6 +309,62 @@ const FeatureTree = () => {
         };
 
         reader.readAsText(file);
+        // Allow picking the same (edited) file again
+        event.target.value = "";
+    };
+
+    // Revalidate after a click by sending only the features whose selection changed.
+    // Requests are chained so the backend applies the changes in click order.
+    const revalidate = (previous, next) => {
+        if (!model) return;
+        const modelKey = `${model.modelId}/${model.version}`;
+        if (invalidModel.current === modelKey) return;
+        const before = new Set(previous);
+        const after = new Set(next);
+        const changes = {};
+        before.forEach((value) => {
+            if (!after.has(value)) changes[value] = false;
+        });
+        after.forEach((value) => {
+            if (!before.has(value)) changes[value] = true;
+        });
+        const post = (body) =>
+            fetch("http://127.0.0.1:5000/toggle-feature", {
+                method: "POST",
+                headers: {
+                    "Content-Type": "application/json",
+                },
+                body: JSON.stringify({ modelId: model.modelId, version: model.version, ...body }),
+            });
+
+        pendingValidation.current = pendingValidation.current.then(async () => {
+            try {
+                let response = validationSession.current
+                    ? await post({ sessionId: validationSession.current, changes })
+                    : await post({ checked: next });
+                // The session was evicted or lives in another worker, start over
+                if (response.status === 404 && validationSession.current) {
+                    response = await post({ checked: next });
+                }
+                if (response.status === 422) {
+                    // The constraints of the model are broken, not the selection
+                    const failure = await response.json();
+                    invalidModel.current = modelKey;
+                    validationSession.current = null;
+                    setLiveValidation({ isValid: false, messages: [`${failure.error}: ${failure.details}`] });
+                    return;
+                }
+                if (!response.ok) {
+                    throw new Error(`Validation failed: ${response.statusText}`);
+                }
+                const result = await response.json();
+                validationSession.current = result.sessionId;
+                setLiveValidation(result);
+            } catch (error) {
+                validationSession.current = null;
+                console.error("Error revalidating selection:", error.message);
+            }
+        });
     };
 
     const validateSelection = async () => {
@@ -186,6 +377,10 @@ const FeatureTree = () => {
             xor: payload.xor || {},
             and: payload.and || {},
             selected: payload.selected || {},
+            // Lets the backend explain conflicts, including cross-tree constraints
+            checked: checked,
+            modelId: model ? model.modelId : null,
+            version: model ? model.version : null,
         };
 
         // Log the payload to check if it's properly formed
@@ -202,6 +397,13 @@ const FeatureTree = () => {
                 body: JSON.stringify(validationPayload),
             });
 
+            // The constraints of the model are broken, trying again cannot help
+            if (response.status === 422) {
+                const failure = await response.json();
+                alert(`${failure.error}: ${failure.details}`);
+                return;
+            }
+
             // Check if the response is valid
             if (!response.ok) {
                 throw new Error(`Validation failed: ${response.statusText}`);
@@ -212,8 +414,14 @@ const FeatureTree = () => {
 
             if (result.isValid) {
                 alert("Configuration is valid!");
+            } else if (result.diagnosis) {
+                const conflict = result.diagnosis.conflict.map((item) => `- ${item.message}`);
+                const fixes = result.diagnosis.fixes
+                    ? result.diagnosis.fixes.map((fix) => `- ${fix.message}`)
+                    : ["- The model has no valid configuration."];
+                alert(`Invalid configuration.\n\nConflict:\n${conflict.join("\n")}\n\nTo fix it:\n${fixes.join("\n")}`);
             } else {
-                alert(`Invalid configuration: ${result.error}`);
+                alert(`Invalid configuration: ${result.messages.join("\n")}`);
             }
         } catch (error) {
             // Catch and display any errors
@@ -532,7 +740,9 @@ const FeatureTree = () => {
         }
 
         // Ensure uniqueness and update state
-        setChecked([...new Set(updatedChecked)]);
+        const nextChecked = [...new Set(updatedChecked)];
+        setChecked(nextChecked);
+        revalidate(checked, nextChecked);
     };
 
     // Existing helper functions remain the same
@@ -557,6 +767,10 @@ const FeatureTree = () => {
     };
 
     const handleExpand = (value) => {
+        const node = findFeatureByValue(value, treeData[0]);
+        if (node && !node.children && node.childCount > 0) {
+            loadChildren(node);
+        }
         setExpanded((prev) =>
             prev.includes(value)
                 ? prev.filter((v) => v !== value)
@@ -569,7 +783,7 @@ const FeatureTree = () => {
             <div key={node.value}>
                 <Node mandatory={node.mandatory ? "true" : "false"}>
                     {/* Folder Expand Icon */}
-                    {node.children && node.children.length > 0 && (
+                    {node.childCount > 0 && (
                         <ExpandIconWrapper onClick={() => handleExpand(node.value)}>
                             {expanded.includes(node.value) ? (
                                 <FontAwesomeIcon icon={faChevronDown} />
@@ -650,6 +864,15 @@ const FeatureTree = () => {
                     treeData.map((rootNode) => renderNode(rootNode))
                 )}
             </TreeWrapper>
+            {liveValidation && (liveValidation.isValid ? (
+                <p>The current selection is valid.</p>
+            ) : (
+                <ErrorMessage>
+                    {liveValidation.messages.map((message, index) => (
+                        <span key={index}>{message}<br /></span>
+                    ))}
+                </ErrorMessage>
+            ))}
             <br />
             <button onClick={validateSelection}>Validate Selection</button>
             <br />
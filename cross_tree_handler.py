@@ -1,3 +1,6 @@
+from traversal import preorder
+
+
 def handle_cross_tree_constraints(constraints, feature_names):
     """
     Translates cross-tree constraints into logic.
@@ -33,7 +36,7 @@ def handle_cross_tree_constraints(constraints, feature_names):
 
 def extract_feature_name(feature):
     """
-    Recursively extracts all feature names from the feature model.
+    Extracts all feature names from the feature model.
 
     Args:
         feature (Feature): The root feature of the model.
@@ -41,8 +44,5 @@ def extract_feature_name(feature):
     Returns:
         set: A set of feature names.
     """
-    feature_names = {feature.name}
-    for child in feature.children:
-        feature_names.update(extract_feature_name(child))
-    return feature_names
+    return {node.name for node in preorder(feature)}
 
@@ -0,0 +1,229 @@
+import time
+
+from boolean_expression import expression_variables, parse_expression
+from feature_cnf import encode_feature_model
+from sat_solver import Solver
+
+
+def describe_origin(origin):
+    """
+    Describes a relation of the feature model in English.
+
+    Args:
+        origin (tuple): A relation as recorded by FeatureCNF.add_clause.
+
+    Returns:
+        str: The description shown to the user.
+    """
+    kind = origin[0]
+    if kind == "root":
+        return f"{origin[1]} is the root feature and is always selected."
+    if kind == "parent":
+        return f"{origin[1]} requires its parent {origin[2]}."
+    if kind == "mandatory":
+        return f"{origin[2]} is mandatory when {origin[1]} is selected."
+    if kind == "xor":
+        return f"{origin[1]} requires exactly one of {', '.join(origin[2])}."
+    if kind == "or":
+        return f"{origin[1]} requires at least one of {', '.join(origin[2])}."
+    if kind == "card":
+        low, high = origin[3], origin[4]
+        return f"{origin[1]} requires between {low} and {high} of {', '.join(origin[2])}."
+    return f"Constraint: {origin[1]}"
+
+
+def origin_features(origin):
+    """
+    Returns the names of the features a relation mentions.
+    """
+    kind = origin[0]
+    if kind == "root":
+        return [origin[1]]
+    if kind in ("parent", "mandatory"):
+        return [origin[1], origin[2]]
+    if kind in ("xor", "or", "card"):
+        return [origin[1]] + list(origin[2])
+    return sorted(expression_variables(parse_expression(origin[1])))
+
+
+class ConfigurationDiagnoser:
+    """
+    Explains why a selection of features is not a valid product.
+
+    Every relation of the model (root, parent, mandatory, group and cross-tree
+    constraint) is guarded by an activation variable, and every feature gets a
+    decision literal from the selection. Both are passed to the solver as
+    assumptions, so one incremental solver answers all the queries:
+
+    - conflict: a minimal unsatisfiable subset (MUS) of the relations and
+      decisions, found from the solver's core and shrunk by deletion.
+    - fixes: a minimal set of decisions to flip (a minimal correction set),
+      found by growing the set of decisions a valid product can keep.
+
+    Both searches stop when the time budget runs out and then report a
+    non-minimal (but still correct) answer.
+    """
+    def __init__(self, root_feature, constraints=()):
+        self.cnf = encode_feature_model(root_feature, constraints)
+        self.relations = {}  # Origin -> activation variable
+        for origin in self.cnf.origins.values():
+            if origin not in self.relations:
+                self.relations[origin] = self.cnf.num_vars + len(self.relations) + 1
+        self.origins = {var: origin for origin, var in self.relations.items()}
+
+        self.solver = Solver()
+        self.solver.ensure_vars(self.cnf.num_vars + len(self.relations))
+        for index, clause in enumerate(self.cnf.clauses):
+            origin = self.cnf.origins.get(index)
+            if origin is None:
+                self.solver.add_clause(clause)
+            else:
+                self.solver.add_clause([-self.relations[origin]] + clause)
+
+    def decisions(self, selected):
+        """
+        Returns one literal per concrete feature: positive if it is selected.
+        """
+        return [var if name in selected else -var for var, name in self.cnf.names.items()]
+
+    def describe(self, lit):
+        var = abs(lit)
+        if var in self.origins:
+            origin = self.origins[var]
+            return {"kind": origin[0], "features": origin_features(origin),
+                    "message": describe_origin(origin)}
+        name = self.cnf.names[var]
+        if lit > 0:
+            return {"kind": "selected", "features": [name], "message": f"{name} is selected."}
+        return {"kind": "deselected", "features": [name], "message": f"{name} is not selected."}
+
+    def minimal_conflict(self, selected, deadline, max_conflicts):
+        """
+        Finds a minimal set of relations and decisions that cannot hold together.
+
+        Returns:
+            tuple: (literals, minimal), or (None, False) if the selection is valid.
+        """
+        # With every feature decided the check is little more than propagation, so it runs unbounded
+        if self.solver.solve(list(self.relations.values()) + self.decisions(selected)):
+            return None, False
+
+        core = list(self.solver.core)
+        minimal = True
+        # Deletion: drop each literal in turn and keep the smaller core if still conflicting
+        for lit in list(core):
+            if lit not in core:
+                continue
+            if time.monotonic() > deadline:
+                minimal = False
+                break
+            trial = [other for other in core if other != lit]
+            result = self.solver.solve(trial, max_conflicts)
+            if result is False:
+                kept = set(self.solver.core)
+                core = [other for other in trial if other in kept]
+            elif result is None:
+                minimal = False
+        return core, minimal
+
+    def minimal_fix(self, selected, deadline, max_conflicts):
+        """
+        Finds a minimal set of decisions to flip so that the selection becomes valid.
+
+        Returns:
+            tuple: (literals to flip, repaired product, minimal), or (None, None, False)
+                   if the model has no valid product at all.
+        """
+        relations = list(self.relations.values())
+        decisions = self.decisions(selected)
+
+        # Start from a product close to the selection by preferring its values
+        for lit in decisions:
+            self.solver.phase[abs(lit)] = lit > 0
+        if self.solver.solve(relations, max_conflicts) is not True:
+            return None, None, False
+
+        model = self.solver.model
+        kept = [lit for lit in decisions if model[abs(lit)] == (lit > 0)]
+        pending = [lit for lit in decisions if model[abs(lit)] != (lit > 0)]
+        flipped = []
+        minimal = True
+        # `pending` always holds the decisions the current product disagrees with
+        while pending:
+            if time.monotonic() > deadline:
+                flipped.extend(pending)
+                minimal = False
+                break
+            lit = pending.pop()
+            result = self.solver.solve(relations + kept + [lit], max_conflicts)
+            if result is True:
+                model = self.solver.model
+                kept.append(lit)
+                # The new product may keep other pending decisions too
+                still_pending = []
+                for other in pending:
+                    if model[abs(other)] == (other > 0):
+                        kept.append(other)
+                    else:
+                        still_pending.append(other)
+                pending = still_pending
+            else:
+                flipped.append(lit)
+                minimal = minimal and result is False
+        flipped = [lit for lit in flipped if model[abs(lit)] != (lit > 0)]
+        return flipped, self.cnf.product(model), minimal
+
+    def diagnose(self, selected, time_budget=1.0, max_conflicts=10000):
+        """
+        Explains an invalid selection.
+
+        Args:
+            selected (iterable): The names of the selected features.
+            time_budget (float): Seconds to spend shrinking the conflict and the fix.
+            max_conflicts (int): Conflict budget for each solver call.
+
+        Returns:
+            dict: The diagnosis, or None if the selection is a valid product.
+        """
+        selected = set(selected)
+        deadline = time.monotonic() + time_budget
+        conflict, conflict_minimal = self.minimal_conflict(selected, deadline, max_conflicts)
+        if conflict is None:
+            return None
+
+        # The fix gets whatever is left of the budget, but at least a short search
+        deadline = max(deadline, time.monotonic() + time_budget / 4)
+        flipped, product, fixes_minimal = self.minimal_fix(selected, deadline, max_conflicts)
+        fixes = None  # The model has no valid product, nothing can be fixed
+        if flipped is not None:
+            fixes = []
+            for lit in flipped:
+                name = self.cnf.names[abs(lit)]
+                action = "Deselect" if lit > 0 else "Select"
+                fixes.append({"feature": name, "select": lit < 0, "message": f"{action} {name}."})
+
+        return {
+            "conflict": [self.describe(lit) for lit in conflict],
+            "conflictMinimal": conflict_minimal,
+            "fixes": fixes,
+            "fixesMinimal": fixes_minimal,
+            "repairedProduct": sorted(product) if product is not None else None,
+            "unknownFeatures": sorted(selected - set(self.cnf.variables))
+        }
+
+
+def diagnose_configuration(root_feature, constraints, selected, time_budget=1.0):
+    """
+    Explains why a selection of features is not a valid product.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints in propositional logic.
+        selected (iterable): The names of the selected features.
+        time_budget (float): Seconds to spend on the explanation.
+
+    Returns:
+        dict: The conflicting relations and decisions, the decisions to flip,
+              and the repaired product; None if the selection is valid.
+    """
+    return ConfigurationDiagnoser(root_feature, constraints).diagnose(selected, time_budget)
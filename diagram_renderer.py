@@ -0,0 +1,545 @@
+"""
+Draws feature model diagrams as SVG, or PNG when cairosvg is installed.
+
+The tree is laid out with the tidy tree algorithm of Buchheim, Jünger and
+Leipert (an O(n) version of Walker's algorithm): subtrees are placed side by
+side as close as their contours allow, parents are centered over their
+children and identical subtrees get identical drawings. Both passes walk the
+tree with explicit stacks, so deep models are no problem either. Nodes are as
+wide as their labels, so the gap between two neighbours depends on both
+widths.
+
+The notation is the usual one, as in feature-model.png: a filled circle on
+top of a mandatory feature, an empty one on top of an optional feature, an
+empty arc below the parent for XOR groups, a filled arc for OR groups and an
+arc with its [m..n] bounds for cardinality groups. Abstract features have
+italic labels and the cross-tree constraints are listed below the tree.
+
+Rendered diagrams are cached on disk under a hash of everything that is
+drawn, so unchanged models are not laid out again, and a directory of models
+is rendered by a pool of worker processes.
+
+Usage:
+    python diagram_renderer.py feature-model.xml -o feature-model.svg
+    python diagram_renderer.py models/ -o diagrams/ --format png --workers 4
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+from feature_model import group_kind
+from traversal import preorder_edges
+
+try:
+    import cairosvg
+except ImportError:
+    cairosvg = None
+
+IMAGE_FORMATS = ("svg", "png")
+MODEL_EXTENSIONS = (".xml", ".uvl", ".dimacs", ".cnf")
+DEFAULT_CACHE_DIR = os.environ.get("FM_DIAGRAM_CACHE", ".diagram_cache")
+# Part of the cache key, change it whenever the drawing changes
+RENDERER_VERSION = "1"
+
+FONT_SIZE = 13
+CHAR_WIDTH = 7.4  # Average width of a character at FONT_SIZE
+NODE_HEIGHT = 28
+NODE_PADDING = 10  # Space left and right of a label
+SIBLING_GAP = 12  # Minimal space between neighbouring boxes
+LEVEL_GAP = 48  # Vertical space between the levels of the tree
+MARGIN = 20
+MARKER_RADIUS = 5
+ARC_RADIUS = 16
+LEGEND_LINE_HEIGHT = 18
+
+
+class LayoutNode:
+    """
+    A box in the diagram, with the bookkeeping of the tidy tree layout.
+
+    Group nodes are not drawn: their members become children of the feature
+    owning the group, and the group is remembered as a span of those children.
+    """
+    __slots__ = ("feature", "parent", "children", "number", "depth", "width", "marker", "spans",
+                 "x", "mod", "thread", "ancestor", "change", "shift", "default_ancestor")
+
+    def __init__(self, feature, parent, number, marker):
+        self.feature = feature
+        self.parent = parent
+        self.children = []
+        self.number = number  # Index among the siblings
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.width = len(feature.name) * CHAR_WIDTH + 2 * NODE_PADDING
+        self.marker = marker  # "mandatory", "optional" or None for group members and the root
+        self.spans = []  # (kind, bounds label, first child, last child) for each group
+        self.x = 0.0
+        self.mod = 0.0
+        self.thread = None
+        self.ancestor = self
+        self.change = 0.0
+        self.shift = 0.0
+        self.default_ancestor = None
+
+
+def diagram_children(feature):
+    """
+    Lists the features drawn below a feature and the groups they form.
+
+    Returns:
+        tuple: A list of (child, marker) pairs and a list of (kind, bounds label, first, last)
+               spans over that list.
+    """
+    children = []
+    spans = []
+
+    def add_group(kind, owner, members):
+        if members:
+            label = format_bounds(owner.cardinality) if kind == "card" else None
+            spans.append((kind, label, len(children), len(children) + len(members) - 1))
+            children.extend((member, None) for member in members)
+
+    kind = group_kind(feature)
+    if kind is not None:
+        add_group(kind, feature, [child for child in feature.children if not child.is_group])
+    pending = list(reversed(feature.children))
+    while pending:
+        child = pending.pop()
+        if child.is_group:
+            child_kind = group_kind(child)
+            if child_kind is None:
+                pending.extend(reversed(child.children))  # An "and" group holds plain children
+            else:
+                add_group(child_kind, child, [member for member in child.children if not member.is_group])
+        elif kind is None:
+            children.append((child, "mandatory" if child.mandatory else "optional"))
+    return children, spans
+
+
+def format_bounds(cardinality):
+    low, high = cardinality or (0, None)
+    return f"[{low}..{'*' if high is None else high}]"
+
+
+def build_layout_tree(root_feature):
+    """
+    Creates the layout nodes of a feature tree.
+
+    Returns:
+        list: The layout nodes in pre-order, the root first.
+    """
+    root = LayoutNode(root_feature, None, 0, None)
+    nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        children, node.spans = diagram_children(node.feature)
+        node.children = [LayoutNode(child, node, number, marker)
+                         for number, (child, marker) in enumerate(children)]
+        stack.extend(reversed(node.children))
+    return nodes
+
+
+def separation(left, right):
+    """
+    Returns the distance between the centers of two neighbouring boxes on the same level.
+    """
+    return (left.width + right.width) / 2 + SIBLING_GAP
+
+
+def left_brother(node):
+    return node.parent.children[node.number - 1] if node.number else None
+
+
+def next_left(node):
+    return node.children[0] if node.children else node.thread
+
+
+def next_right(node):
+    return node.children[-1] if node.children else node.thread
+
+
+def move_subtree(left, right, shift):
+    subtrees = right.number - left.number
+    right.change -= shift / subtrees
+    right.shift += shift
+    left.change += shift / subtrees
+    right.x += shift
+    right.mod += shift
+
+
+def execute_shifts(node):
+    shift = change = 0.0
+    for child in reversed(node.children):
+        child.x += shift
+        child.mod += shift
+        change += child.change
+        shift += child.shift + change
+
+
+def apportion(node, default_ancestor):
+    """
+    Pushes a subtree right until it clears the subtrees of its left siblings.
+
+    The inner and outer contours of both sides are followed level by level
+    (with threads where a contour continues in another subtree), and the
+    shift is spread over the siblings in between so they stay evenly spaced.
+
+    Returns:
+        LayoutNode: The new default ancestor for the next sibling.
+    """
+    brother = left_brother(node)
+    if brother is None:
+        return default_ancestor
+    inner_right = outer_right = node
+    inner_left = brother
+    outer_left = node.parent.children[0]
+    sum_inner_right = sum_outer_right = node.mod
+    sum_inner_left = inner_left.mod
+    sum_outer_left = outer_left.mod
+    while next_right(inner_left) is not None and next_left(inner_right) is not None:
+        inner_left = next_right(inner_left)
+        inner_right = next_left(inner_right)
+        outer_left = next_left(outer_left)
+        outer_right = next_right(outer_right)
+        outer_right.ancestor = node
+        shift = (inner_left.x + sum_inner_left) - (inner_right.x + sum_inner_right) \
+            + separation(inner_left, inner_right)
+        if shift > 0:
+            ancestor = inner_left.ancestor if inner_left.ancestor.parent is node.parent else default_ancestor
+            move_subtree(ancestor, node, shift)
+            sum_inner_right += shift
+            sum_outer_right += shift
+        sum_inner_left += inner_left.mod
+        sum_inner_right += inner_right.mod
+        sum_outer_left += outer_left.mod
+        sum_outer_right += outer_right.mod
+    if next_right(inner_left) is not None and next_right(outer_right) is None:
+        outer_right.thread = next_right(inner_left)
+        outer_right.mod += sum_inner_left - sum_outer_right
+    else:
+        if next_left(inner_right) is not None and next_left(outer_left) is None:
+            outer_left.thread = next_left(inner_right)
+            outer_left.mod += sum_inner_right - sum_outer_left
+        default_ancestor = node
+    return default_ancestor
+
+
+def tidy_layout(nodes):
+    """
+    Computes the horizontal center of every box, in O(n).
+
+    Args:
+        nodes (list): The layout nodes in pre-order, from build_layout_tree.
+    """
+    # First walk, children before their parents: preliminary positions and modifiers
+    for node in nodes:
+        if node.children:
+            node.default_ancestor = node.children[0]
+    stack = [(nodes[0], False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+            continue
+        brother = left_brother(node) if node.parent is not None else None
+        if not node.children:
+            node.x = brother.x + separation(brother, node) if brother is not None else 0.0
+        else:
+            execute_shifts(node)
+            midpoint = (node.children[0].x + node.children[-1].x) / 2
+            if brother is not None:
+                node.x = brother.x + separation(brother, node)
+                node.mod = node.x - midpoint
+            else:
+                node.x = midpoint
+        if node.parent is not None:
+            node.parent.default_ancestor = apportion(node, node.parent.default_ancestor)
+
+    # Second walk, parents before their children: add up the modifiers
+    stack = [(nodes[0], 0.0)]
+    while stack:
+        node, offset = stack.pop()
+        node.x += offset
+        stack.extend((child, offset + node.mod) for child in node.children)
+
+
+def iter_svg(root_feature, constraints=()):
+    """
+    Streams the SVG drawing of a feature model.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints, listed below the tree.
+
+    Yields:
+        str: Pieces of the SVG document, in order.
+    """
+    nodes = build_layout_tree(root_feature)
+    tidy_layout(nodes)
+    left = min(node.x - node.width / 2 for node in nodes)
+    right = max(node.x + node.width / 2 for node in nodes)
+    depth = max(node.depth for node in nodes)
+    offset = MARGIN - left
+
+    def top(node):
+        return MARGIN + node.depth * (NODE_HEIGHT + LEVEL_GAP)
+
+    legend_top = MARGIN + (depth + 1) * NODE_HEIGHT + depth * LEVEL_GAP + LEVEL_GAP / 2
+    legend = [f"Cross-tree constraints ({len(constraints)}):"] + list(constraints) if constraints else []
+    width = max([right - left + 2 * MARGIN] + [len(line) * CHAR_WIDTH + 2 * MARGIN for line in legend])
+    height = legend_top + len(legend) * LEGEND_LINE_HEIGHT + (MARGIN if legend else MARGIN - LEVEL_GAP / 2)
+
+    yield (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+           f'viewBox="0 0 {width:.1f} {height:.1f}" font-family="Helvetica, Arial, sans-serif" '
+           f'font-size="{FONT_SIZE}">\n')
+    yield '<rect width="100%" height="100%" fill="white"/>\n'
+
+    # Edges, markers and group arcs below the boxes
+    yield '<g stroke="black" stroke-width="1.2" fill="none">\n'
+    for node in nodes:
+        if not node.children:
+            continue
+        px, py = node.x + offset, top(node) + NODE_HEIGHT
+        for child in node.children:
+            cx, cy = child.x + offset, top(child)
+            if child.marker is not None:
+                cy -= 2 * MARKER_RADIUS
+            yield f'<line x1="{px:.1f}" y1="{py:.1f}" x2="{cx:.1f}" y2="{cy:.1f}"/>\n'
+        for kind, label, first, last in node.spans:
+            yield group_arc(kind, label, (px, py), node.children[first], node.children[last], offset, top)
+    for node in nodes:
+        if node.marker is not None:
+            fill = "black" if node.marker == "mandatory" else "white"
+            yield (f'<circle cx="{node.x + offset:.1f}" cy="{top(node) - MARKER_RADIUS:.1f}" '
+                   f'r="{MARKER_RADIUS}" fill="{fill}"/>\n')
+    yield "</g>\n"
+
+    yield '<g text-anchor="middle" dominant-baseline="central">\n'
+    for node in nodes:
+        x, y = node.x + offset - node.width / 2, top(node)
+        feature = node.feature
+        style = ' font-style="italic"' if feature.attributes.get("abstract") is True else ""
+        yield (f'<rect x="{x:.1f}" y="{y:.1f}" width="{node.width:.1f}" height="{NODE_HEIGHT}" '
+               f'fill="white" stroke="black" stroke-width="1.2"/>'
+               f'<text x="{node.x + offset:.1f}" y="{y + NODE_HEIGHT / 2:.1f}"{style}>{escape(feature.name)}</text>\n')
+        if feature.cardinality is not None and group_kind(feature) != "card":
+            yield (f'<text x="{x + node.width + 2:.1f}" y="{y - 6:.1f}" text-anchor="start" '
+                   f'font-size="{FONT_SIZE - 2}">{escape(format_bounds(feature.cardinality))}</text>\n')
+    yield "</g>\n"
+
+    for index, line in enumerate(legend):
+        weight = ' font-weight="bold"' if index == 0 else ""
+        yield (f'<text x="{MARGIN}" y="{legend_top + (index + 0.5) * LEGEND_LINE_HEIGHT:.1f}" '
+               f'dominant-baseline="central"{weight}>{escape(line)}</text>\n')
+    yield "</svg>\n"
+
+
+def group_arc(kind, label, center, first, last, offset, top):
+    """
+    Draws the arc of a group between the edges to its first and last member.
+    """
+    cx, cy = center
+
+    def point(child):
+        dx, dy = child.x + offset - cx, top(child) - cy
+        length = (dx * dx + dy * dy) ** 0.5 or 1.0
+        return cx + ARC_RADIUS * dx / length, cy + ARC_RADIUS * dy / length
+
+    (x1, y1), (x2, y2) = point(first), point(last)
+    if first is last:
+        # A group with a single member still shows its kind, as a short arc around the edge
+        x1, x2 = x1 - ARC_RADIUS / 3, x2 + ARC_RADIUS / 3
+    arc = f"A {ARC_RADIUS} {ARC_RADIUS} 0 0 0 {x2:.1f} {y2:.1f}"
+    if kind == "or":
+        text = f'<path d="M {cx:.1f} {cy:.1f} L {x1:.1f} {y1:.1f} {arc} Z" fill="black"/>'
+    else:
+        text = f'<path d="M {x1:.1f} {y1:.1f} {arc}"/>'
+    if label is not None:
+        text += (f'<text x="{cx + ARC_RADIUS + 4:.1f}" y="{cy + ARC_RADIUS:.1f}" stroke="none" fill="black" '
+                 f'font-size="{FONT_SIZE - 2}">{escape(label)}</text>')
+    return text + "\n"
+
+
+def render_svg(root_feature, constraints=()):
+    """
+    Draws a feature model as an SVG document.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints, listed below the tree.
+
+    Returns:
+        str: The SVG document.
+    """
+    return "".join(iter_svg(root_feature, constraints))
+
+
+def render_image(root_feature, constraints=(), image_format="svg"):
+    """
+    Draws a feature model as SVG or PNG.
+
+    Returns:
+        bytes: The encoded image.
+
+    Raises:
+        RuntimeError: If PNG is requested and cairosvg is not installed.
+    """
+    svg = render_svg(root_feature, constraints).encode("utf-8")
+    if image_format == "svg":
+        return svg
+    if image_format != "png":
+        raise ValueError(f"Unknown image format '{image_format}', expected one of {', '.join(IMAGE_FORMATS)}")
+    if cairosvg is None:
+        raise RuntimeError("PNG output needs cairosvg (pip install cairosvg); SVG works without it.")
+    return cairosvg.svg2png(bytestring=svg)
+
+
+def model_hash(root_feature, constraints=(), image_format="svg"):
+    """
+    Hashes everything a diagram shows, to key the diagram cache.
+
+    Returns:
+        str: A hex digest that changes whenever the drawing would.
+    """
+    digest = hashlib.sha256(f"{RENDERER_VERSION}\t{image_format}\n".encode("utf-8"))
+    for feature, parent, depth in preorder_edges(root_feature):
+        digest.update((f"{depth}\t{feature.name}\t{feature.mandatory}\t{feature.group_type}\t"
+                       f"{feature.is_group}\t{feature.cardinality}\t"
+                       f"{feature.attributes.get('abstract') is True}\n").encode("utf-8"))
+    for constraint in constraints:
+        digest.update(f"constraint\t{constraint}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def render_cached(root_feature, constraints=(), image_format="svg", cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Draws a feature model, reusing the cached image of an identical model.
+
+    The cache may be shared by several processes: images are written to a
+    temporary file and moved into place, so readers never see a partial file.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints, listed below the tree.
+        image_format (str): "svg" or "png".
+        cache_dir (str): Directory of the cached images, or None to always render.
+
+    Returns:
+        tuple: The encoded image and whether it came from the cache.
+    """
+    if cache_dir is None:
+        return render_image(root_feature, constraints, image_format), False
+    path = os.path.join(cache_dir, f"{model_hash(root_feature, constraints, image_format)}.{image_format}")
+    try:
+        with open(path, "rb") as file:
+            return file.read(), True
+    except FileNotFoundError:
+        pass
+    image = render_image(root_feature, constraints, image_format)
+    os.makedirs(cache_dir, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(handle, "wb") as file:
+        file.write(image)
+    os.replace(temporary, path)
+    return image, False
+
+
+def render_file(task):
+    """
+    Renders one model file, in a worker process of render_directory.
+
+    Args:
+        task (tuple): (model path, output path, image format, cache directory).
+
+    Returns:
+        tuple: (model path, output path, cache hit, seconds, error message or None).
+    """
+    from model_formats import load_model  # Only needed for rendering files
+
+    path, output, image_format, cache_dir = task
+    start = time.perf_counter()
+    try:
+        root_feature, constraints = load_model(path)
+        image, hit = render_cached(root_feature, constraints, image_format, cache_dir)
+        with open(output, "wb") as file:
+            file.write(image)
+    except Exception as error:
+        # One broken model must not stop the others; ParseError of ElementTree is a SyntaxError
+        expected = isinstance(error, (OSError, ValueError, SyntaxError))
+        message = str(error) if expected else f"{type(error).__name__}: {error}"
+        return path, output, False, time.perf_counter() - start, message
+    return path, output, hit, time.perf_counter() - start, None
+
+
+def render_directory(source_dir, output_dir, image_format="svg", workers=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Renders every model file of a directory in parallel worker processes.
+
+    Args:
+        source_dir (str): Directory with .xml, .uvl, .dimacs or .cnf models.
+        output_dir (str): Directory for the images, one per model with the same base name.
+        image_format (str): "svg" or "png".
+        workers (int): Number of worker processes, the number of CPUs if None.
+        cache_dir (str): Directory of the cached images, or None to always render.
+
+    Returns:
+        list: (model path, output path, cache hit, seconds, error message or None) per model.
+    """
+    if image_format == "png" and cairosvg is None:
+        raise RuntimeError("PNG output needs cairosvg (pip install cairosvg); SVG works without it.")
+    names = [name for name in sorted(os.listdir(source_dir))
+             if os.path.splitext(name)[1].lower() in MODEL_EXTENSIONS]
+    stems = [os.path.splitext(name)[0] for name in names]
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = []
+    for name, stem in zip(names, stems):
+        # Models that differ only by extension keep it in the image name
+        base = stem if stems.count(stem) == 1 else name
+        output = os.path.join(output_dir, f"{base}.{image_format}")
+        tasks.append((os.path.join(source_dir, name), output, image_format, cache_dir))
+    if not tasks:
+        return []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Small batches keep the workers busy without one process per tiny model
+        chunk = max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1)))
+        return list(pool.map(render_file, tasks, chunksize=chunk))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Draw feature model diagrams as SVG or PNG.")
+    parser.add_argument("source", help="A model file, or a directory of models")
+    parser.add_argument("-o", "--output", required=True, help="The image file, or a directory for the images")
+    parser.add_argument("--format", choices=IMAGE_FORMATS, help="Image format (default: from the output name, "
+                                                                 "or svg for a directory)")
+    parser.add_argument("--workers", type=int, help="Worker processes for a directory (default: one per CPU)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Where rendered diagrams are cached")
+    parser.add_argument("--no-cache", action="store_true", help="Always render, ignoring the cache")
+    args = parser.parse_args()
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    if (args.format == "png" or args.output.lower().endswith(".png")) and cairosvg is None:
+        parser.error("PNG output needs cairosvg (pip install cairosvg); SVG works without it.")
+    start = time.perf_counter()
+    if os.path.isdir(args.source):
+        results = render_directory(args.source, args.output, args.format or "svg", args.workers, cache_dir)
+    else:
+        image_format = args.format or ("png" if args.output.lower().endswith(".png") else "svg")
+        results = [render_file((args.source, args.output, image_format, cache_dir))]
+    for path, output, hit, seconds, error in results:
+        if error is not None:
+            print(f"{path}: {error}")
+        else:
+            print(f"{path} -> {output} ({'cached' if hit else f'{seconds * 1000:.0f} ms'})")
+    failed = sum(1 for result in results if result[4] is not None)
+    print(f"Rendered {len(results) - failed} of {len(results)} models in {time.perf_counter() - start:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
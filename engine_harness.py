@@ -0,0 +1,569 @@
+"""
+Checks that the analysis engines agree and times them on growing models.
+
+Random feature models are generated from a seed: trees with mandatory and
+optional features, xor/or/cardinality groups and cross-tree constraints. On
+small models every engine is compared against a brute-force reference that
+tries every subset of features against the tree semantics, so the product
+sets (and counts) must be identical. A few hand-written XML models cover the
+shapes the generator does not make; they must parse to the expected number
+of products, without feature attributes. On larger models, where nothing can
+be enumerated, the engines are only timed, once with a few constraints and
+once with a constraint per 10 features, where the product search gets hard.
+The timing curves can be stored as a baseline and later runs fail when an
+engine got slower than the baseline by more than the threshold. A fixed
+calibration workload is timed with every run and stored with the baseline,
+so a machine that is slower as a whole does not count as a regression.
+
+The legacy calculate_mwp is not checked by default: it only evaluates the
+feature names of a subset, not the relations of the tree, so it disagrees
+with the other engines on most models. Pass `--engines calculate_mwp` to see
+where.
+
+The small models are also saved in every format of model_formats and loaded
+back, and the products of the loaded model must be the same (for DIMACS,
+once the variables of the constraint encoding are left out; FeatureIDE XML
+is skipped on models with cardinalities, which it cannot express).
+compare_models is checked by diffing each model against one without
+products, every product must then be reported as added.
+
+engine_baseline.json holds the timings of the default sizes. Run against it
+with `--baseline engine_baseline.json` before changing an engine; the exit
+status is 1 on a disagreement or a regression. When an engine is made faster
+on purpose, or the timed sizes change, refresh it with `--update-baseline
+engine_baseline.json` and commit the file with the change.
+
+Usage:
+    python engine_harness.py --seeds 200
+    python engine_harness.py --update-baseline engine_baseline.json
+    python engine_harness.py --baseline engine_baseline.json --threshold 2
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+
+from boolean_expression import evaluate_expression, parse_expression
+from diagnosis import ConfigurationDiagnoser, diagnose_configuration
+from feature_cnf import encode_feature_model
+from feature_model import Feature, group_bounds
+from incremental_validator import IncrementalValidator
+from logic_translator import translate_to_logic
+from main import get_mandatory_features
+from model_diff import compare_models
+from model_formats import load_model, save_model
+from model_simplifier import simplify_model
+from mwp_calculator import calculate_mwp
+from mwp_optimizer import find_minimum_products
+from product_counter import count_products, enumerate_products
+from traversal import preorder
+from xml_parser import load_and_parse_xml_string, parse_constraints
+
+GROUP_KINDS = ("xor", "or", "card")
+
+
+def random_model(size, seed, constraint_count=None):
+    """
+    Generates a random feature model.
+
+    Args:
+        size (int): The number of concrete features, including the root.
+        seed (int): The seed of the generator, the same seed gives the same model.
+        constraint_count (int): The number of cross-tree constraints, about size / 10 if None.
+
+    Returns:
+        tuple: The root feature and the list of cross-tree constraints.
+    """
+    generator = random.Random(seed)
+    root = Feature("F0", group_type="None")
+    features = [root]
+    while len(features) < size:
+        parent = generator.choice(features)
+        if generator.random() < 0.3 and size - len(features) >= 2:
+            kind = generator.choice(GROUP_KINDS)
+            count = min(generator.randint(2, 5), size - len(features))
+            bounds = None
+            if kind == "card":
+                low = generator.randint(0, count)
+                bounds = (low, generator.choice([None, generator.randint(max(low, 1), count)]))
+            # A parent can hold several groups, the index keeps their names apart
+            group = Feature(f"{parent.name}-Group-{kind}{len(features)}", group_type=kind, is_group=True,
+                            cardinality=bounds)
+            parent.add_child(group)
+            for _ in range(count):
+                feature = Feature(f"F{len(features)}", cost=generator.randint(0, 5))
+                group.add_child(feature)
+                features.append(feature)
+        else:
+            feature = Feature(f"F{len(features)}", mandatory=generator.random() < 0.3, cost=generator.randint(0, 5))
+            parent.add_child(feature)
+            features.append(feature)
+
+    if constraint_count is None:
+        constraint_count = max(1, size // 10)
+    names = [feature.name for feature in features]
+    constraints = []
+    for _ in range(constraint_count if len(names) > 1 else 0):
+        a, b = generator.sample(names, 2)
+        constraints.append(generator.choice([f"{a} -> {b}", f"{a} -> !{b}", f"!{a} | !{b}", f"{a} | {b}"]))
+    return root, constraints
+
+
+def feature_names(root_feature):
+    return [feature.name for feature in preorder(root_feature) if not feature.is_group]
+
+
+def is_product(root_feature, expressions, product):
+    """
+    Checks a set of feature names against the tree relations and the parsed constraints.
+
+    Written straight from the semantics of the model rather than from its
+    encoding, so it can serve as the reference for the engines.
+    """
+    if root_feature.name not in product:
+        return False
+    stack = [(root_feature, None)]
+    while stack:
+        feature, parent = stack.pop()
+        # A group node stands for the feature it hangs from
+        name = parent if feature.is_group else feature.name
+        selected = name in product
+        if not feature.is_group and parent is not None and selected and parent not in product:
+            return False
+        bounds = group_bounds(feature)
+        members = [child for child in feature.children if not child.is_group]
+        if selected and bounds:
+            count = sum(member.name in product for member in members)
+            if count < bounds[0] or count > bounds[1]:
+                return False
+        elif selected and any(member.mandatory and member.name not in product for member in members):
+            return False
+        stack.extend((child, name) for child in feature.children)
+    return all(evaluate_expression(expression, product) for expression in expressions)
+
+
+def reference_products(root_feature, constraints):
+    """
+    Finds the products by trying every subset of the features.
+    """
+    names = feature_names(root_feature)
+    expressions = [parse_expression(constraint) for constraint in constraints]
+    products = set()
+    for bits in itertools.product((False, True), repeat=len(names) - 1):
+        product = frozenset(itertools.compress(names, (True,) + bits))
+        if is_product(root_feature, expressions, product):
+            products.add(product)
+    return products
+
+
+# Engines return the set of products, or their number, or None if the model is out of their reach
+
+def sat_products(root_feature, constraints):
+    cnf = encode_feature_model(root_feature, constraints)
+    solver = cnf.to_solver()
+    products = set()
+    while solver.solve():
+        model = solver.model
+        products.add(cnf.product(model))
+        # Block the product only, auxiliary variables are determined by the features
+        solver.add_clause([-var if model[var] else var for var in cnf.names])
+    return products
+
+
+def simplified_products(root_feature, constraints):
+    simplified = simplify_model(root_feature, constraints)
+    if simplified.void:
+        return set()
+    solver = simplified.to_solver()
+    products = set()
+    while solver.solve():
+        model = solver.model
+        products.add(simplified.expand(model))
+        solver.add_clause([-var if model[var] else var for var in range(1, simplified.num_vars + 1)])
+    return products
+
+
+def optimizer_products(root_feature, constraints):
+    # Asking for more products than the model has returns all of them
+    k = 2 ** len(feature_names(root_feature))
+    return {product for _, product in find_minimum_products(root_feature, constraints, k=k)}
+
+
+def diagnosis_products(root_feature, constraints):
+    # Diagnosis only tells valid from invalid, so every subset is put to it
+    diagnoser = ConfigurationDiagnoser(root_feature, constraints)
+    names = feature_names(root_feature)
+    products = set()
+    for bits in itertools.product((False, True), repeat=len(names)):
+        product = frozenset(itertools.compress(names, bits))
+        if diagnoser.diagnose(product, time_budget=0.01) is None:
+            products.add(product)
+    return products
+
+
+def incremental_products(root_feature, constraints):
+    # Walks the subsets in Gray code order, so every step toggles one feature
+    validator = IncrementalValidator(root_feature, constraints)
+    names = feature_names(root_feature)
+    products = set()
+    for step in range(2 ** len(names)):
+        if step:
+            validator.toggle(names[(step & -step).bit_length() - 1])
+        if validator.is_valid():
+            products.add(frozenset(validator.selected))
+    return products
+
+
+def legacy_products(root_feature, constraints):
+    logic = translate_to_logic(root_feature)
+    logic["constraints"].extend(constraints)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        mwps = calculate_mwp(logic, get_mandatory_features(root_feature))
+    return {frozenset(mwp) for mwp in mwps}
+
+
+def round_trip_products(model_format, extension):
+    """
+    Makes an engine that saves a model in a format, loads it back and enumerates the loaded model.
+    """
+    def products(root_feature, constraints):
+        names = set(feature_names(root_feature))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model" + extension)
+            save_model(root_feature, constraints, path, model_format)
+            loaded_root, loaded_constraints = load_model(path, model_format)
+        # A DIMACS model gets a synthetic root and keeps the encoding variables as features
+        return {product & names for product in sat_products(loaded_root, loaded_constraints)}
+    return products
+
+
+def featureide_round_trip(root_feature, constraints):
+    # FeatureIDE XML has no cardinalities, it does not apply to models that use them
+    if any(feature.cardinality is not None for feature in preorder(root_feature)):
+        return None
+    return round_trip_products("featureide", ".xml")(root_feature, constraints)
+
+
+def diff_products(root_feature, constraints):
+    # Against a model without products, every product of this one was added
+    void = Feature(root_feature.name + "_void")
+    limit = 2 ** len(feature_names(root_feature))
+    result = compare_models(void, ["false"], root_feature, constraints, examples=limit)
+    return {frozenset(product) for product in result["addedProducts"]}
+
+
+ENGINES = {
+    "count_products": count_products,
+    "enumerate_products": lambda root, constraints: set(enumerate_products(root, constraints)),
+    "sat": sat_products,
+    "simplified_sat": simplified_products,
+    "find_minimum_products": optimizer_products,
+    "diagnose_configuration": diagnosis_products,
+    "incremental_validator": incremental_products,
+    "uvl_round_trip": round_trip_products("uvl", ".uvl"),
+    "dimacs_round_trip": round_trip_products("dimacs", ".dimacs"),
+    "xml_round_trip": round_trip_products("xml", ".xml"),
+    "featureide_round_trip": featureide_round_trip,
+    "compare_models": diff_products,
+    "calculate_mwp": legacy_products,
+}
+DEFAULT_ENGINES = [name for name in ENGINES if name != "calculate_mwp"]
+
+
+def check_model(root_feature, constraints, engines):
+    """
+    Runs the engines on one model and compares them with the reference.
+
+    Returns:
+        list: A message for each engine that disagrees, empty if they all agree.
+    """
+    expected = reference_products(root_feature, constraints)
+    mismatches = []
+    for name in engines:
+        result = ENGINES[name](root_feature, constraints)
+        if result is None:
+            continue
+        if isinstance(result, int):
+            if result != len(expected):
+                mismatches.append(f"{name} counted {result} products, expected {len(expected)}")
+        elif result != expected:
+            missing, extra = len(expected - result), len(result - expected)
+            mismatches.append(f"{name} returned {len(result)} products, expected {len(expected)} "
+                              f"({missing} missing, {extra} extra)")
+    return mismatches
+
+
+def check_engines(seeds, max_size, engines):
+    """
+    Compares the engines on one small random model per seed.
+
+    Returns:
+        list: (seed, size, constraints, mismatches) for every model where an engine disagrees.
+    """
+    failures = []
+    for seed in seeds:
+        generator = random.Random(seed)
+        size = generator.randint(1, max_size)
+        root, constraints = random_model(size, seed, generator.randint(0, 3))
+        mismatches = check_model(root, constraints, engines)
+        if mismatches:
+            failures.append((seed, size, constraints, mismatches))
+    return failures
+
+
+# Hand-written models in the project's XML, for shapes random_model does not generate,
+# with the number of products they must have
+SAMPLE_MODELS = {
+    "card group on the root": ("""
+        <featureModel>
+            <feature name="R" group="card" min="2" max="2">
+                <feature name="A"/><feature name="B"/><feature name="C"/>
+            </feature>
+        </featureModel>""", 3),
+    "card group on a feature": ("""
+        <featureModel>
+            <feature name="R">
+                <feature name="S" group="card" card="2..3">
+                    <feature name="X"/><feature name="Y"/><feature name="Z"/>
+                </feature>
+            </feature>
+        </featureModel>""", 5),
+    "card group bounds on a feature": ("""
+        <featureModel>
+            <feature name="R">
+                <feature name="S" group="card" min="1" max="1">
+                    <feature name="X"/><feature name="Y"/>
+                </feature>
+            </feature>
+        </featureModel>""", 3),
+}
+
+
+def check_samples(engines):
+    """
+    Parses the sample models and compares the engines on them.
+
+    Returns:
+        list: (sample, mismatches) for every sample that is parsed wrongly or where an engine disagrees.
+    """
+    failures = []
+    for name, (xml, expected) in SAMPLE_MODELS.items():
+        xml_root, root = load_and_parse_xml_string(xml)
+        constraints = parse_constraints(xml_root, interactive=False)
+        mismatches = check_model(root, constraints, engines)
+        count = len(reference_products(root, constraints))
+        if count != expected:
+            mismatches.append(f"the parsed model has {count} products, expected {expected}")
+        # The samples declare no feature attributes, everything on their elements describes the tree
+        mismatches.extend(f"{feature.name} has the feature attributes {sorted(feature.attributes)}"
+                          for feature in preorder(root) if feature.attributes)
+        if mismatches:
+            failures.append((name, mismatches))
+    return failures
+
+
+# Timed engines only do work that stays polynomial on large models
+
+def first_products(root_feature, constraints, limit=10):
+    cnf = encode_feature_model(root_feature, constraints)
+    solver = cnf.to_solver()
+    for _ in range(limit):
+        if not solver.solve():
+            break
+        model = solver.model
+        solver.add_clause([-var if model[var] else var for var in cnf.names])
+
+
+def toggle_every_feature(root_feature, constraints):
+    validator = IncrementalValidator(root_feature, constraints)
+    for name in feature_names(root_feature):
+        validator.toggle(name)
+
+
+TIMED_ENGINES = {
+    "encode_feature_model": encode_feature_model,
+    "count_products": count_products,
+    "sat_first_10": first_products,
+    "simplify_model": simplify_model,
+    "find_minimum_products": lambda root, constraints: find_minimum_products(root, constraints, k=3),
+    "diagnose_configuration": lambda root, constraints: diagnose_configuration(
+        root, constraints, feature_names(root)[::2], time_budget=0.5),
+    "incremental_toggles": toggle_every_feature,
+}
+DENSE_ENGINES = [name for name in TIMED_ENGINES if name != "count_products"]
+
+
+def calibrate(repeats=5):
+    """
+    Times a fixed pure Python workload, to tell a slower machine from a slower engine.
+
+    Returns:
+        float: The best time in seconds.
+    """
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        total = 0
+        for i in range(200000):
+            total += i * i % 7
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def best_time(function, root_feature, constraints, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(root_feature, constraints)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def dense_model(size, seed, features_per_constraint=10):
+    """
+    Generates a random model with one constraint per `features_per_constraint` features.
+
+    Dense random constraints often leave no product at all, which every engine
+    answers at once, so the first seed from `seed` on whose model has products is used.
+    """
+    while True:
+        root, constraints = random_model(size, seed, size // features_per_constraint)
+        if not simplify_model(root, constraints).void:
+            return root, constraints
+        seed += 1
+
+
+def time_engines(sizes, repeats=5, seed=0, constraint_count=4):
+    """
+    Times every engine on one random model per size.
+
+    The constraint count stays fixed so the curves show how the engines scale
+    with the tree; count_products also conditions on at most 20 constrained features.
+    The other engines are timed again as "<engine> (dense)" on a model with a
+    constraint per 10 features, where the search of the product engines gets hard.
+
+    Returns:
+        dict: Engine name -> {size (str): best time in seconds}.
+    """
+    timings = {name: {} for name in TIMED_ENGINES}
+    timings.update((f"{name} (dense)", {}) for name in DENSE_ENGINES)
+    # The first call pays for imports and caches, warm every engine up on a small model
+    root, constraints = random_model(20, seed, constraint_count)
+    for function in TIMED_ENGINES.values():
+        function(root, constraints)
+    for size in sizes:
+        root, constraints = random_model(size, seed + size, constraint_count)
+        for name, function in TIMED_ENGINES.items():
+            timings[name][str(size)] = best_time(function, root, constraints, repeats)
+        root, constraints = dense_model(size, seed + size)
+        for name in DENSE_ENGINES:
+            timings[f"{name} (dense)"][str(size)] = best_time(TIMED_ENGINES[name], root, constraints, repeats)
+    return timings
+
+
+def find_regressions(timings, baseline, threshold, scale=1.0, min_delta=0.005):
+    """
+    Compares timings with a baseline.
+
+    Args:
+        timings (dict): The current timings, as returned by time_engines.
+        baseline (dict): The stored timings in the same layout.
+        threshold (float): How many times slower than the baseline an engine may get.
+        scale (float): How much slower the machine is now than when the baseline was
+                       taken, from the two calibrations; baseline times are scaled by it.
+        min_delta (float): Seconds below which a slowdown is treated as noise.
+
+    Returns:
+        list: (engine, size, baseline seconds, current seconds) for every regression.
+    """
+    regressions = []
+    for name, curve in timings.items():
+        for size, elapsed in curve.items():
+            before = baseline.get(name, {}).get(size)
+            if before is not None:
+                before *= scale
+            if before is not None and elapsed > before * threshold and elapsed - before > min_delta:
+                regressions.append((name, size, before, elapsed))
+    return regressions
+
+
+def print_timings(timings, baseline, scale=1.0):
+    sizes = sorted({size for curve in timings.values() for size in curve}, key=int)
+    print(f"{'engine':<32}" + "".join(f"{size + ' (ms)':>14}" for size in sizes))
+    for name, curve in timings.items():
+        print(f"{name:<32}" + "".join(f"{curve[size] * 1000:>14.1f}" for size in sizes))
+        before = baseline.get(name)
+        if before:
+            ratios = "".join(f"{curve[size] / (before[size] * scale):>13.2f}x" if before.get(size) else f"{'-':>14}"
+                             for size in sizes)
+            print(f"{'  vs baseline':<32}{ratios}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the analysis engines agree and time them.")
+    parser.add_argument("--seeds", type=int, default=100, help="Number of small random models to check")
+    parser.add_argument("--first-seed", type=int, default=0, help="Seed of the first small model")
+    parser.add_argument("--max-features", type=int, default=10, help="Largest small model, in features")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=DEFAULT_ENGINES,
+                        help="Engines to compare against the reference")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[100, 300, 1000],
+                        help="Model sizes to time the engines on (none to skip timing)")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per timing, the fastest counts")
+    parser.add_argument("--baseline", help="JSON file with the timings to compare against")
+    parser.add_argument("--update-baseline", metavar="PATH", help="Write the timings to this JSON file")
+    parser.add_argument("--threshold", type=float, default=2.0,
+                        help="Fail when an engine is this many times slower than the baseline")
+    args = parser.parse_args()
+
+    failed = False
+    seeds = range(args.first_seed, args.first_seed + args.seeds)
+    failures = check_engines(seeds, args.max_features, args.engines)
+    print(f"Checked {', '.join(args.engines)} on {args.seeds} models: {len(failures)} disagreements")
+    for seed, size, constraints, mismatches in failures:
+        failed = True
+        print(f"  seed {seed} ({size} features, constraints {constraints}):")
+        for mismatch in mismatches:
+            print(f"    {mismatch}")
+    failures = check_samples(args.engines)
+    print(f"Checked {len(SAMPLE_MODELS)} sample models: {len(failures)} disagreements")
+    for name, mismatches in failures:
+        failed = True
+        print(f"  {name}:")
+        for mismatch in mismatches:
+            print(f"    {mismatch}")
+
+    if args.sizes:
+        baseline = {"timings": {}}
+        if args.baseline:
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        # Calibrate on both sides of the timings, the machine may speed up or slow down meanwhile
+        calibration = calibrate()
+        timings = time_engines(args.sizes, args.repeats)
+        calibration = min(calibration, calibrate())
+        scale = calibration / baseline.get("calibration", calibration)
+        print()
+        print_timings(timings, baseline["timings"], scale)
+        if args.baseline:
+            print(f"\nMachine speed vs baseline: {1 / scale:.2f}x")
+        if args.update_baseline:
+            with open(args.update_baseline, "w") as file:
+                json.dump({"sizes": args.sizes, "calibration": calibration, "timings": timings}, file, indent=2)
+            print(f"\nBaseline written to {args.update_baseline}")
+        regressions = find_regressions(timings, baseline["timings"], args.threshold, scale)
+        for name, size, before, elapsed in regressions:
+            failed = True
+            print(f"Regression: {name} on {size} features took {elapsed * 1000:.1f} ms, "
+                  f"baseline {before * 1000:.1f} ms")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,445 @@
+"""
+Typed feature attributes and batch evaluation of constraints that use them.
+
+Attributes such as cost, memory or power come from the XML, either as extra
+attributes of a <feature> element (memory="64") or as nested elements
+(<attribute name="memory" value="64" type="int"/>). AttributeTable stores
+them column-wise, one typed column per attribute over the concrete features,
+so aggregates like "sum(memory) <= 512" can be computed for many
+configurations at once.
+
+numpy is used when it is installed, imported on the first batch so that
+importing this module stays cheap. Without it, configurations are packed
+into bitsets (one Python integer per feature, one bit per configuration), so
+boolean operators become single integer operations over the whole batch and
+integer sums are added bit-plane by bit-plane.
+"""
+import math
+
+from boolean_expression import COMPARISON_OPERATORS, evaluate_expression, expression_aggregates, parse_expression
+from traversal import preorder
+
+_numpy = None  # The numpy module once imported, False if it is not installed
+
+# Attributes of the <feature> element that describe the tree rather than the feature
+STRUCTURAL_ATTRIBUTES = ("name", "mandatory", "group", "card", "min", "max")
+
+ATTRIBUTE_TYPES = ("bool", "int", "float", "string")
+
+
+def load_numpy():
+    """
+    Imports numpy the first time it is needed.
+
+    Returns:
+        The numpy module, or None if it is not installed.
+    """
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+def parse_attribute_value(text, type_name=None):
+    """
+    Converts the text of an attribute into a typed value.
+
+    Args:
+        text (str): The attribute text from the XML.
+        type_name (str): "bool", "int", "float" or "string"; inferred from the text if None.
+
+    Returns:
+        The value as bool, int, float or str.
+
+    Raises:
+        ValueError: If the text does not match the given type.
+    """
+    if type_name == "string":
+        return text  # Kept exactly, surrounding spaces included
+    text = text.strip()
+    if type_name is None:
+        for candidate in ("bool", "int", "float"):
+            try:
+                return parse_attribute_value(text, candidate)
+            except ValueError:
+                continue
+        return text
+    if type_name == "bool":
+        if text.lower() not in ("true", "false"):
+            raise ValueError(f"Expected true or false but found {text!r}")
+        return text.lower() == "true"
+    if type_name == "int":
+        return int(text)
+    if type_name == "float":
+        return float(text)
+    raise ValueError(f"Unknown attribute type {type_name!r}, expected one of {', '.join(ATTRIBUTE_TYPES)}")
+
+
+def element_attributes(element):
+    """
+    Reads the attributes of a <feature> element.
+
+    Args:
+        element (ET.Element): The <feature> element.
+
+    Returns:
+        dict: Attribute name -> typed value.
+    """
+    attributes = {key: parse_attribute_value(value) for key, value in element.attrib.items()
+                  if key not in STRUCTURAL_ATTRIBUTES}
+    for attribute in element.findall("attribute"):
+        name = attribute.attrib.get("name")
+        if name is None or "value" not in attribute.attrib:
+            raise ValueError("An <attribute> element needs a name and a value.")
+        attributes[name] = parse_attribute_value(attribute.attrib["value"], attribute.attrib.get("type"))
+    return attributes
+
+
+def column_type(values):
+    """
+    Finds the narrowest type that holds every value of a column (bool < int < float < string).
+    """
+    rank = 0
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, str):
+            return "string"
+        if isinstance(value, float):
+            rank = max(rank, 2)
+        elif isinstance(value, int) and not isinstance(value, bool):
+            rank = max(rank, 1)
+    return ATTRIBUTE_TYPES[rank]
+
+
+class AttributeTable:
+    """
+    Column store of the feature attributes of a model.
+
+    Rows are the concrete features in pre-order. Every attribute is one typed
+    column; features without the attribute hold None and count as 0 in sums.
+    """
+    def __init__(self, root_feature):
+        self.features = []
+        self.index = {}  # Feature or group name -> row
+        for feature in preorder(root_feature):
+            # Features sharing a name share a row, as they share a variable
+            if not feature.is_group and feature.name not in self.index:
+                self.index[feature.name] = len(self.features)
+                self.features.append(feature)
+        # Groups share the row of the feature that owns them
+        for feature in preorder(root_feature):
+            for child in feature.children:
+                if child.is_group and feature.name in self.index:
+                    self.index.setdefault(child.name, self.index[feature.name])
+        self.size = len(self.features)
+
+        names = {name for feature in self.features for name in feature.attributes}
+        self.columns = {}
+        self.types = {}
+        for name in sorted(names):
+            values = [None] * self.size
+            for feature in self.features:
+                if name in feature.attributes:
+                    values[self.index[feature.name]] = feature.attributes[name]
+            self.columns[name] = values
+            self.types[name] = column_type(values)
+
+    def value(self, feature_name, attribute):
+        """
+        Returns the attribute of a feature, or None if it is not set.
+        """
+        if attribute not in self.columns or feature_name not in self.index:
+            return None
+        return self.columns[attribute][self.index[feature_name]]
+
+    def weights(self, function, attribute):
+        """
+        Returns the numeric weight of every row for an aggregate.
+
+        Raises:
+            ValueError: If the attribute is unknown or not numeric.
+        """
+        if function == "count":
+            return [1] * self.size
+        if attribute not in self.columns:
+            raise ValueError(f"Unknown feature attribute '{attribute}'.")
+        if self.types[attribute] == "string":
+            raise ValueError(f"Attribute '{attribute}' is not numeric and cannot be summed.")
+        return [value or 0 for value in self.columns[attribute]]
+
+    def aggregate(self, function, attribute, selected):
+        """
+        Computes an aggregate over one set of selected features.
+
+        Args:
+            function (str): "sum" or "count".
+            attribute (str): The attribute to sum, None for count.
+            selected (set): The names of the selected features.
+
+        Returns:
+            The aggregate value.
+        """
+        weights = self.weights(function, attribute)
+        rows = {self.index[name] for name in selected if name in self.index}
+        return sum(weights[row] for row in rows)
+
+
+def split_constraints(constraints):
+    """
+    Separates the purely propositional constraints from those with aggregates.
+
+    Args:
+        constraints (list): Constraints in propositional logic.
+
+    Returns:
+        tuple: (propositional constraint texts, aggregate constraint texts)
+    """
+    propositional, aggregate = [], []
+    for text in constraints:
+        (aggregate if expression_aggregates(parse_expression(text)) else propositional).append(text)
+    return propositional, aggregate
+
+
+class BatchEvaluator:
+    """
+    Checks many configurations against a list of constraints at once.
+
+    Args:
+        constraints (list): Constraint texts, may include aggregates.
+        table (AttributeTable): The attributes of the model.
+        use_numpy (bool): Use numpy if installed; False forces the bitset path.
+    """
+    def __init__(self, constraints, table, use_numpy=True):
+        self.table = table
+        self.texts = list(constraints)
+        self.expressions = [parse_expression(text) for text in self.texts]
+        self.use_numpy = use_numpy and load_numpy() is not None
+        self.weights = {}  # (function, attribute) -> weights, checked up front
+        for expression in self.expressions:
+            for node in expression_aggregates(expression):
+                key = (node[1], node[2])
+                if key not in self.weights:
+                    self.weights[key] = table.weights(*key)
+
+    def evaluate(self, configurations):
+        """
+        Evaluates all constraints for a batch of configurations.
+
+        Args:
+            configurations (list): Sets of selected feature names.
+
+        Returns:
+            list: For each configuration, True if it satisfies every constraint.
+        """
+        configurations = list(configurations)
+        if not configurations:
+            return []
+        if self.use_numpy:
+            return self.evaluate_numpy(configurations)
+        return self.evaluate_bitsets(configurations)
+
+    def accepts(self, configuration):
+        """
+        Checks a single configuration.
+        """
+        return self.evaluate([configuration])[0]
+
+    def violated(self, configuration):
+        """
+        Lists the constraints a single configuration violates, in their original order.
+        """
+        if self.accepts(configuration):
+            return []
+        return [text for text, expression in zip(self.texts, self.expressions)
+                if not evaluate_expression(expression, configuration, self.table)]
+
+    # numpy: a boolean matrix with one row per configuration
+
+    def evaluate_numpy(self, configurations):
+        np = load_numpy()
+        matrix = np.zeros((len(configurations), self.table.size), dtype=bool)
+        for position, configuration in enumerate(configurations):
+            rows = [self.table.index[name] for name in configuration if name in self.table.index]
+            matrix[position, rows] = True
+        empty = np.zeros(len(configurations), dtype=bool)
+        sums = {}
+
+        def evaluate(node):
+            kind = node[0]
+            if kind == "var":
+                row = self.table.index.get(node[1])
+                return matrix[:, row] if row is not None else empty
+            if kind == "const":
+                return np.full(len(configurations), node[1])
+            if kind == "aggregate":
+                key = (node[1], node[2])
+                if key not in sums:
+                    sums[key] = matrix @ np.asarray(self.weights[key], dtype=float)
+                return COMPARISON_OPERATORS[node[3]](sums[key], node[4])
+            if kind == "not":
+                return ~evaluate(node[1])
+            if kind == "and":
+                return np.logical_and.reduce([evaluate(operand) for operand in node[1]])
+            if kind == "or":
+                return np.logical_or.reduce([evaluate(operand) for operand in node[1]])
+            if kind == "implies":
+                return ~evaluate(node[1]) | evaluate(node[2])
+            return evaluate(node[1]) == evaluate(node[2])
+
+        valid = np.ones(len(configurations), dtype=bool)
+        for expression in self.expressions:
+            valid &= evaluate(expression)
+        return valid.tolist()
+
+    # Bitsets: one integer per feature, bit j set if configuration j selects it
+
+    def evaluate_bitsets(self, configurations):
+        full = (1 << len(configurations)) - 1
+        # Set the bits in byte buffers first, or-ing into a growing integer copies it every time
+        buffers = [bytearray((len(configurations) + 7) // 8) for _ in range(self.table.size)]
+        for position, configuration in enumerate(configurations):
+            offset, bit = divmod(position, 8)
+            for name in configuration:
+                row = self.table.index.get(name)
+                if row is not None:
+                    buffers[row][offset] |= 1 << bit
+        columns = [int.from_bytes(buffer, "little") for buffer in buffers]
+        comparisons = {}
+
+        def evaluate(node):
+            kind = node[0]
+            if kind == "var":
+                row = self.table.index.get(node[1])
+                return columns[row] if row is not None else 0
+            if kind == "const":
+                return full if node[1] else 0
+            if kind == "aggregate":
+                if node not in comparisons:
+                    comparisons[node] = self.compare_sums(node, columns, configurations, full)
+                return comparisons[node]
+            if kind == "not":
+                return full & ~evaluate(node[1])
+            if kind == "and":
+                result = full
+                for operand in node[1]:
+                    result &= evaluate(operand)
+                return result
+            if kind == "or":
+                result = 0
+                for operand in node[1]:
+                    result |= evaluate(operand)
+                return result
+            if kind == "implies":
+                return (full & ~evaluate(node[1])) | evaluate(node[2])
+            return full & ~(evaluate(node[1]) ^ evaluate(node[2]))
+
+        valid = full
+        for expression in self.expressions:
+            valid &= evaluate(expression)
+        return [bool(valid >> position & 1) for position in range(len(configurations))]
+
+    def compare_sums(self, node, columns, configurations, full):
+        """
+        Returns the bitset of configurations whose aggregate satisfies the comparison.
+        """
+        weights = self.weights[(node[1], node[2])]
+        comparison, bound = node[3], node[4]
+        if all(isinstance(weight, int) and weight >= 0 for weight in weights):
+            planes = sum_bit_planes(columns, weights)
+            return compare_bit_planes(planes, comparison, bound, full)
+
+        # Fractional or negative weights: one sum per configuration
+        compare = COMPARISON_OPERATORS[comparison]
+        result = 0
+        for position, configuration in enumerate(configurations):
+            rows = {self.table.index[name] for name in configuration if name in self.table.index}
+            if compare(sum(weights[row] for row in rows), bound):
+                result |= 1 << position
+        return result
+
+
+def sum_bit_planes(columns, weights):
+    """
+    Adds up non-negative integer weights for every configuration of a batch at once.
+
+    The result is kept as bit planes: plane b has bit j set if bit b of the sum
+    for configuration j is set. Each weighted column is added with a ripple
+    carry over the planes, so the cost grows with the number of features and
+    weight bits, not with the number of configurations.
+
+    Args:
+        columns (list): Bitset of each feature over the configurations.
+        weights (list): Non-negative integer weight of each feature.
+
+    Returns:
+        list: The bit planes of the sums, least significant first.
+    """
+    planes = []
+    for column, weight in zip(columns, weights):
+        if not column or not weight:
+            continue
+        bit = 0
+        while weight:
+            if weight & 1:
+                carry = column
+                position = bit
+                while carry:
+                    while position >= len(planes):
+                        planes.append(0)
+                    planes[position], carry = planes[position] ^ carry, planes[position] & carry
+                    position += 1
+            weight >>= 1
+            bit += 1
+    return planes
+
+
+def compare_bit_planes(planes, comparison, bound, full):
+    """
+    Compares the integer sums held in bit planes with a constant.
+
+    Returns:
+        int: The bitset of configurations whose sum satisfies the comparison.
+    """
+    if comparison in ("==", "!="):
+        if bound != math.floor(bound) or bound < 0:
+            equal = 0
+        else:
+            less, equal = bit_planes_below(planes, int(bound), full)
+        return equal if comparison == "==" else full & ~equal
+    # Integer sums: turn every comparison into "sum < limit" or its complement
+    if comparison == "<=":
+        limit, negate = math.floor(bound) + 1, False
+    elif comparison == "<":
+        limit, negate = math.ceil(bound), False
+    elif comparison == ">=":
+        limit, negate = math.ceil(bound), True
+    else:
+        limit, negate = math.floor(bound) + 1, True
+    if limit <= 0:
+        less = 0
+    else:
+        less, equal = bit_planes_below(planes, limit, full)
+    return full & ~less if negate else less
+
+
+def bit_planes_below(planes, limit, full):
+    """
+    Compares the sums in bit planes with a non-negative integer, most significant bit first.
+
+    Returns:
+        tuple: The bitsets of configurations whose sum is below and equal to the limit.
+    """
+    less, equal = 0, full
+    for position in range(max(len(planes), limit.bit_length()) - 1, -1, -1):
+        plane = planes[position] if position < len(planes) else 0
+        if limit >> position & 1:
+            less |= equal & ~plane
+            equal &= plane
+        else:
+            equal &= full & ~plane
+    return less & full, equal
@@ -0,0 +1,303 @@
+from boolean_expression import expression_variables, parse_expression
+from feature_model import group_bounds, group_kind
+from sat_solver import Solver
+from traversal import preorder
+
+# Groups allowing at most one member up to this size use pairwise exclusions, larger ones a counter
+PAIRWISE_LIMIT = 8
+
+
+class FeatureCNF:
+    """
+    A feature model encoded as clauses over integer variables.
+
+    Every concrete feature gets its own variable. Nodes created from <group>
+    elements share the variable of their parent, since the group is selected
+    exactly when its parent is.
+    """
+    def __init__(self):
+        self.num_vars = 0
+        self.variables = {}  # Feature or group name -> variable
+        self.names = {}  # Variable -> concrete feature name
+        self.features = []  # Concrete features in pre-order
+        self.clauses = []
+        self.origins = {}  # Clause index -> the relation it encodes, Tseitin definitions have none
+
+    def new_var(self):
+        self.num_vars += 1
+        return self.num_vars
+
+    def add_clause(self, clause, origin=None):
+        """
+        Adds a clause, remembering which relation of the model it encodes.
+
+        Args:
+            clause (list): The literals of the clause.
+            origin (tuple): The relation, e.g. ("mandatory", parent, child) or ("constraint", text).
+        """
+        if origin is not None:
+            self.origins[len(self.clauses)] = origin
+        self.clauses.append(clause)
+
+    def add_fact(self, clause, origin=None):
+        """
+        Adds a clause that may contain the constants True/False.
+
+        True satisfies the clause, so nothing is added; False literals are dropped.
+        """
+        if any(lit is True for lit in clause):
+            return
+        self.add_clause([lit for lit in clause if lit is not False], origin)
+
+    def define(self, clauses):
+        """
+        Adds Tseitin definitional clauses that may contain the constants True/False.
+        """
+        for clause in clauses:
+            if not any(lit is True for lit in clause):
+                self.clauses.append([lit for lit in clause if lit is not False])
+
+    def at_least(self, lits, bound):
+        """
+        Returns a literal that is true exactly when at least `bound` of the literals are.
+
+        Builds a sequential counter: register (i, j) says that at least j of the
+        first i literals are true. Only the registers that can still change the
+        final answer are created, so the encoding needs O(len(lits) * bound)
+        clauses instead of one clause per combination of literals.
+
+        Args:
+            lits (list): The literals to count.
+            bound (int): The required number of true literals.
+
+        Returns:
+            The literal, or True/False if the answer does not depend on the literals.
+        """
+        size = len(lits)
+        if bound <= 0:
+            return True
+        if bound > size:
+            return False
+        registers = {0: True}  # j -> literal for "at least j of the literals so far"
+        for i, lit in enumerate(lits, 1):
+            current = {0: True}
+            for j in range(max(1, bound - (size - i)), min(i, bound) + 1):
+                current[j] = self.count_register(registers.get(j, False), registers[j - 1], lit)
+            registers = current
+        return registers[bound]
+
+    def count_register(self, above, below, lit):
+        """
+        Defines r <-> above | (below & lit), the step of the sequential counter.
+        """
+        if above is True or below is False:
+            return above
+        if above is False and below is True:
+            return lit
+        r = self.new_var()
+        negate = lambda value: (not value) if isinstance(value, bool) else -value
+        self.define([[negate(above), r], [negate(below), -lit, r], [-r, above, lit], [-r, above, below]])
+        return r
+
+    def feature_vars(self):
+        """
+        Returns the variables of the concrete features in pre-order.
+        """
+        return [self.variables[feature.name] for feature in self.features]
+
+    def product(self, model):
+        """
+        Converts a solver model into the set of selected feature names.
+
+        Args:
+            model (list): The solver model, indexed by variable.
+
+        Returns:
+            frozenset: The names of the selected concrete features.
+        """
+        return frozenset(name for var, name in self.names.items() if model[var])
+
+    def to_solver(self):
+        """
+        Creates a solver loaded with the clauses of the model.
+        """
+        solver = Solver()
+        solver.ensure_vars(self.num_vars)
+        for clause in self.clauses:
+            solver.add_clause(clause)
+        return solver
+
+    # Cross-tree constraints
+
+    def add_constraint(self, text):
+        """
+        Adds a propositional cross-tree constraint.
+
+        Args:
+            text (str): The constraint, e.g. "Java -> Memory".
+
+        Raises:
+            ValueError: If the constraint does not parse or names a feature that is not in the model.
+        """
+        expression = parse_expression(text)
+        unknown = sorted(expression_variables(expression) - self.variables.keys())
+        if unknown:
+            raise ValueError(f"Unknown feature '{unknown[0]}' in constraint '{text}'")
+        self.add_expression(expression, ("constraint", text))
+
+    def add_expression(self, expression, origin=None):
+        if expression[0] == "and":
+            for operand in expression[1]:
+                self.add_expression(operand, origin)
+            return
+        if expression[0] == "implies":
+            expression = ("or", [("not", expression[1]), expression[2]])
+        operands = expression[1] if expression[0] == "or" else [expression]
+
+        clause = []
+        for operand in operands:
+            lit = self.encode(operand)
+            if lit is True:
+                return
+            if lit is not False:
+                clause.append(lit)
+        self.add_clause(clause, origin)
+
+    def encode(self, expression):
+        """
+        Encodes a sub-expression with Tseitin variables.
+
+        Returns:
+            The literal equivalent to the expression, or True/False for constants.
+        """
+        kind = expression[0]
+        if kind == "var":
+            if expression[1] not in self.variables:
+                raise ValueError(f"Unknown feature '{expression[1]}' in constraint")
+            return self.variables[expression[1]]
+        if kind == "const":
+            return expression[1]
+        if kind == "aggregate":
+            raise ValueError("Aggregate constraints over feature attributes cannot be encoded as clauses; "
+                             "check them with feature_attributes.BatchEvaluator.")
+        if kind == "not":
+            lit = self.encode(expression[1])
+            return (not lit) if isinstance(lit, bool) else -lit
+        if kind == "implies":
+            return self.encode(("or", [("not", expression[1]), expression[2]]))
+        if kind == "iff":
+            a, b = self.encode(expression[1]), self.encode(expression[2])
+            if isinstance(a, bool) and isinstance(b, bool):
+                return a == b
+            if isinstance(a, bool):
+                a, b = b, a
+            if isinstance(b, bool):
+                return a if b else -a
+            x = self.new_var()
+            self.clauses.extend([[-x, -a, b], [-x, a, -b], [x, a, b], [x, -a, -b]])
+            return x
+
+        # Conjunction or disjunction
+        absorbing = kind == "or"
+        neutral = not absorbing
+        lits = []
+        for operand in expression[1]:
+            lit = self.encode(operand)
+            if lit is absorbing:
+                return absorbing
+            if lit is not neutral:
+                lits.append(lit)
+        if not lits:
+            return neutral
+        if len(lits) == 1:
+            return lits[0]
+        x = self.new_var()
+        if kind == "and":
+            self.clauses.extend([-x, lit] for lit in lits)
+            self.clauses.append([x] + [-lit for lit in lits])
+        else:
+            self.clauses.extend([x, -lit] for lit in lits)
+            self.clauses.append([-x] + lits)
+        return x
+
+
+def encode_feature_model(root_feature, constraints=()):
+    """
+    Encodes the feature tree and its cross-tree constraints as CNF.
+
+    The root is always selected, every feature implies its parent, a mandatory
+    feature is implied by its parent, and the children of an XOR/OR group need
+    exactly one/at least one member selected when the parent is. Cardinality
+    groups [m..n] use sequential counters, so their size stays linear in the
+    number of members times the bound. The mandatory flag is ignored for group
+    members, since it would contradict the group.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints in propositional logic.
+
+    Returns:
+        FeatureCNF: The encoded model.
+    """
+    cnf = FeatureCNF()
+    stack = [(root_feature, None)]
+    while stack:
+        feature, parent = stack.pop()
+        if feature.is_group and parent is not None:
+            var = cnf.variables[parent.name]
+            cnf.variables.setdefault(feature.name, var)
+        elif feature.name in cnf.variables:
+            var = cnf.variables[feature.name]
+        else:
+            var = cnf.new_var()
+            cnf.variables[feature.name] = var
+            cnf.names[var] = feature.name
+            cnf.features.append(feature)
+
+        if parent is None:
+            cnf.add_clause([var], ("root", feature.name))
+        else:
+            parent_var = cnf.variables[parent.name]
+            if parent_var != var:
+                parent_name = cnf.names[parent_var]
+                cnf.add_clause([-var, parent_var], ("parent", feature.name, parent_name))
+                if feature.mandatory and group_kind(parent) is None:
+                    cnf.add_clause([-parent_var, var], ("mandatory", parent_name, feature.name))
+
+        for child in reversed(feature.children):
+            stack.append((child, feature))
+
+    # Groups are added once all child variables exist
+    for feature in cnf.features + list(_group_nodes(root_feature)):
+        kind = group_kind(feature)
+        if kind is None:
+            continue
+        var = cnf.variables[feature.name]
+        members = [cnf.variables[child.name] for child in feature.children if not child.is_group]
+        if not members:
+            continue
+        low, high = group_bounds(feature)
+        origin = (kind, cnf.names[var], tuple(cnf.names[member] for member in members))
+        if kind == "card":
+            origin += (low, high)
+
+        # At least `low` members when the parent is selected
+        if low == 1:
+            cnf.add_clause([-var] + members, origin)
+        elif low > 1:
+            cnf.add_fact([-var, cnf.at_least(members, low)], origin)
+        # At most `high` members, that is at least the rest deselected
+        if high == 1 and len(members) <= PAIRWISE_LIMIT:
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    cnf.add_clause([-a, -b], origin)
+        elif high < len(members):
+            cnf.add_fact([cnf.at_least([-member for member in members], len(members) - high)], origin)
+
+    for constraint in constraints:
+        cnf.add_constraint(constraint)
+    return cnf
+
+
+def _group_nodes(root_feature):
+    return (feature for feature in preorder(root_feature) if feature.is_group)
@@ -1,15 +1,23 @@
 import xml.etree.ElementTree as ET
 
+from traversal import preorder_edges
+
 class Feature:
     """
     Represents a feature in the feature model.
     """
-    def __init__(self, name, mandatory=False, children=None,group_type=None,parent=None):
+    def __init__(self, name, mandatory=False, children=None,group_type=None,parent=None,is_group=False,cost=None,attributes=None,cardinality=None):
         self.name = name
         self.mandatory = mandatory
-        self.group_type = group_type  # Group type can be "XOR", "OR", or None
+        self.group_type = group_type  # Group type can be "XOR", "OR", "card" or None
+        # (min, max) members of a "card" group, or the feature cardinality; max None is unbounded
+        self.cardinality = cardinality
         self.parent = parent
         self.children = children or []
+        self.is_group = is_group  # True for the node created from a <group> element
+        self.cost = cost  # Optional cost attribute, None if not given in the XML
+        self.attributes = attributes or {}  # Typed attributes from the XML, e.g. {"memory": 64}
+        self.node_id = None  # Stable id assigned when the model is registered
 
     def add_child(self, feature):
         """
@@ -32,7 +40,48 @@ def print_feature_hierarchy(feature, depth=0):
         feature (Feature): The current feature.
         depth (int): The level of indentation for child features.
     """
-    indent = "  " * depth
-    print(f"{indent}- {feature.name} (Mandatory: {feature.mandatory}, Group Type: {feature.group_type})")
-    for child in feature.children:
-        print_feature_hierarchy(child, depth + 1)
\ No newline at end of file
+    for node, parent, level in preorder_edges(feature):
+        indent = "  " * (depth + level)
+        print(f"{indent}- {node.name} (Mandatory: {node.mandatory}, Group Type: {node.group_type})")
+
+
+def group_kind(feature):
+    """
+    Returns the kind of group formed by the children of a feature.
+
+    Args:
+        feature (Feature): The feature whose children are checked.
+
+    Returns:
+        str: "xor", "or" or "card" if the children form a group, otherwise None.
+    """
+    kind = (feature.group_type or "").lower()
+    if kind in ("xor", "or", "card") and feature.children:
+        return kind
+    return None
+
+
+def group_bounds(feature):
+    """
+    Returns how many members of a group must be selected when its parent is.
+
+    XOR groups are [1..1] and OR groups [1..n]; cardinality groups give their
+    own bounds, with an unbounded or too large maximum clipped to the number
+    of members.
+
+    Args:
+        feature (Feature): The feature whose children are checked.
+
+    Returns:
+        tuple: (min, max), or None if the children do not form a group.
+    """
+    kind = group_kind(feature)
+    if kind is None:
+        return None
+    size = sum(1 for child in feature.children if not child.is_group)
+    if kind == "xor":
+        return (1, 1)
+    if kind == "or":
+        return (1, size)
+    low, high = feature.cardinality or (0, None)
+    return (low, size if high is None else min(high, size))
@@ -0,0 +1,11 @@
+# Gunicorn settings for serving wsgi:app, see wsgi.py for details.
+import os
+
+bind = os.environ.get("FM_BIND", "127.0.0.1:5000")
+
+# Models are cached per process, so one worker with a thread pool is the default
+workers = int(os.environ.get("FM_WORKERS", "1"))
+threads = int(os.environ.get("FM_THREADS", "8"))
+worker_class = "gthread"
+
+timeout = int(os.environ.get("FM_TIMEOUT", "60"))
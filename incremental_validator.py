@@ -0,0 +1,364 @@
+"""
+Revalidates a feature selection incrementally as single features are toggled.
+
+Every relation of the tree is owned by one feature: its groups and mandatory
+children, whether its selected children have it selected too, and for the
+root that it is selected. The validator keeps, for every feature, how many of
+its own relations are violated and how many are violated in its whole
+subtree, together with the number of selected members of each group. A toggle
+only changes the counters of the feature and of its parent, so the two are
+re-checked and the change is carried up the path to the root. Cross-tree
+constraints are found through an index from feature names to constraints, and
+sums over feature attributes are kept as running totals. A toggle therefore
+costs O(depth + affected constraints) instead of a pass over the model.
+"""
+import threading
+import uuid
+
+from boolean_expression import evaluate_expression, expression_aggregates, expression_variables, parse_expression
+from feature_attributes import AttributeTable
+from feature_model import group_bounds, group_kind
+
+
+class ModelError(ValueError):
+    """
+    Raised when the constraints of a model cannot be checked, whatever the selection.
+    """
+
+
+class IncrementalValidator:
+    """
+    The validity of one selection of a feature model, kept up to date across toggles.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints in propositional logic, may include aggregates.
+        selected (iterable): The names of the initially selected features.
+
+    Raises:
+        ModelError: If a constraint does not parse, or names an unknown feature or attribute.
+        ValueError: If a selected name is neither a feature nor a group of the model.
+    """
+    def __init__(self, root_feature, constraints=(), selected=()):
+        self.root = root_feature
+        self.nodes = {}  # Feature name -> concrete Feature nodes with that name
+        self.group_names = set()
+        self.order = {}  # Feature node -> pre-order position, to list messages in tree order
+        self.parent = {}  # Feature node -> concrete parent node, None for the root
+        self.block = {}  # Feature node -> the node whose children it is a member of
+        self.blocks = {}  # Feature node -> its nodes with concrete members (itself and its groups)
+        self.bounds = {}  # Block node -> (min, max) selected members, None if only mandatory members count
+        self.members = {}  # Block node -> concrete member nodes
+
+        stack = [(root_feature, None)]
+        while stack:
+            feature, owner = stack.pop()
+            if feature.is_group:
+                self.group_names.add(feature.name)
+            else:
+                self.order[feature] = len(self.order)
+                self.nodes.setdefault(feature.name, []).append(feature)
+                self.parent[feature] = owner
+                self.blocks[feature] = []
+                owner = feature
+            members = [child for child in feature.children if not child.is_group]
+            if members:
+                self.blocks[owner].append(feature)
+                self.bounds[feature] = group_bounds(feature)
+                self.members[feature] = members
+                for member in members:
+                    self.block[member] = feature
+            stack.extend((child, owner) for child in reversed(feature.children))
+
+        self.texts = list(constraints)
+        try:
+            self.expressions = [parse_expression(text) for text in self.texts]
+        except ValueError as error:
+            raise ModelError(str(error)) from error
+        self.index = {}  # Feature name -> ids of the propositional constraints mentioning it
+        self.aggregate_ids = []
+        for position, expression in enumerate(self.expressions):
+            names = expression_variables(expression)
+            unknown = sorted(name for name in names if name not in self.nodes and name not in self.group_names)
+            if unknown:
+                raise ModelError(f"Unknown feature '{unknown[0]}' in constraint '{self.texts[position]}'")
+            if expression_aggregates(expression):
+                self.aggregate_ids.append(position)
+            else:
+                for name in names:
+                    self.index.setdefault(name, []).append(position)
+        self.table = AttributeTable(root_feature) if self.aggregate_ids else None
+        self.weights = {}  # (function, attribute) -> weight of every attribute table row
+        for position in self.aggregate_ids:
+            for node in expression_aggregates(self.expressions[position]):
+                key = (node[1], node[2])
+                if key not in self.weights:
+                    try:
+                        self.weights[key] = self.table.weights(*key)
+                    except ValueError as error:
+                        raise ModelError(str(error)) from error
+
+        self.set_selection(selected)
+
+    def set_selection(self, selected):
+        """
+        Replaces the whole selection and recomputes every summary in one pass over the model.
+
+        Raises:
+            ValueError: If a name is neither a feature nor a group of the model.
+        """
+        selected = set(selected) - self.group_names
+        unknown = selected - self.nodes.keys()
+        if unknown:
+            raise ValueError(f"Unknown feature '{sorted(unknown)[0]}'")
+        self.selected = selected
+        self.selected_members = {block: sum(member.name in selected for member in members)
+                                 for block, members in self.members.items()}
+        # Mandatory members only count outside groups
+        self.missing_mandatory = {
+            block: sum(member.mandatory and member.name not in selected for member in members)
+            for block, members in self.members.items() if self.bounds[block] is None
+        }
+
+        self.local = {}  # Feature node -> number of its own violated relations, only if not 0
+        self.subtree = dict.fromkeys(self.order, 0)  # Feature node -> violated relations in its subtree
+        for feature in sorted(self.order, key=self.order.get, reverse=True):
+            count = self.local_violations(feature)
+            if count:
+                self.local[feature] = count
+            self.subtree[feature] += count
+            if self.parent[feature] is not None:
+                self.subtree[self.parent[feature]] += self.subtree[feature]
+
+        self.totals = {key: 0 for key in self.weights}
+        for name in selected:
+            self.add_weights(name, 1)
+        self.violated = {position for position, expression in enumerate(self.expressions)
+                         if not evaluate_expression(expression, self.selected, self)}
+
+    def local_violations(self, feature):
+        """
+        Counts the violated relations owned by a feature.
+        """
+        selected = feature.name in self.selected
+        count = 0
+        if self.parent[feature] is None and not selected:
+            count += 1
+        for block in self.blocks[feature]:
+            members = self.selected_members[block]
+            bounds = self.bounds[block]
+            if not selected:
+                count += members > 0
+            elif bounds is not None:
+                count += not bounds[0] <= members <= bounds[1]
+            else:
+                count += self.missing_mandatory[block] > 0
+        return count
+
+    def refresh(self, feature):
+        """
+        Re-checks the relations of a feature and carries the change up to the root.
+        """
+        count = self.local_violations(feature)
+        delta = count - self.local.get(feature, 0)
+        if not delta:
+            return
+        if count:
+            self.local[feature] = count
+        else:
+            del self.local[feature]
+        while feature is not None:
+            self.subtree[feature] += delta
+            feature = self.parent[feature]
+
+    def add_weights(self, name, sign):
+        row = self.table.index.get(name) if self.table is not None else None
+        if row is not None:
+            for key, weights in self.weights.items():
+                self.totals[key] += sign * weights[row]
+
+    def aggregate(self, function, attribute, selected):
+        """
+        Returns the running total of an aggregate, so evaluate_expression can use the validator as its attributes.
+        """
+        return self.totals[(function, attribute)]
+
+    def toggle(self, name, selected=None):
+        """
+        Selects or deselects one feature and revalidates what depends on it.
+
+        Args:
+            name (str): The name of the feature. Group names are ignored, a group
+                        is selected with the feature it belongs to.
+            selected (bool): The new state, or None to flip the current one.
+
+        Returns:
+            bool: True if the selection changed.
+
+        Raises:
+            ValueError: If the name is neither a feature nor a group of the model.
+        """
+        if name not in self.nodes:
+            if name in self.group_names:
+                return False
+            raise ValueError(f"Unknown feature '{name}'")
+        was_selected = name in self.selected
+        if selected is None:
+            selected = not was_selected
+        if selected == was_selected:
+            return False
+
+        sign = 1 if selected else -1
+        if selected:
+            self.selected.add(name)
+        else:
+            self.selected.discard(name)
+        for feature in self.nodes[name]:
+            block = self.block.get(feature)
+            if block is not None:
+                self.selected_members[block] += sign
+                if feature.mandatory and self.bounds[block] is None:
+                    self.missing_mandatory[block] -= sign
+            self.refresh(feature)
+            if block is not None:
+                self.refresh(self.parent[feature])
+
+        self.add_weights(name, sign)
+        for position in self.index.get(name, []) + self.aggregate_ids:
+            if evaluate_expression(self.expressions[position], self.selected, self):
+                self.violated.discard(position)
+            else:
+                self.violated.add(position)
+        return True
+
+    def update(self, changes):
+        """
+        Applies several toggles.
+
+        Args:
+            changes (dict): Feature name -> True to select it, False to deselect it.
+
+        Returns:
+            list: The names whose selection changed.
+
+        Raises:
+            ValueError: If a name is neither a feature nor a group of the model,
+                        or a state is not a bool; nothing is changed then.
+        """
+        for name, selected in changes.items():
+            if name not in self.nodes and name not in self.group_names:
+                raise ValueError(f"Unknown feature '{name}'")
+            if not isinstance(selected, bool):
+                raise ValueError(f"The state of '{name}' must be True or False, not {selected!r}")
+        return [name for name, selected in changes.items() if self.toggle(name, selected)]
+
+    def is_valid(self):
+        return self.subtree[self.root] == 0 and not self.violated
+
+    def subtree_valid(self, name):
+        """
+        Returns True if no relation inside the subtree of the named feature is violated.
+        """
+        return all(self.subtree[feature] == 0 for feature in self.nodes[name])
+
+    def feature_messages(self, feature):
+        """
+        Describes the violated relations owned by a feature.
+        """
+        messages = []
+        selected = feature.name in self.selected
+        if self.parent[feature] is None and not selected:
+            messages.append(f"The root feature {feature.name} must be selected.")
+        for block in self.blocks[feature]:
+            members = self.members[block]
+            bounds = self.bounds[block]
+            if not selected:
+                messages.extend(f"{member.name} is selected without its parent {feature.name}."
+                                for member in members if member.name in self.selected)
+            elif bounds is not None and not bounds[0] <= self.selected_members[block] <= bounds[1]:
+                kind = group_kind(block)
+                if kind == "xor":
+                    messages.append(f"Invalid XOR group: {feature.name} requires exactly one child to be selected.")
+                elif kind == "or":
+                    messages.append(f"Invalid OR group: {feature.name} requires one child to be selected.")
+                else:
+                    messages.append(f"Invalid group: {feature.name} requires between {bounds[0]} and "
+                                    f"{bounds[1]} children to be selected.")
+            elif bounds is None:
+                messages.extend(f"Missing mandatory node: {member.name}"
+                                for member in members if member.mandatory and member.name not in self.selected)
+        return messages
+
+    def result(self):
+        """
+        Describes the current selection like validate_tree_configuration does.
+
+        Returns:
+            dict: isValid, the messages, and the features whose own relations are violated.
+        """
+        invalid = sorted(self.local, key=self.order.get)
+        messages = [message for feature in invalid for message in self.feature_messages(feature)]
+        for position in sorted(self.violated):
+            kind = "Attribute constraint" if position in self.aggregate_ids else "Constraint"
+            messages.append(f"{kind} violated: {self.texts[position]}")
+        return {
+            "isValid": self.is_valid(),
+            "messages": messages,
+            "invalidFeatures": list(dict.fromkeys(feature.name for feature in invalid)),
+        }
+
+
+class ValidationSession:
+    """
+    The validator of one client working on one model version.
+    """
+    def __init__(self, session_id, model_id, version, validator):
+        self.session_id = session_id
+        self.model_id = model_id
+        self.version = version
+        self.validator = validator
+        self.lock = threading.Lock()  # Toggles of one client may arrive on several request threads
+
+
+class ValidationSessions:
+    """
+    Keeps the validators of recently active clients, shared by the request threads of a worker.
+    """
+    def __init__(self, max_sessions=256):
+        self.max_sessions = max_sessions
+        self.sessions = {}  # Ordered from least to most recently used
+        self.lock = threading.Lock()
+
+    def start(self, parsed, selected):
+        """
+        Starts a session on a stored model version.
+
+        Args:
+            parsed (ModelVersion): The model version from the registry.
+            selected (iterable): The names of the selected features.
+
+        Returns:
+            ValidationSession: The new session.
+
+        Raises:
+            ModelError: If the constraints of the model cannot be checked.
+            ValueError: If a selected name is not in the model.
+        """
+        validator = IncrementalValidator(parsed.root, parsed.constraints, selected)
+        session = ValidationSession(uuid.uuid4().hex, parsed.model_id, parsed.version, validator)
+        with self.lock:
+            self.sessions[session.session_id] = session
+            # Forget the clients that have been idle the longest
+            while len(self.sessions) > self.max_sessions:
+                del self.sessions[next(iter(self.sessions))]
+        return session
+
+    def get(self, session_id):
+        """
+        Looks up a session, or returns None if it is unknown or was evicted.
+        """
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+            if session is not None:
+                self.sessions[session_id] = session
+            return session
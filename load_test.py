@@ -0,0 +1,146 @@
+"""
+Load test for the feature model backend.
+
+Starts the Flask app in-process on a threaded WSGI server (or targets an
+already running server with --url) and hammers /parse-xml and
+/validate-configuration from concurrent clients. The app gets a static
+translation client so the test never reaches the network.
+
+Every client uploads its own model and checks that the response describes that
+model, so requests interfering with each other show up as errors.
+
+Usage:
+    python load_test.py --clients 16 --requests 200
+    python load_test.py --url http://127.0.0.1:5000 --clients 32
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def make_model_xml(client, width=5):
+    """
+    Builds a small feature model whose names are unique to one client.
+
+    Args:
+        client (int): The client index.
+        width (int): The number of optional features under the root.
+
+    Returns:
+        str: The XML document.
+    """
+    root = f"Root{client}"
+    features = "".join(f'<feature name="F{client}x{i}"/>' for i in range(width))
+    group = "".join(f'<feature name="G{client}x{i}"/>' for i in range(3))
+    return (
+        f'<featureModel><feature name="{root}">'
+        f'<feature name="Base{client}" mandatory="true"/>{features}'
+        f'<feature name="Choice{client}"><group type="xor">{group}</group></feature>'
+        f'</feature><constraints><constraint>'
+        f'<booleanExpression>F{client}x0 -> Base{client}</booleanExpression>'
+        f'</constraint></constraints></featureModel>'
+    )
+
+
+def post_json(url, payload):
+    """
+    Sends a JSON POST request and decodes the JSON response.
+    """
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def run_client(base_url, client, requests_per_client, latencies, errors):
+    """
+    Alternates parse and validation requests for one client and records latencies.
+    """
+    xml = make_model_xml(client)
+    validation = {
+        "mandatory": [f"Base{client}"],
+        "or": {},
+        "xor": {f"Choice{client}": [f"G{client}x{i}" for i in range(3)]},
+        "and": {},
+        "selected": {"mandatory": {"0": f"Base{client}"}, "xor": {f"Choice{client}": [f"G{client}x0"]}},
+    }
+    for i in range(requests_per_client):
+        endpoint = "/parse-xml" if i % 2 == 0 else "/validate-configuration"
+        payload = {"xml": xml} if endpoint == "/parse-xml" else validation
+        start = time.perf_counter()
+        try:
+            result = post_json(base_url + endpoint, payload)
+            if endpoint == "/parse-xml" and result["treeData"]["label"] != f"Root{client}":
+                errors.append(f"client {client} received the model of another request")
+            if endpoint == "/validate-configuration" and not result.get("isValid"):
+                errors.append(f"client {client} got an invalid result: {result.get('messages')}")
+        except (urllib.error.URLError, KeyError, ValueError) as e:
+            errors.append(f"client {client} {endpoint}: {e}")
+        latencies.append(time.perf_counter() - start)
+
+
+def start_local_server():
+    """
+    Serves the backend with a static translation client on a free local port.
+
+    Returns:
+        tuple: The base URL and the server, which must be shut down by the caller.
+    """
+    from werkzeug.serving import make_server
+
+    from backend import create_app
+    from translation_clients import StaticTranslationClient
+
+    app = create_app(translation_client=StaticTranslationClient())
+    # Per-request access logs would dominate the output
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the feature model backend.")
+    parser.add_argument("--url", help="Base URL of a running server (default: start one in-process)")
+    parser.add_argument("--clients", type=int, default=16, help="Number of concurrent clients")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per client")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        base_url, server = start_local_server()
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        for client in range(args.clients):
+            pool.submit(run_client, base_url, client, args.requests, latencies, errors)
+    elapsed = time.perf_counter() - start
+
+    if server is not None:
+        server.shutdown()
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"Requests:   {total} in {elapsed:.2f}s ({total / elapsed:.1f} req/s)")
+    print(f"Latency:    p50 {latencies[total // 2] * 1000:.1f} ms, "
+          f"p95 {latencies[int(total * 0.95)] * 1000:.1f} ms, "
+          f"max {latencies[-1] * 1000:.1f} ms")
+    print(f"Errors:     {len(errors)}")
+    for error in errors[:10]:
+        print(f"  {error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,54 +1,126 @@
+from boolean_expression import expression_variables, parse_expression
+from feature_model import group_bounds, group_kind
+from traversal import preorder_edges
+
+CATEGORIES = ("root", "mandatory", "children_to_parent", "xor", "or", "card", "constraints")
+
+
+class LogicClause:
+    """
+    A single propositional relationship of the feature model.
+
+    Clauses keep the feature names they relate instead of a formatted string,
+    so analyses can use them directly; `render` produces the text on demand.
+    """
+    __slots__ = ("category", "source", "targets", "bounds")
+
+    def __init__(self, category, source, targets=(), bounds=None):
+        self.category = category  # One of CATEGORIES
+        self.source = source  # The feature the relationship starts from
+        self.targets = tuple(targets)  # The implied feature(s), in order
+        self.bounds = bounds  # (min, max) selected targets of a "card" group
+
+    def features(self):
+        """
+        Returns the names of all features in the clause.
+        """
+        return (self.source,) + self.targets
+
+    def render(self):
+        """
+        Formats the clause as propositional logic text.
+        """
+        if self.category == "root":
+            return f"{self.source}"
+        if self.category == "or":
+            or_logic = " | ".join(self.targets)
+            return f"{self.source} -> ({or_logic})"
+        if self.category == "xor":
+            xor_logic = " | ".join(
+                f"({a} & " + " & ".join(f"!{b}" for b in self.targets if b != a) + ")"
+                for a in self.targets
+            )
+            return f"{self.source} -> ({xor_logic})"
+        if self.category == "card":
+            # Spelled as a count, listing every allowed combination would not scale
+            low, high = self.bounds
+            return f"{self.source} -> [{low}..{high}]({', '.join(self.targets)})"
+        return f"{self.source} -> {self.targets[0]}"
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return f"LogicClause({self.category}, {self.source}, {list(self.targets)})"
+
+
+def render_clause(clause):
+    """
+    Formats a clause as text; constraints given as strings are returned unchanged.
+    """
+    return clause if isinstance(clause, str) else clause.render()
+
+
+def clause_features(clause):
+    """
+    Returns the feature names used by a clause.
+
+    Args:
+        clause (LogicClause | str): A structured clause or a constraint string.
+
+    Returns:
+        tuple: The feature names in the clause.
+    """
+    if not isinstance(clause, str):
+        return clause.features()
+    try:
+        return tuple(expression_variables(parse_expression(clause)))
+    except ValueError:
+        # Not a formula we understand, fall back to the names around implications
+        return tuple(part for part in clause.split(" -> ") if part.isalnum())
+
+
 def translate_to_logic(feature, parent_name=None, logic=None):
     """
     Translates the feature model into a propositional logic formula with structured formatting.
 
+    The tree is walked once in pre-order, without recursion, and every relationship is recorded as
+    a LogicClause. Cross-tree constraints can be added to the "constraints"
+    category as plain strings. Use format_and_print_logic (or render_clause) to
+    get the text form.
+
     Args:
         feature (Feature): The current feature being processed.
         parent_name (str): The name of the parent feature.
         logic (dict): A dictionary to hold categorized propositional logic.
 
     Returns:
-        dict: A dictionary containing propositional logic formulas organized by categories.
+        dict: A dictionary containing LogicClause lists organized by categories.
     """
     if logic is None:
         # Initialize the logic dictionary with categories
-        logic = {
-            "root": [],
-            "mandatory": [],
-            "children_to_parent": [],
-            "xor": [],
-            "or": [],
-            "constraints": [],
-        }
+        logic = {category: [] for category in CATEGORIES}
 
     # Add root feature logic
     if parent_name is None:
-        logic["root"].append(f"{feature.name}")
+        logic["root"].append(LogicClause("root", feature.name))
+
+    for child, parent, depth in preorder_edges(feature):
+        if parent is None:
+            continue
 
-    # Process child features
-    for child in feature.children:
         # Mandatory relationships
         if child.mandatory:
-            logic["mandatory"].append(f"{feature.name} -> {child.name}")
-            logic["children_to_parent"].append(f"{child.name} -> {feature.name}")
-        else:
-            logic["children_to_parent"].append(f"{child.name} -> {feature.name}")
-
-        # OR Group
-        if child.group_type == "or":
-            or_logic = " | ".join(c.name for c in child.children)
-            logic["or"].append(f"{child.name} -> ({or_logic})")
-
-        # XOR Group
-        if child.group_type == "xor":
-            xor_logic = " | ".join(
-                f"({a.name} & " + " & ".join(f"!{b.name}" for b in child.children if b != a) + ")"
-                for a in child.children
-            )
-            logic["xor"].append(f"{child.name} -> ({xor_logic})")
+            logic["mandatory"].append(LogicClause("mandatory", parent.name, [child.name]))
+        logic["children_to_parent"].append(LogicClause("children_to_parent", child.name, [parent.name]))
 
-        # Recurse for child features
-        translate_to_logic(child, feature.name, logic)
+        # OR / XOR / cardinality group
+        if child.group_type in ("or", "xor"):
+            members = [c.name for c in child.children]
+            logic[child.group_type].append(LogicClause(child.group_type, child.name, members))
+        elif group_kind(child) == "card":
+            members = [c.name for c in child.children]
+            logic["card"].append(LogicClause("card", child.name, members, group_bounds(child)))
 
     return logic
 
@@ -60,23 +132,29 @@ def format_and_print_logic(logic):
     Args:
         logic (dict): A dictionary containing categorized propositional logic formulas.
     """
+    def rendered(category):
+        return " &\n".join(render_clause(clause) for clause in logic[category])
+
     print("//root")
-    print(" &\n".join(logic["root"]) + " &")
+    print(rendered("root") + " &")
 
     print("\n//mandatory children")
-    print(" &\n".join(logic["mandatory"]) + " &")
+    print(rendered("mandatory") + " &")
 
     print("\n//children -> parent")
-    print(" &\n".join(logic["children_to_parent"]) + " &")
+    print(rendered("children_to_parent") + " &")
 
     print("\n//xor")
-    print(" &\n".join(logic["xor"]) + " &")
+    print(rendered("xor") + " &")
 
     print("\n//or")
-    print(" &\n".join(logic["or"]) + " &")
+    print(rendered("or") + " &")
+
+    print("\n//cardinality groups")
+    print(rendered("card") + " &")
 
 
     print("\n//constraints")
-    print(" &\n".join(logic["constraints"]))
+    print(rendered("constraints"))
 
     
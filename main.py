@@ -1,13 +1,17 @@
+from feature_attributes import split_constraints
 from logic_translator import format_and_print_logic, translate_to_logic
-from mwp_calculator import calculate_mwp
+from model_simplifier import simplify_model
+from mwp_optimizer import find_minimum_products
+from product_counter import count_products
 from xml_parser import create_feature_model, load_and_parse_xml
 from feature_model import print_feature_hierarchy
 from xml_parser import load_and_parse_xml, parse_constraints
+from traversal import preorder
 import os
 
 def get_mandatory_features(root_feature):
     """
-    Recursively gets all mandatory features from the feature model.
+    Gets all mandatory features from the feature model.
 
     Args:
         root_feature (Feature): The root feature of the feature model.
@@ -15,18 +19,7 @@ def get_mandatory_features(root_feature):
     Returns:
         set: A set of mandatory feature names.
     """
-    mandatory_features = set()
-
-    def recurse_features(feature):
-        if feature.mandatory:
-            mandatory_features.add(feature.name)
-        
-        # Recurse into children
-        for child in feature.children:
-            recurse_features(child)
-    
-    recurse_features(root_feature)
-    return mandatory_features
+    return {feature.name for feature in preorder(root_feature) if feature.mandatory}
 
 def main():
  # Step 1: Load and Parse the feature model from XML
@@ -111,13 +104,38 @@ def main():
     mandatory_features = get_mandatory_features(root_feature)
     print("Mandatory Features:", mandatory_features)
 
-     # Step 5: Calculate Minimum Working Product
-    print("\nCalculating Minimum Working Products (MWPs)...")
-    
-    mwps = calculate_mwp(logic, mandatory_features)
+    # Count the valid products on the feature tree, without enumerating them
+    try:
+        print("Number of valid products:", count_products(root_feature, logic["constraints"]))
+    except ValueError as e:
+        print(f"Could not count the products: {e}")
+
+    # Shrink the problem before the search: core, dead and equivalent features are merged away
+    # Aggregates over feature attributes have no clauses, the optimizer checks them on each product
+    # A constraint that does not parse or names an unknown feature stops the search, not the program
+    try:
+        propositional, aggregates = split_constraints(logic["constraints"])
+        if aggregates:
+            print("Attribute constraints:", aggregates)
+        simplified = simplify_model(root_feature, propositional)
+        if simplified.void:
+            print("The feature model has no valid products.")
+        else:
+            print("Simplified model:", simplified.summary())
+            for atomic_set in simplified.atomic_sets():
+                print("  Always selected together:", ", ".join(atomic_set))
+
+         # Step 5: Calculate Minimum Working Product
+        print("\nCalculating Minimum Working Products (MWPs)...")
+
+        mwps = find_minimum_products(root_feature, logic["constraints"], k=15, simplified=simplified)
+    except ValueError as e:
+        print(f"Could not calculate the Minimum Working Products, check the constraints: {e}")
+        mwps = None
 
     # Step 6: Display the MWP results
-    format_mwp_results(mwps,  logic["root"] )
+    if mwps is not None:
+        format_mwp_results(mwps)
 
     # Step 8: Display MWPs
     # print("\nMinimum Working Products (MWPs):")
@@ -131,30 +149,18 @@ def main():
     print("Feature Model Hierarchy:")
     print_feature_hierarchy(root_feature)
 
-def format_mwp_results(mwps, root):
-
-    unique_mwps = []
-    for mwp in mwps:
-        if mwp not in unique_mwps:
-            unique_mwps.append(mwp)
+def format_mwp_results(mwps):
+    """
+    Prints the minimum working products, cheapest first.
 
+    Args:
+        mwps (list): (cost, product) tuples as returned by find_minimum_products.
+    """
     print("\nCalculated Minimum Working Products (MWPs):")
-    # for idx, mwp in enumerate(mwps, start=1):
-    #     print(f"MWP {idx}: {', '.join(sorted(mwp))}")
-        # print(f"MWP {idx}: {sorted(mwp)}")
-    count=0
-    # get the first word in the first mwp in mwps
-    # rootValue = list(sorted(mwps[0]))[0]
-
-    for index, mwp in enumerate(unique_mwps, start=int(len(unique_mwps)*.8)):
-    # for index, mwp in enumerate(unique_mwps, start=1):
-        # if mwp contains the root, print it
-        if root[0] in mwp:
-            print(f"MWP {count+1}: {', '.join(sorted(mwp))}")
-            # print(f"MWP {index}: {', '.join(sorted(mwp))}")
-            count+=1
-        if count == 15:
-            break
+    if not mwps:
+        print("No valid MWPs found.")
+    for index, (cost, mwp) in enumerate(mwps, start=1):
+        print(f"MWP {index} ({cost:g} features): {', '.join(sorted(mwp))}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,226 @@
+"""
+Semantic diff between two versions of a feature model.
+
+Compares the sets of valid products of two models without enumerating them:
+the features are aligned by name, and SAT calls look for products of one
+model that the other model rejects. The edit is then classified as
+
+- refactoring: both models have the same products,
+- generalization: every old product is still valid and new ones were added,
+- specialization: no product was added, but some were removed,
+- arbitrary: products were both added and removed.
+
+A feature that only exists in one model is treated as deselected in every
+product of the other one. Aggregate constraints over feature attributes
+have no clauses, so models that use them cannot be compared this way.
+
+Usage:
+    python model_diff.py old.xml new.xml --examples 5
+"""
+import argparse
+
+from feature_attributes import split_constraints
+from feature_cnf import encode_feature_model
+from sat_solver import Solver
+from xml_parser import load_and_parse_xml, parse_constraints
+
+
+class AlignedClauses:
+    """
+    Clauses of several models over one shared numbering, features aligned by name.
+    """
+    def __init__(self):
+        self.num_vars = 0
+        self.variables = {}  # Feature name -> shared variable
+        self.definitions = []  # Tseitin definitions of every model, they hold in every query
+
+    def new_var(self):
+        self.num_vars += 1
+        return self.num_vars
+
+    def feature_var(self, name):
+        if name not in self.variables:
+            self.variables[name] = self.new_var()
+        return self.variables[name]
+
+    def add_model(self, cnf, universe):
+        """
+        Loads the Tseitin definitions of a model and returns its top-level clauses.
+
+        The definitions only name sub-expressions, so they can hold in every
+        query. The returned clauses, which must all hold for a product to be
+        valid, include one unit clause deselecting each feature of the universe
+        that the model does not have.
+
+        Args:
+            cnf (FeatureCNF): The encoded model.
+            universe (set): The feature names of all compared models.
+
+        Returns:
+            list: The clauses over the shared variables.
+        """
+        mapping = {var: self.feature_var(name) for var, name in cnf.names.items()}
+        for var in range(1, cnf.num_vars + 1):
+            if var not in mapping:
+                mapping[var] = self.new_var()
+
+        clauses = []
+        for index, clause in enumerate(cnf.clauses):
+            shared = [mapping[lit] if lit > 0 else -mapping[-lit] for lit in clause]
+            if index in cnf.origins:
+                clauses.append(shared)
+            else:
+                self.definitions.append(shared)
+        own = set(cnf.names.values())
+        clauses.extend([-self.feature_var(name)] for name in sorted(universe - own))
+        return clauses
+
+
+def products_only_in(aligned, kept, rejected, limit, max_conflicts=None):
+    """
+    Finds products that satisfy one model but violate the other.
+
+    Args:
+        aligned (AlignedClauses): The shared variables and definitions.
+        kept (list): Top-level clauses the products must satisfy.
+        rejected (list): Top-level clauses of which the products must violate at least one.
+        limit (int): The maximum number of example products.
+        max_conflicts (int): Optional conflict budget for each solver call.
+
+    Returns:
+        tuple: (examples, complete), where examples are sets of feature names and
+               complete is False if the budget ran out before the answer was known.
+    """
+    # Each query gets its own solver, the blocking clauses below must not leak into other queries
+    solver = Solver()
+    solver.ensure_vars(aligned.num_vars)
+    for clause in aligned.definitions + kept:
+        solver.add_clause(clause)
+
+    # At least one rejected clause has all its literals false
+    violations = []
+    for clause in rejected:
+        violation = solver.new_var()
+        violations.append(violation)
+        for lit in clause:
+            solver.add_clause([-violation, -lit])
+    solver.add_clause(violations)
+
+    names = {var: name for name, var in aligned.variables.items()}
+    examples = []
+    while len(examples) < limit:
+        result = solver.solve(max_conflicts=max_conflicts)
+        if result is None:
+            return examples, False
+        if not result:
+            break
+        model = solver.model
+        examples.append({name for var, name in names.items() if model[var]})
+        # Block this product to find a different one next time
+        solver.add_clause([-var if model[var] else var for var in names])
+    return examples, True
+
+
+def classify(added, removed):
+    if added and removed:
+        return "arbitrary"
+    if added:
+        return "generalization"
+    if removed:
+        return "specialization"
+    return "refactoring"
+
+
+def compare_models(old_root, old_constraints, new_root, new_constraints, examples=5, max_conflicts=None):
+    """
+    Compares the products of two versions of a feature model.
+
+    Args:
+        old_root (Feature): The root feature of the old model.
+        old_constraints (list): The cross-tree constraints of the old model.
+        new_root (Feature): The root feature of the new model.
+        new_constraints (list): The cross-tree constraints of the new model.
+        examples (int): How many added and removed products to list (at least 1 is searched).
+        max_conflicts (int): Optional conflict budget for each solver call.
+
+    Returns:
+        dict: The classification, the added/removed features, and example
+              added/removed products as sorted lists of feature names.
+
+    Raises:
+        ValueError: If a constraint does not parse or is an aggregate over feature attributes.
+    """
+    for constraints in (old_constraints, new_constraints):
+        aggregates = split_constraints(constraints)[1]
+        if aggregates:
+            raise ValueError(f"Attribute constraints are not supported when comparing models: {aggregates[0]}")
+    old_cnf = encode_feature_model(old_root, old_constraints)
+    new_cnf = encode_feature_model(new_root, new_constraints)
+    old_names = set(old_cnf.names.values())
+    new_names = set(new_cnf.names.values())
+    universe = old_names | new_names
+
+    aligned = AlignedClauses()
+    for name in sorted(universe):
+        aligned.feature_var(name)
+    old_clauses = aligned.add_model(old_cnf, universe)
+    new_clauses = aligned.add_model(new_cnf, universe)
+
+    limit = max(examples, 1)
+    added, added_complete = products_only_in(aligned, new_clauses, old_clauses, limit, max_conflicts)
+    removed, removed_complete = products_only_in(aligned, old_clauses, new_clauses, limit, max_conflicts)
+
+    # An example settles its direction even if the search for more ran out of budget
+    known = (added or added_complete) and (removed or removed_complete)
+    return {
+        "classification": classify(added, removed) if known else "unknown",
+        "complete": added_complete and removed_complete,
+        "addedFeatures": sorted(new_names - old_names),
+        "removedFeatures": sorted(old_names - new_names),
+        "addedProducts": [sorted(product) for product in added[:examples]],
+        "removedProducts": [sorted(product) for product in removed[:examples]]
+    }
+
+
+def compare_model_files(old_path, new_path, examples=5):
+    """
+    Loads two feature model XML files and compares their products.
+
+    Args:
+        old_path (str): Path to the old model.
+        new_path (str): Path to the new model.
+        examples (int): How many added and removed products to list.
+
+    Returns:
+        dict: The comparison from compare_models.
+    """
+    old_xml, old_root = load_and_parse_xml(old_path)
+    new_xml, new_root = load_and_parse_xml(new_path)
+    return compare_models(old_root, parse_constraints(old_xml, interactive=False),
+                          new_root, parse_constraints(new_xml, interactive=False), examples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the products of two feature model versions.")
+    parser.add_argument("old", help="Path to the old feature model XML")
+    parser.add_argument("new", help="Path to the new feature model XML")
+    parser.add_argument("--examples", type=int, default=5, help="Number of example products to list")
+    args = parser.parse_args()
+
+    result = compare_model_files(args.old, args.new, args.examples)
+    print(f"Classification: {result['classification']}")
+    if result["addedFeatures"]:
+        print("Added features:", ", ".join(result["addedFeatures"]))
+    if result["removedFeatures"]:
+        print("Removed features:", ", ".join(result["removedFeatures"]))
+    for title, products in (("Added products", result["addedProducts"]),
+                            ("Removed products", result["removedProducts"])):
+        print(f"\n{title} (up to {args.examples}):")
+        if not products:
+            print("  None")
+        for product in products:
+            print("  " + ", ".join(product))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,841 @@
+"""
+Import and export of feature models in the formats other tools use.
+
+- FeatureIDE XML: <featureModel><struct> with and/or/alt/feature elements
+  and <constraints><rule> formulas.
+- UVL, the Universal Variability Language.
+- DIMACS CNF, with FeatureIDE's "c <variable> <name>" comments.
+- This project's own XML dialect, which xml_parser reads (export only).
+
+Importers read their input in a single pass, FeatureIDE XML with iterparse
+and UVL and DIMACS line by line. They return the root Feature and the list of
+constraint texts that the analyses take. Exporters are generators of text
+pieces, like tree_serializer, so large models are written without building
+the whole document.
+
+Group nodes (the "<parent>-Group-<type>" features created from <group>
+elements) have no counterpart in the other formats. XOR, OR and cardinality
+groups become native groups and get their name back on import. Any other
+group node is written as an abstract mandatory feature with that name and is
+recognized on the way back. Constraints are written in the normalized syntax
+of boolean_expression.format_expression. DIMACS has no tree: an imported CNF
+becomes a flat list of optional features below a synthetic root, with one
+constraint per clause.
+
+Usage:
+    python model_formats.py linux.dimacs linux.uvl
+    python model_formats.py model.xml model.uvl --from featureide
+"""
+import argparse
+import re
+import time
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+from boolean_expression import format_expression, format_name, parse_expression
+from feature_attributes import STRUCTURAL_ATTRIBUTES, parse_attribute_value
+from feature_cnf import encode_feature_model
+from feature_model import Feature, group_kind
+from traversal import preorder
+from tree_serializer import iter_chunks
+from xml_parser import load_and_parse_xml, parse_constraints
+
+FORMATS = ("featureide", "uvl", "dimacs", "xml")
+
+# FeatureIDE element names for the ways children are grouped, and back
+FEATUREIDE_TAGS = {"xor": "alt", "or": "or", None: "and"}
+FEATUREIDE_GROUPS = {"alt": "xor", "or": "or", "and": "", "feature": ""}
+FEATUREIDE_TYPES = {bool: "boolean", int: "long", float: "double", str: "string"}
+FEATUREIDE_TYPE_NAMES = {"boolean": "bool", "long": "int", "int": "int", "integer": "int",
+                         "double": "float", "float": "float", "string": "string"}
+# FeatureIDE formula elements
+FEATUREIDE_OPERATORS = {"not": "not", "and": "conj", "or": "disj", "implies": "imp", "iff": "eq"}
+FEATUREIDE_KINDS = {tag: kind for kind, tag in FEATUREIDE_OPERATORS.items()}
+
+UVL_SYMBOLS = {"implies": " => ", "iff": " <=> "}
+UVL_GROUPS = {"alternative": "xor", "or": "or"}
+UVL_FEATURE = re.compile(r'(?P<name>"[^"]*"|[^\s{"]+)'
+                         r'(?:\s+cardinality\s+\[(?P<card>[^\]]*)\])?'
+                         r'\s*(?P<attributes>\{.*\})?$')
+UVL_ATTRIBUTE = re.compile(r'("[^"]*"|[^\s]+)\s*(.*)$', re.DOTALL)
+UVL_CARDINALITY = re.compile(r"\[\s*(?P<low>\d+)\s*(?:\.\.\s*(?P<high>\d+|\*)\s*)?\]$")
+
+
+def group_node_name(parent_name, group_type):
+    """
+    Returns the name xml_parser gives the node created from a <group> element.
+    """
+    return f"{parent_name}-Group-{group_type}"
+
+
+def group_suffix(parent, name):
+    """
+    Returns the group type encoded in a group node name, or None if the name is not one.
+    """
+    if parent is None or parent.is_group:
+        return None
+    prefix = group_node_name(parent.name, "")
+    if name.startswith(prefix) and len(name) > len(prefix):
+        return name[len(prefix):]
+    return None
+
+
+def feature_cost(attributes):
+    value = attributes.get("cost")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def model_attributes(feature):
+    """
+    Returns the attributes to write for a feature, including a cost given only as Feature.cost.
+    """
+    attributes = dict(feature.attributes)
+    if feature.cost is not None and "cost" not in attributes:
+        attributes["cost"] = feature.cost
+    return attributes
+
+
+def format_cardinality(cardinality):
+    low, high = cardinality
+    return f"{low}..{'*' if high is None else high}"
+
+
+def iter_xml_tree(root, open_tag):
+    """
+    Writes a feature tree as nested XML elements without recursion.
+
+    Args:
+        root (Feature): The root of the tree.
+        open_tag (callable): Returns (opening text, closing text, inner text) for a feature.
+
+    Yields:
+        str: Pieces of the XML document, in order.
+    """
+    # Each entry is either a feature to open or the text closing a feature
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if isinstance(node, str):
+            yield node
+            continue
+        opening, closing, inner = open_tag(node, depth)
+        yield opening
+        yield inner
+        stack.append((closing, depth))
+        stack.extend((child, depth + 1) for child in reversed(node.children))
+
+
+# FeatureIDE XML
+
+def iter_featureide_xml(root_feature, constraints=()):
+    """
+    Streams a feature model as FeatureIDE XML.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints in propositional logic.
+
+    Yields:
+        str: Pieces of the XML document, in order.
+
+    Raises:
+        ValueError: If the model uses cardinalities or constraints FeatureIDE cannot express.
+    """
+    def element(node, depth):
+        indent = "\t" * (depth + 2)
+        if node.cardinality is not None:
+            raise ValueError(f"FeatureIDE XML has no cardinalities, '{node.name}' has "
+                             f"[{format_cardinality(node.cardinality)}]; use UVL instead")
+        attributes = model_attributes(node)
+        abstract = node.is_group or attributes.pop("abstract", False) is True
+        tag = FEATUREIDE_TAGS[group_kind(node)] if node.children else "feature"
+        text = f"{indent}<{tag}"
+        if abstract:
+            text += ' abstract="true"'
+        if node.mandatory or node.is_group:
+            text += ' mandatory="true"'
+        text += f" name={quoteattr(node.name)}"
+        inner = "".join(
+            f"{indent}\t<attribute name={quoteattr(name)} type=\"{FEATUREIDE_TYPES[type(value)]}\" "
+            f"value={quoteattr(str(value).lower() if isinstance(value, bool) else str(value))}/>\n"
+            for name, value in attributes.items())
+        if not node.children and not inner:
+            return text + "/>\n", "", ""
+        return text + ">\n", f"{indent}</{tag}>\n", inner
+
+    yield '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n<featureModel>\n\t<struct>\n'
+    yield from iter_xml_tree(root_feature, element)
+    yield "\t</struct>\n\t<constraints>\n"
+    for text in constraints:
+        yield "\t\t<rule>\n"
+        yield from featureide_formula(parse_expression(text), 3)
+        yield "\t\t</rule>\n"
+    yield "\t</constraints>\n</featureModel>\n"
+
+
+def featureide_formula(expression, depth):
+    """
+    Writes an expression tree as FeatureIDE formula elements.
+    """
+    stack = [(expression, depth)]  # Closing tags are pushed as plain strings
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            yield item
+            continue
+        expression, depth = item
+        indent = "\t" * depth
+        kind = expression[0]
+        if kind == "var":
+            yield f"{indent}<var>{escape(expression[1])}</var>\n"
+            continue
+        if kind not in FEATUREIDE_OPERATORS:
+            raise ValueError(f"FeatureIDE XML cannot express the constraint '{format_expression(expression)}'")
+        tag = FEATUREIDE_OPERATORS[kind]
+        operands = expression[1] if kind in ("and", "or") else expression[1:]
+        yield f"{indent}<{tag}>\n"
+        stack.append(f"{indent}</{tag}>\n")
+        stack.extend((operand, depth + 1) for operand in reversed(operands))
+
+
+def featureide_expression(element):
+    """
+    Converts a FeatureIDE formula element into an expression tree.
+    """
+    operands = []  # Converted sub-formulas, each element's own come last
+    stack = [(element, False)]
+    while stack:
+        node, visited = stack.pop()
+        if node.tag == "var":
+            operands.append(("var", (node.text or "").strip()))
+            continue
+        if node.tag not in FEATUREIDE_KINDS:
+            raise ValueError(f"Unknown FeatureIDE formula element <{node.tag}>")
+        if not visited:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(list(node)))
+            continue
+        kind = FEATUREIDE_KINDS[node.tag]
+        count = len(node)
+        expected = 1 if kind == "not" else 2 if kind in ("implies", "iff") else None
+        if count == 0 or (expected is not None and count != expected):
+            raise ValueError(f"FeatureIDE <{node.tag}> element with {count} operands")
+        children = operands[len(operands) - count:]
+        del operands[len(operands) - count:]
+        if kind == "not":
+            operands.append(("not", children[0]))
+        elif kind in ("and", "or"):
+            operands.append((kind, children) if len(children) > 1 else children[0])
+        else:
+            operands.append((kind, children[0], children[1]))
+    return operands[0]
+
+
+def element_name(element):
+    """
+    Returns the name attribute of a FeatureIDE element.
+
+    Raises:
+        ValueError: If the element has no name.
+    """
+    name = element.attrib.get("name")
+    if name is None:
+        raise ValueError(f"<{element.tag}> element without a name in the FeatureIDE model")
+    return name
+
+
+def read_featureide_xml(source):
+    """
+    Reads a FeatureIDE XML model in one pass.
+
+    Args:
+        source: A file path or a binary file object.
+
+    Returns:
+        tuple: The root feature and the list of constraints.
+    """
+    root_feature = None
+    constraints = []
+    stack = []  # Open features
+    section = None
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            if tag in ("struct", "constraints"):
+                section = tag
+            elif section == "struct" and tag in FEATUREIDE_GROUPS:
+                parent = stack[-1] if stack else None
+                name = element_name(element)
+                mandatory = element.attrib.get("mandatory", "false") == "true"
+                abstract = element.attrib.get("abstract", "false") == "true"
+                suffix = group_suffix(parent, name)
+                if suffix is not None and mandatory and abstract:
+                    feature = Feature(name=name, group_type=FEATUREIDE_GROUPS[tag] or suffix, is_group=True)
+                else:
+                    feature = Feature(name=name, mandatory=mandatory, group_type=FEATUREIDE_GROUPS[tag],
+                                      attributes={"abstract": True} if abstract else None)
+                if parent is None:
+                    root_feature = feature
+                else:
+                    parent.add_child(feature)
+                stack.append(feature)
+            elif section == "struct" and tag == "attribute" and stack:
+                type_name = None
+                if "type" in element.attrib:
+                    type_name = FEATUREIDE_TYPE_NAMES.get(element.attrib["type"].lower(), "string")
+                value = parse_attribute_value(element.attrib.get("value", ""), type_name)
+                stack[-1].attributes[element_name(element)] = value
+            continue
+
+        if section == "struct" and tag in FEATUREIDE_GROUPS:
+            feature = stack.pop()
+            feature.cost = feature_cost(feature.attributes)
+            element.clear()
+        elif section == "constraints" and tag == "rule":
+            formula = [child for child in element if child.tag in FEATUREIDE_KINDS or child.tag == "var"]
+            if formula:
+                constraints.append(format_expression(featureide_expression(formula[0])))
+            element.clear()
+        elif tag in ("struct", "constraints"):
+            section = None
+
+    if root_feature is None:
+        raise ValueError("No <struct> with a root feature found in the FeatureIDE model.")
+    return root_feature, constraints
+
+
+# UVL
+
+def uvl_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+    return repr(value)
+
+
+def uvl_name(name):
+    """
+    Writes a name for UVL, where names with spaces must be quoted too.
+    """
+    text = format_name(name)
+    return f'"{text}"' if " " in text and not text.startswith('"') else text
+
+
+def uvl_feature_line(feature):
+    line = uvl_name(feature.name)
+    # The bounds of a feature's own cardinality group are written with the group
+    if feature.cardinality is not None and group_kind(feature) != "card":
+        line += f" cardinality [{format_cardinality(feature.cardinality)}]"
+    attributes = model_attributes(feature)
+    if attributes:
+        items = []
+        for name, value in attributes.items():
+            key = uvl_name(name)
+            items.append(key if value is True else f"{key} {uvl_value(value)}")
+        line += " {" + ", ".join(items) + "}"
+    return line
+
+
+def uvl_blocks(feature):
+    """
+    Splits the children of a feature into UVL group blocks.
+
+    Returns:
+        list: (keyword, members) pairs, where members are (feature, is group node) pairs.
+    """
+    blocks = []
+    kind = group_kind(feature) if not feature.is_group else None
+    if kind is not None:
+        members = [child for child in feature.children if not child.is_group]
+        blocks.append((uvl_keyword(feature, kind), [(child, False) for child in members]))
+    for child in feature.children:
+        if child.is_group:
+            child_kind = group_kind(child)
+            if child_kind is not None and child.name == group_node_name(feature.name, child.group_type):
+                members = [member for member in child.children if not member.is_group]
+                blocks.append((uvl_keyword(child, child_kind), [(member, False) for member in members]))
+            else:
+                # No native group for it, kept as an abstract mandatory feature with the node's name
+                blocks.append(("mandatory", [(child, True)]))
+        elif kind is None:
+            keyword = "mandatory" if child.mandatory else "optional"
+            if blocks and blocks[-1][0] == keyword:
+                blocks[-1][1].append((child, False))
+            else:
+                blocks.append((keyword, [(child, False)]))
+    return blocks
+
+
+def uvl_keyword(feature, kind):
+    if kind == "xor":
+        return "alternative"
+    if kind == "or":
+        return "or"
+    low, high = feature.cardinality or (0, None)
+    return f"[{format_cardinality((low, high))}]"
+
+
+def iter_uvl(root_feature, constraints=()):
+    """
+    Streams a feature model as UVL.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints in propositional logic.
+
+    Yields:
+        str: Lines of the UVL document.
+    """
+    yield "features\n"
+    # Each entry is a feature with its indentation
+    stack = [(root_feature, 1, False)]
+    while stack:
+        feature, depth, as_group = stack.pop()
+        indent = "\t" * depth
+        if as_group:
+            yield f"{indent}{uvl_name(feature.name)} {{abstract}}\n"
+            blocks = [("mandatory" if child.mandatory else "optional", [(child, False)])
+                      for child in feature.children if not child.is_group]
+            kind = group_kind(feature)
+            if kind is not None:
+                blocks = [(uvl_keyword(feature, kind), [(child, False) for child in feature.children])]
+        else:
+            yield f"{indent}{uvl_feature_line(feature)}\n"
+            blocks = uvl_blocks(feature)
+        pending = []
+        for keyword, members in blocks:
+            pending.append((f"{indent}\t{keyword}\n", None, None))
+            pending.extend((member, depth + 2, is_group) for member, is_group in members)
+        stack.extend(reversed(pending))
+        while stack and stack[-1][1] is None:
+            yield stack.pop()[0]
+
+    if constraints:
+        yield "\nconstraints\n"
+        for text in constraints:
+            yield f"\t{format_expression(parse_expression(text), UVL_SYMBOLS, uvl_name)}\n"
+
+
+def unquoted_chars(text):
+    """
+    Yields the (index, character) pairs of a UVL line that are outside quoted names and strings.
+    """
+    quote = None
+    escaped = False
+    for index, char in enumerate(text):
+        if quote is None:
+            if char in "\"'":
+                quote = char
+            else:
+                yield index, char
+        elif escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == quote:
+            quote = None
+
+
+def strip_uvl_comment(line):
+    """
+    Removes a // comment, unless it is inside a quoted name or string.
+    """
+    if "//" not in line:
+        return line
+    for index, char in unquoted_chars(line):
+        if char == "/" and line.startswith("//", index):
+            return line[:index]
+    return line
+
+
+def uvl_logical_lines(lines):
+    """
+    Yields the lines of a UVL document without comments, joining attribute blocks that span several lines.
+    """
+    pending = ""
+    for line in lines:
+        line = strip_uvl_comment(line).rstrip()
+        if pending:
+            line = pending + " " + line.strip()
+        elif "{" not in line:
+            yield line
+            continue
+        if '"' in line or "'" in line:
+            depth = sum(1 if char == "{" else -1 for index, char in unquoted_chars(line) if char in "{}")
+        else:
+            depth = line.count("{") - line.count("}")
+        if depth > 0:
+            pending = line
+            continue
+        pending = ""
+        yield line
+    if pending:
+        yield pending
+
+
+def split_uvl_attributes(text):
+    """
+    Splits the inside of a UVL attribute block at the top-level commas.
+    """
+    if not any(char in text for char in "\"'{["):
+        return [item.strip() for item in text.split(",") if item.strip()]
+    items, depth, start = [], 0, 0
+    for index, char in unquoted_chars(text):
+        if char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            items.append(text[start:index])
+            start = index + 1
+    items.append(text[start:])
+    return [item.strip() for item in items if item.strip()]
+
+
+def parse_uvl_attributes(text):
+    attributes = {}
+    for item in split_uvl_attributes(text[1:-1]):
+        match = UVL_ATTRIBUTE.match(item)
+        name, value = match.group(1).strip('"'), match.group(2).strip()
+        if not value:
+            attributes[name] = True
+        elif value.startswith("'") and value.endswith("'") and len(value) > 1:
+            attributes[name] = re.sub(r"\\(.)", r"\1", value[1:-1])
+        elif value in ("true", "false"):
+            attributes[name] = value == "true"
+        else:
+            try:
+                attributes[name] = parse_attribute_value(value, "int")
+            except ValueError:
+                try:
+                    attributes[name] = parse_attribute_value(value, "float")
+                except ValueError:
+                    attributes[name] = value  # Lists and nested blocks are kept as text
+    return attributes
+
+
+def parse_uvl_cardinality(text, line):
+    match = UVL_CARDINALITY.match(text.strip())
+    if match is None:
+        raise ValueError(f"Invalid UVL cardinality in line: {line.strip()}")
+    low = int(match.group("low"))
+    high = match.group("high")
+    if high is None:
+        return (low, low)
+    return (low, None if high == "*" else int(high))
+
+
+def read_uvl(lines):
+    """
+    Reads a UVL model line by line.
+
+    Args:
+        lines (iterable): The lines of the UVL document, e.g. an open file.
+
+    Returns:
+        tuple: The root feature and the list of constraints.
+
+    Raises:
+        ValueError: If the document is not valid UVL.
+    """
+    root_feature = None
+    constraints = []
+    section = None
+    stack = []  # (indentation, feature) or (indentation, (group keyword, feature receiving the members))
+    for line in uvl_logical_lines(lines):
+        if not line.strip():
+            continue
+        indent = len(line.expandtabs(4)) - len(line.expandtabs(4).lstrip())
+        content = line.strip()
+        if indent == 0:
+            section = content.split()[0]
+            continue
+        if section == "constraints":
+            constraints.append(format_expression(parse_expression(content)))
+            continue
+        if section != "features":
+            continue  # namespace, imports and include
+
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        keyword = content.split(None, 1)[0]
+        if keyword not in ("mandatory", "optional", "alternative", "or"):
+            keyword = None
+        if keyword is None and content.startswith("["):
+            keyword = "card"
+        if keyword is not None:
+            if not stack or not isinstance(stack[-1][1], Feature):
+                raise ValueError(f"A UVL group must be below a feature: {line.strip()}")
+            owner = stack[-1][1]
+            bounds = parse_uvl_cardinality(content, line) if keyword == "card" else None
+            target = owner
+            if keyword in ("alternative", "or", "card"):
+                kind = UVL_GROUPS.get(keyword, "card")
+                if owner.is_group:
+                    # The group node written as an abstract feature, its block is its own
+                    owner.group_type, owner.cardinality = kind, bounds
+                else:
+                    target = Feature(name=group_node_name(owner.name, kind), group_type=kind, is_group=True,
+                                     cardinality=bounds)
+                    owner.add_child(target)
+            stack.append((indent, (keyword, target)))
+            continue
+
+        match = UVL_FEATURE.match(content)
+        if match is None:
+            raise ValueError(f"Invalid UVL feature line: {line.strip()}")
+        name = match.group("name").strip('"')
+        attributes = parse_uvl_attributes(match.group("attributes")) if match.group("attributes") else {}
+        cardinality = parse_uvl_cardinality(f"[{match.group('card')}]", line) if match.group("card") else None
+        if not stack:
+            if root_feature is not None:
+                raise ValueError(f"A UVL model has a single root feature: {line.strip()}")
+            feature = root_feature = Feature(name=name, attributes=attributes, cardinality=cardinality)
+        else:
+            if isinstance(stack[-1][1], Feature):
+                raise ValueError(f"A UVL feature must be inside a group: {line.strip()}")
+            keyword, target = stack[-1][1]
+            mandatory = keyword == "mandatory"
+            suffix = group_suffix(target, name)
+            if mandatory and attributes == {"abstract": True} and suffix is not None:
+                feature = Feature(name=name, group_type=suffix, is_group=True)
+            else:
+                feature = Feature(name=name, mandatory=mandatory, attributes=attributes, cardinality=cardinality)
+            target.add_child(feature)
+        feature.cost = feature_cost(feature.attributes)
+        stack.append((indent, feature))
+
+    if root_feature is None:
+        raise ValueError("No features found in the UVL model.")
+    return root_feature, constraints
+
+
+# DIMACS
+
+def iter_dimacs(root_feature, constraints=()):
+    """
+    Streams the CNF of a feature model in DIMACS format.
+
+    Every feature variable is named in a "c <variable> <name>" comment, as
+    FeatureIDE writes them; Tseitin variables of the constraints have no name.
+
+    Yields:
+        str: Lines of the DIMACS document.
+    """
+    cnf = encode_feature_model(root_feature, constraints)
+    for var in sorted(cnf.names):
+        yield f"c {var} {cnf.names[var]}\n"
+    yield f"p cnf {cnf.num_vars} {len(cnf.clauses)}\n"
+    for clause in cnf.clauses:
+        yield " ".join(map(str, clause)) + " 0\n"
+
+
+def read_dimacs(lines, root_name="Root"):
+    """
+    Reads a DIMACS CNF line by line.
+
+    Variables named in "c <variable> <name>" comments keep their name, the
+    others are called "_<variable>". They all become optional features below
+    a synthetic abstract root, and every clause becomes a constraint.
+
+    Args:
+        lines (iterable): The lines of the DIMACS document, e.g. an open file.
+        root_name (str): The name of the synthetic root, changed if a variable already has it.
+
+    Returns:
+        tuple: The root feature and the list of constraints.
+    """
+    names = {}
+    num_vars = 0
+    clause = []
+
+    def clause_text(lits):
+        if not lits:
+            return "false"
+        return " | ".join(("!" if lit < 0 else "") + format_name(names.get(abs(lit)) or f"_{abs(lit)}")
+                          for lit in lits)
+
+    pending = []  # Clauses, written out once all the names are known
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] == "c":
+            if len(parts) > 2 and parts[1].rstrip("$").isdigit():
+                names[int(parts[1].rstrip("$"))] = line.split(None, 2)[2].strip()
+            continue
+        if parts[0] == "p":
+            num_vars = int(parts[2])
+            continue
+        for token in parts:
+            lit = int(token)
+            if lit == 0:
+                pending.append(clause)
+                clause = []
+            else:
+                clause.append(lit)
+                num_vars = max(num_vars, abs(lit))
+    if clause:
+        pending.append(clause)
+
+    constraints = [clause_text(lits) for lits in pending]
+    taken = set(names.values())
+    while root_name in taken:
+        root_name = "_" + root_name
+    root_feature = Feature(name=root_name, attributes={"abstract": True})
+    for var in range(1, num_vars + 1):
+        root_feature.add_child(Feature(name=names.get(var) or f"_{var}"))
+    return root_feature, constraints
+
+
+# This project's XML dialect
+
+def xml_attribute_fits(name, value):
+    """
+    Checks if an attribute can be an XML attribute of <feature>, read back with the same value and type.
+    """
+    if name in STRUCTURAL_ATTRIBUTES or not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_.-]*", name):
+        return False
+    text = str(value)
+    parsed = parse_attribute_value(text)
+    return type(parsed) is type(value) and parsed == value and text == text.strip()
+
+
+def iter_project_xml(root_feature, constraints=()):
+    """
+    Streams a feature model in the XML dialect that xml_parser reads.
+
+    Yields:
+        str: Pieces of the XML document, in order.
+    """
+    def element(node, depth):
+        indent = "    " * (depth + 1)
+        if node.is_group:
+            text = f"{indent}<group type={quoteattr(node.group_type or '')}"
+            if node.cardinality is not None:
+                low, high = node.cardinality
+                text += f' min="{low}" max="{"*" if high is None else high}"'
+            return text + ">\n", f"{indent}</group>\n", ""
+        text = f"{indent}<feature name={quoteattr(node.name)}"
+        if node.mandatory:
+            text += ' mandatory="true"'
+        kind = group_kind(node)
+        if kind is not None:
+            text += f" group={quoteattr(kind)}"
+        if node.cardinality is not None:
+            text += f' card="{format_cardinality(node.cardinality)}"'
+        nested = []
+        for name, value in model_attributes(node).items():
+            value_text = str(value).lower() if isinstance(value, bool) else str(value)
+            if xml_attribute_fits(name, value):
+                text += f" {name}={quoteattr(value_text)}"
+            else:
+                type_name = {bool: "bool", int: "int", float: "float", str: "string"}[type(value)]
+                nested.append(f"{indent}    <attribute name={quoteattr(name)} "
+                              f"value={quoteattr(value_text)} type=\"{type_name}\"/>\n")
+        if not node.children and not nested:
+            return text + "/>\n", "", ""
+        return text + ">\n", f"{indent}</feature>\n", "".join(nested)
+
+    yield "<featureModel>\n"
+    yield from iter_xml_tree(root_feature, element)
+    yield "    <constraints>\n"
+    for text in constraints:
+        yield f"        <constraint>\n            <booleanExpression>{escape(text)}</booleanExpression>\n        </constraint>\n"
+    yield "    </constraints>\n</featureModel>\n"
+
+
+def detect_format(path):
+    """
+    Guesses the format of a model file from its extension, and its content for XML.
+    """
+    lower = path.lower()
+    if lower.endswith(".uvl"):
+        return "uvl"
+    if lower.endswith((".dimacs", ".cnf")):
+        return "dimacs"
+    if lower.endswith(".xml"):
+        with open(path, "rb") as file:
+            head = file.read(4096)
+        return "featureide" if b"<struct" in head else "xml"
+    raise ValueError(f"Cannot tell the format of '{path}', expected one of {', '.join(FORMATS)}")
+
+
+def load_model(path, model_format=None):
+    """
+    Loads a feature model in any supported format.
+
+    Args:
+        path (str): The model file.
+        model_format (str): One of FORMATS, detected from the file if None.
+
+    Returns:
+        tuple: The root feature and the list of constraints.
+    """
+    model_format = model_format or detect_format(path)
+    if model_format == "featureide":
+        return read_featureide_xml(path)
+    if model_format == "xml":
+        xml_root, root_feature = load_and_parse_xml(path)
+        return root_feature, parse_constraints(xml_root, interactive=False)
+    with open(path, encoding="utf-8") as file:
+        if model_format == "uvl":
+            return read_uvl(file)
+        if model_format == "dimacs":
+            return read_dimacs(file)
+    raise ValueError(f"Unknown model format '{model_format}', expected one of {', '.join(FORMATS)}")
+
+
+EXPORTERS = {
+    "featureide": iter_featureide_xml,
+    "uvl": iter_uvl,
+    "dimacs": iter_dimacs,
+    "xml": iter_project_xml,
+}
+
+
+def save_model(root_feature, constraints, path, model_format=None):
+    """
+    Writes a feature model in any supported format, streaming it to the file.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints in propositional logic.
+        path (str): The file to write.
+        model_format (str): One of FORMATS, detected from the extension if None
+                            (.xml files are written as FeatureIDE XML).
+    """
+    if model_format is None:
+        lower = path.lower()
+        model_format = "uvl" if lower.endswith(".uvl") else "dimacs" if lower.endswith((".dimacs", ".cnf")) else "featureide"
+    if model_format not in EXPORTERS:
+        raise ValueError(f"Unknown model format '{model_format}', expected one of {', '.join(FORMATS)}")
+    with open(path, "w", encoding="utf-8") as file:
+        for chunk in iter_chunks(EXPORTERS[model_format](root_feature, constraints)):
+            file.write(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert feature models between FeatureIDE XML, UVL, DIMACS "
+                                                 "and this project's XML.")
+    parser.add_argument("input", help="The model to read")
+    parser.add_argument("output", help="The file to write")
+    parser.add_argument("--from", dest="source_format", choices=FORMATS, help="Format of the input")
+    parser.add_argument("--to", dest="target_format", choices=FORMATS, help="Format of the output")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    root_feature, constraints = load_model(args.input, args.source_format)
+    loaded = time.perf_counter()
+    save_model(root_feature, constraints, args.output, args.target_format)
+    done = time.perf_counter()
+    features = sum(1 for feature in preorder(root_feature) if not feature.is_group)
+    print(f"Read {features} features and {len(constraints)} constraints in {loaded - start:.2f}s, "
+          f"wrote {args.output} in {done - loaded:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
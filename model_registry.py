@@ -0,0 +1,236 @@
+import hashlib
+import threading
+import uuid
+
+from diagnosis import ConfigurationDiagnoser
+from feature_attributes import AttributeTable, BatchEvaluator, split_constraints
+
+
+def assign_node_ids(root_feature):
+    """
+    Assigns a stable id to every feature in the tree.
+
+    The id is derived from the path of names from the root, so the same feature
+    keeps the same id across versions of a model as long as it is not moved or
+    renamed. Siblings that share a name are told apart by their occurrence index.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+
+    Returns:
+        dict: A mapping of node id to Feature.
+    """
+    nodes = {}
+    stack = [(root_feature, "", "")]
+    while stack:
+        feature, parent_path, suffix = stack.pop()
+        path = f"{parent_path}/{feature.name}{suffix}"
+        feature.node_id = hashlib.sha1(path.encode("utf-8")).hexdigest()[:12]
+        nodes[feature.node_id] = feature
+
+        seen = {}
+        pending = []
+        for child in feature.children:
+            # Siblings sharing a name get "#1", "#2", ... after the first one
+            index = seen.get(child.name, 0)
+            seen[child.name] = index + 1
+            suffix = f"#{index}" if index else ""
+            pending.append((child, path, suffix))
+        stack.extend(reversed(pending))
+    return nodes
+
+
+def node_summary(feature, parent_id):
+    """
+    Describes a single node without its subtree.
+
+    Args:
+        feature (Feature): The feature to describe.
+        parent_id (str): The id of the parent node, or None for the root.
+
+    Returns:
+        dict: The node fields the checkbox viewer needs, with child ids instead of children.
+    """
+    return {
+        "id": feature.node_id,
+        "label": feature.name,
+        "value": feature.name,
+        "groupType": feature.group_type,
+        "mandatory": feature.mandatory,
+        "cardinality": list(feature.cardinality) if feature.cardinality is not None else None,
+        "parentId": parent_id,
+        "childIds": [child.node_id for child in feature.children],
+    }
+
+
+class ModelVersion:
+    """
+    One parsed version of a feature model, indexed by node id.
+    """
+    def __init__(self, model_id, version, root_feature, constraints):
+        self.model_id = model_id
+        self.version = version
+        self.root = root_feature
+        self.constraints = constraints
+        self.nodes = assign_node_ids(root_feature)
+        self.parents = {root_feature.node_id: None}
+        for feature in self.nodes.values():
+            for child in feature.children:
+                self.parents[child.node_id] = feature.node_id
+        self.evaluator = None  # Built on first use, see attribute_evaluator
+        self.lock = threading.Lock()
+        self.diagnoser = None  # Built on first use, see diagnose
+        self.diagnosis_lock = threading.Lock()  # The diagnoser's solver answers one query at a time
+
+    def attribute_evaluator(self):
+        """
+        Returns one evaluator over all aggregate constraints of this version, built once and shared.
+
+        Returns:
+            BatchEvaluator: The evaluator, or None if the model has no aggregate constraints.
+
+        Raises:
+            ValueError: If a constraint does not parse or names an unknown attribute.
+        """
+        with self.lock:
+            if self.evaluator is None:
+                aggregates = split_constraints(self.constraints)[1]
+                self.evaluator = BatchEvaluator(aggregates, AttributeTable(self.root)) if aggregates else False
+            return self.evaluator or None
+
+    def diagnose(self, selected, time_budget=1.0):
+        """
+        Explains why a selection is not a valid product, with a diagnoser built once for this version.
+
+        Aggregate constraints are left out, they have no clauses.
+
+        Args:
+            selected (iterable): The names of the selected features.
+            time_budget (float): Seconds to spend on the explanation.
+
+        Returns:
+            dict: The diagnosis, or None if the selection is valid.
+
+        Raises:
+            ValueError: If a constraint does not parse or names an unknown feature.
+        """
+        with self.diagnosis_lock:
+            if self.diagnoser is None:
+                self.diagnoser = ConfigurationDiagnoser(self.root, split_constraints(self.constraints)[0])
+            return self.diagnoser.diagnose(selected, time_budget)
+
+    def summaries(self):
+        """
+        Returns the node summaries of this version, keyed by node id.
+        """
+        return {node_id: node_summary(feature, self.parents[node_id])
+                for node_id, feature in self.nodes.items()}
+
+
+class ModelRegistry:
+    """
+    Keeps recently parsed models in memory so clients can ask for diffs and subtrees.
+
+    The registry is shared by all request threads of a worker process, so every
+    access to the stored versions goes through a lock. Stored versions are never
+    modified after registration, apart from their lazily built attribute evaluator
+    and diagnoser, and can be read without holding it.
+    """
+    def __init__(self, max_versions=8, max_models=64):
+        self.max_versions = max_versions
+        self.max_models = max_models
+        self.models = {}  # Ordered from least to most recently registered or looked up
+        self.lock = threading.Lock()
+
+    def register(self, root_feature, constraints, model_id=None):
+        """
+        Stores a newly parsed model, as a new version of `model_id` when it is known.
+
+        Args:
+            root_feature (Feature): The root feature of the parsed model.
+            constraints (list): The cross-tree constraints of the model.
+            model_id (str): Optional id of an existing model this is a new version of.
+
+        Returns:
+            ModelVersion: The stored version.
+        """
+        with self.lock:
+            versions = self.models.pop(model_id, None) if model_id else None
+            if versions is None:
+                model_id = uuid.uuid4().hex
+                versions = {}
+            self.models[model_id] = versions
+            # Forget the models nobody has touched for the longest time
+            while len(self.models) > self.max_models:
+                del self.models[next(iter(self.models))]
+            version = max(versions, default=0) + 1
+            # Reserve the version number before indexing outside the lock
+            versions[version] = None
+
+        parsed = ModelVersion(model_id, version, root_feature, constraints)
+        with self.lock:
+            versions[version] = parsed
+            # Only keep the most recent versions around
+            for old in sorted(versions)[:-self.max_versions]:
+                del versions[old]
+        return parsed
+
+    def get(self, model_id, version=None):
+        """
+        Looks up a stored model version.
+
+        Args:
+            model_id (str): The id of the model.
+            version (int): The version to fetch, or None for the latest one.
+
+        Returns:
+            ModelVersion: The stored version, or None if it is unknown or was evicted.
+        """
+        with self.lock:
+            versions = self.models.pop(model_id, None)
+            if versions is None:
+                return None
+            # A model in use moves to the end, away from eviction
+            self.models[model_id] = versions
+            if not versions:
+                return None
+            if version is None:
+                version = max((v for v, parsed in versions.items() if parsed is not None), default=None)
+            return versions.get(version)
+
+    def diff(self, model_id, from_version, to_version=None):
+        """
+        Computes the node-level difference between two versions of a model.
+
+        Args:
+            model_id (str): The id of the model.
+            from_version (int): The version the client currently has.
+            to_version (int): The version to diff against, or None for the latest one.
+
+        Returns:
+            dict: The added and changed node summaries and the removed node ids,
+                  or None if either version is not available.
+        """
+        old = self.get(model_id, from_version)
+        new = self.get(model_id, to_version)
+        if old is None or new is None:
+            return None
+
+        old_nodes = old.summaries()
+        new_nodes = new.summaries()
+        added, changed = [], []
+        for node_id, summary in new_nodes.items():
+            if node_id not in old_nodes:
+                added.append(summary)
+            elif old_nodes[node_id] != summary:
+                changed.append(summary)
+        removed = [node_id for node_id in old_nodes if node_id not in new_nodes]
+
+        return {
+            "fromVersion": old.version,
+            "toVersion": new.version,
+            "rootId": new.root.node_id,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+        }
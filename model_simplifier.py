@@ -0,0 +1,329 @@
+from feature_cnf import encode_feature_model
+from sat_solver import Solver
+
+
+class SimplifiedModel:
+    """
+    A feature model CNF reduced before analysis, with the mapping back to feature names.
+
+    Features fixed in every product (core and dead features) are removed,
+    features that are always selected together (atomic sets, such as mandatory
+    chains) or always opposite share one variable, and the clauses are
+    rewritten over the remaining variables. Products of the simplified model
+    correspond one to one to products of the original model.
+    """
+    def __init__(self, cnf):
+        self.cnf = cnf
+        self.void = False  # True if the model has no valid product
+        self.num_vars = 0
+        self.clauses = []
+        self.literals = {}  # Original variable -> True/False, or literal over the new variables
+        self.members = {}  # New variable -> [(feature name, same polarity?)]
+
+    def literal(self, name):
+        """
+        Returns the new literal for a feature name, or True/False if the feature is core/dead.
+        """
+        return self.literals[self.cnf.variables[name]]
+
+    def expand(self, model):
+        """
+        Converts a model of the simplified clauses into the original product.
+
+        Args:
+            model (list): The solver model, indexed by new variable.
+
+        Returns:
+            frozenset: The names of the selected features.
+        """
+        selected = []
+        for var, name in self.cnf.names.items():
+            lit = self.literals[var]
+            if lit is True or (lit is not False and model[abs(lit)] == (lit > 0)):
+                selected.append(name)
+        return frozenset(selected)
+
+    def core_features(self):
+        return sorted(name for var, name in self.cnf.names.items() if self.literals[var] is True)
+
+    def dead_features(self):
+        return sorted(name for var, name in self.cnf.names.items() if self.literals[var] is False)
+
+    def atomic_sets(self):
+        """
+        Returns the groups of two or more features that are always selected together.
+        """
+        sets = {}
+        for var, name in self.cnf.names.items():
+            lit = self.literals[var]
+            if not isinstance(lit, bool):
+                sets.setdefault(lit, []).append(name)
+        return [names for names in sets.values() if len(names) > 1]
+
+    def to_solver(self):
+        solver = Solver()
+        solver.ensure_vars(self.num_vars)
+        for clause in self.clauses:
+            solver.add_clause(clause)
+        return solver
+
+    def summary(self):
+        """
+        Describes how much the model shrank.
+        """
+        return (f"{len(self.cnf.names)} features and {len(self.cnf.clauses)} clauses reduced to "
+                f"{self.num_vars} variables and {len(self.clauses)} clauses "
+                f"({len(self.core_features())} core, {len(self.dead_features())} dead, "
+                f"{len(self.atomic_sets())} atomic sets)")
+
+
+def find_backbone(solver, variables, exact=True):
+    """
+    Finds the variables that take the same value in every model.
+
+    Each candidate is first probed by unit propagation, which proves most
+    fixed variables cheaply. With `exact`, the remaining candidates are
+    checked with SAT calls looking for a model where they flip. Every fixed
+    variable found is added to the solver as a unit clause.
+
+    Args:
+        solver (Solver): A solver loaded with the clauses; it is modified.
+        variables (list): The variables to check.
+        exact (bool): Settle every candidate with SAT calls instead of probing only.
+
+    Returns:
+        dict: Variable -> fixed value, or None if there is no model at all.
+    """
+    if not solver.solve():
+        return None
+    model = solver.model
+    candidates = {var: model[var] for var in variables}
+    fixed = {}
+
+    def fix(var):
+        fixed[var] = candidates.pop(var)
+        solver.add_clause([var if fixed[var] else -var])
+
+    for var in variables:
+        solver.backtrack(0)
+        if solver.value(var) is not None:
+            fixed[var] = candidates.pop(var)
+        elif not solver.propagate_assumptions([-var if candidates[var] else var]):
+            fix(var)
+    if not exact:
+        return fixed
+
+    for var in variables:
+        if var not in candidates:
+            continue
+        solver.backtrack(0)
+        if solver.value(var) is not None:
+            fixed[var] = candidates.pop(var)
+            continue
+        # Look for a model with the opposite value, preferring to flip every other
+        # candidate too, so that one model rules out many of them
+        for other, value in candidates.items():
+            solver.phase[other] = not value
+        if solver.solve([-var if candidates[var] else var]):
+            model = solver.model
+            for other in [other for other, value in candidates.items() if model[other] != value]:
+                del candidates[other]
+        else:
+            fix(var)
+    return fixed
+
+
+def strongly_connected_literals(clauses):
+    """
+    Groups literals that imply each other through the binary clauses.
+
+    Every binary clause (a | b) gives the implications -a -> b and -b -> a;
+    literals on a common cycle are equivalent. Uses an iterative Tarjan search.
+
+    Returns:
+        dict: Literal -> representative literal (the one with the smallest variable).
+    """
+    edges = {}
+    for clause in clauses:
+        if len(clause) == 2:
+            a, b = clause
+            edges.setdefault(-a, []).append(b)
+            edges.setdefault(-b, []).append(a)
+
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    representative = {}
+    counter = 0
+    for start in edges:
+        if start in index:
+            continue
+        work = [(start, 0)]
+        while work:
+            lit, position = work.pop()
+            if position == 0:
+                index[lit] = low[lit] = counter
+                counter += 1
+                stack.append(lit)
+                on_stack.add(lit)
+            successors = edges.get(lit, [])
+            if position < len(successors):
+                work.append((lit, position + 1))
+                nxt = successors[position]
+                if nxt not in index:
+                    work.append((nxt, 0))
+                elif nxt in on_stack:
+                    low[lit] = min(low[lit], index[nxt])
+                continue
+            if low[lit] == index[lit]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == lit:
+                        break
+                if len(component) > 1:
+                    leader = min(component, key=abs)
+                    for member in component:
+                        representative[member] = leader
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[lit])
+    return representative
+
+
+def simplify_clauses(clauses, fixed, representative):
+    """
+    Rewrites clauses under fixed values and literal substitutions.
+
+    Satisfied clauses and tautologies are dropped, false literals removed,
+    duplicate literals and clauses merged, and clauses subsumed by a shorter
+    clause removed.
+
+    Args:
+        clauses (list): The clauses to rewrite.
+        fixed (dict): Variable -> value for the variables known in every model.
+        representative (dict): Literal -> equivalent literal to use instead.
+
+    Returns:
+        list: The simplified clauses, or None if one became empty (no model).
+    """
+    rewritten = set()
+    for clause in clauses:
+        lits = set()
+        satisfied = False
+        for lit in clause:
+            lit = representative.get(lit, lit)
+            value = fixed.get(abs(lit))
+            if value is not None:
+                if value == (lit > 0):
+                    satisfied = True
+                    break
+                continue
+            if -lit in lits:
+                satisfied = True
+                break
+            lits.add(lit)
+        if satisfied:
+            continue
+        if not lits:
+            return None
+        rewritten.add(tuple(sorted(lits)))
+
+    # Forward subsumption, shortest clauses first
+    kept = []
+    occurrences = {}
+    for clause in sorted(rewritten, key=len):
+        members = set(clause)
+        if any(members.issuperset(other)
+               for lit in clause for other in occurrences.get(lit, ())):
+            continue
+        kept.append(list(clause))
+        for lit in clause:
+            occurrences.setdefault(lit, []).append(clause)
+    return kept
+
+
+def simplify_model(root_feature, constraints=(), backbone=False):
+    """
+    Simplifies the CNF of a feature model before an expensive analysis.
+
+    Core and dead features are found from the backbone (only those that unit
+    propagation proves when `backbone` is False), equivalent variables are found from
+    the binary implication graph and substituted, and the clauses are
+    simplified until nothing changes.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints in propositional logic.
+        backbone (bool): Find every core and dead feature with SAT calls.
+
+    Returns:
+        SimplifiedModel: The reduced clauses and the mapping back to features.
+    """
+    cnf = encode_feature_model(root_feature, constraints)
+    simplified = SimplifiedModel(cnf)
+    solver = cnf.to_solver()
+
+    fixed = find_backbone(solver, cnf.feature_vars(), exact=backbone)
+    if fixed is None:
+        simplified.void = True
+        return simplified
+
+    # Substitution maps a literal to its representative and is kept closed under negation
+    substitution = {}
+    clauses = cnf.clauses
+    while True:
+        clauses = simplify_clauses(clauses, fixed, substitution)
+        if clauses is None:
+            simplified.void = True
+            return simplified
+        units = [clause[0] for clause in clauses if len(clause) == 1]
+        equivalent = strongly_connected_literals(clauses)
+        if not units and not equivalent:
+            break
+        for lit in units:
+            if fixed.get(abs(lit)) == (lit < 0):
+                simplified.void = True
+                return simplified
+            fixed[abs(lit)] = lit > 0
+        for lit, leader in equivalent.items():
+            if lit == -leader:
+                simplified.void = True
+                return simplified
+            if lit != leader:
+                substitution[lit] = leader
+        # Compose earlier substitutions with the new ones
+        for lit in list(substitution):
+            target = substitution[lit]
+            while target in substitution or -target in substitution:
+                target = substitution[target] if target in substitution else -substitution[-target]
+            substitution[lit] = target
+
+    def resolve(var):
+        lit = substitution.get(var, var)
+        value = fixed.get(abs(lit))
+        if value is not None:
+            return value == (lit > 0)
+        return lit
+
+    # Renumber the remaining variables compactly, features first
+    renumber = {}
+    for var in cnf.feature_vars() + [abs(lit) for clause in clauses for lit in clause]:
+        lit = resolve(var)
+        if not isinstance(lit, bool) and abs(lit) not in renumber:
+            renumber[abs(lit)] = len(renumber) + 1
+
+    def rename(lit):
+        return renumber[abs(lit)] if lit > 0 else -renumber[abs(lit)]
+
+    simplified.num_vars = len(renumber)
+    simplified.clauses = [[rename(lit) for lit in clause] for clause in clauses]
+    for var, name in cnf.names.items():
+        lit = resolve(var)
+        simplified.literals[var] = lit if isinstance(lit, bool) else rename(lit)
+        if not isinstance(lit, bool):
+            simplified.members.setdefault(renumber[abs(lit)], []).append((name, lit > 0))
+    return simplified
@@ -89,6 +89,8 @@
 
 from itertools import combinations
 
+from logic_translator import clause_features
+
 def calculate_mwp(logic_rules, mandatory_features):
     """
     Calculates the Minimum Working Products (MWPs) based on logic rules.
@@ -137,57 +139,17 @@ def extract_features_from_logic_rules(logic_rules):
     Extracts unique feature names from the logic rules.
     
     Args:
-        logic_rules (list): A list of logic rules derived from the feature model.
+        logic_rules (dict): The categorized LogicClause lists from translate_to_logic.
         
     Returns:
         set: A set of unique feature names.
     """
     features = set()
 
-    # for rule in logic_rules[rule1]:
-    #     print("Rule:", rule)
-    #     features.update(rule.split(" -> "))  # Split by space to extract features
-    #     print("Features:", features)
-    #     if rule1 == "root":
-    #         break
-    
-    for rule in logic_rules["root"]:
-        print("Rule:", rule)
-        features.update(rule.split(" -> "))  # Split by space to extract features
-        print("Features:", features)
-
-    for rule in logic_rules["mandatory"]:
-        print("Rule:", rule)
-        features.update(rule.split(" -> "))  # Split by space to extract features
-        print("Features:", features)
-
-    for rule in logic_rules["children_to_parent"]:
-        print("Rule:", rule)
-        features.update(rule.split(" -> "))  # Split by space to extract features
-        print("Features:", features)
-        if features == "->":
-            continue
-
-    for rule in logic_rules["xor"]:
-        print("Rule:", rule)
-        features.update(rule.split(" -> "))  # Split by space to extract features
-        print("Features:", features)
-        if features == "->":
-            continue
-
-    for rule in logic_rules["or"]:
-        print("Rule:", rule)
-        features.update(rule.split(" -> "))  # Split by space to extract features
-        print("Features:", features)
-        if features == "->":
-            continue
-        
-    for rule in logic_rules["constraints"]:
-        print("Rule:", rule)
-        features.update(rule.split(" -> "))  # Split by space to extract features
-        print("Features:", features)
-        if features == "->":
-            continue
+    # Structured clauses carry their feature names, only constraint strings need parsing
+    for category in ("root", "mandatory", "children_to_parent", "xor", "or", "card", "constraints"):
+        for rule in logic_rules[category]:
+            features.update(clause_features(rule))
     return {feature for feature in features if feature.isalnum()}  # Filter out logical operators
 
 def extract_features_from_logic_rules1(logic_rules):
@@ -195,56 +157,12 @@ def extract_features_from_logic_rules1(logic_rules):
     Extracts unique feature names from the logic rules.
     
     Args:
-        logic_rules (list): A list of logic rules derived from the feature model.
+        logic_rules (dict): The categorized LogicClause lists from translate_to_logic.
         
     Returns:
         set: A set of unique feature names.
     """
-    features = set()
-
-    # for rule in logic_rules[rule1]:
-    #     print("Rule:", rule)
-    #     features.update(rule.split(" -> "))  # Split by space to extract features
-    #     print("Features:", features)
-    
-    for rule in logic_rules["root"]:
-        # print("Rule:", rule)
-        features.update(rule.split(" -> "))  # Split by space to extract features
-        # print("Features:", features)
-
-    for rule in logic_rules["mandatory"]:
-        # print("Rule:", rule)
-        features.update(rule.split(" -> "))  # Split by space to extract features
-        # print("Features:", features)
-
-    for rule in logic_rules["children_to_parent"]:
-        # print("Rule:", rule)
-        features.update(rule.split(" -> "))  # Split by space to extract features
-        # print("Features:", features)
-        if features == "->":
-            continue
-
-    for rule in logic_rules["xor"]:
-        # print("Rule:", rule)
-        features.update(rule.split(" -> "))  # Split by space to extract features
-        # print("Features:", features)
-        if features == "->":
-            continue
-
-    for rule in logic_rules["or"]:
-        # print("Rule:", rule)
-        features.update(rule.split(" -> "))  # Split by space to extract features
-        # print("Features:", features)
-        if features == "->":
-            continue
-        
-    for rule in logic_rules["constraints"]:
-        # print("Rule:", rule)
-        features.update(rule.split(" -> "))  # Split by space to extract features
-        # print("Features:", features)
-        if features == "->":
-            continue
-    return {feature for feature in features if feature.isalnum()}  # Filter out logical operators
+    return extract_features_from_logic_rules(logic_rules)
 
 
 def is_valid_mwp(feature_set, logic_rules, mandatory_features, features):
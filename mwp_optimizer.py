@@ -0,0 +1,170 @@
+from fractions import Fraction
+
+from feature_attributes import AttributeTable, BatchEvaluator, split_constraints
+from model_simplifier import simplify_model
+
+
+def feature_costs(cnf, weighted=False):
+    """
+    Looks up the cost of every concrete feature.
+
+    Args:
+        cnf (FeatureCNF): The encoded feature model.
+        weighted (bool): Use the `cost` attribute from the XML (missing costs count as 0)
+                         instead of counting every feature as 1.
+
+    Returns:
+        dict: A mapping of variable to cost.
+
+    Raises:
+        ValueError: If a feature has a negative cost.
+    """
+    costs = {}
+    for feature in cnf.features:
+        cost = (feature.cost or 0.0) if weighted else 1
+        if cost < 0:
+            raise ValueError(f"Feature '{feature.name}' has a negative cost ({cost}).")
+        costs[cnf.variables[feature.name]] = cost
+    return costs
+
+
+def add_weights(a, b):
+    return (a[0] + b[0], a[1] + b[1])
+
+
+def subtract_weights(a, b):
+    return (a[0] - b[0], a[1] - b[1])
+
+
+def totalizer(solver, inputs):
+    """
+    Adds a totalizer that counts how many of the input literals are true.
+
+    Only the upward direction is encoded, which is all a minimization needs:
+    output j (from 0) is forced true when at least j + 1 inputs are true. The
+    inputs are merged pairwise level by level.
+
+    Args:
+        solver (Solver): The solver to add the clauses to.
+        inputs (list): The literals to count.
+
+    Returns:
+        list: The output literals, one per possible count.
+    """
+    layer = [[lit] for lit in inputs]
+    while len(layer) > 1:
+        merged = []
+        for left, right in zip(layer[::2], layer[1::2]):
+            outputs = [solver.new_var() for _ in range(len(left) + len(right))]
+            for i, a in enumerate(left):
+                solver.add_clause([-a, outputs[i]])
+                for j, b in enumerate(right):
+                    solver.add_clause([-a, -b, outputs[i + j + 1]])
+            for j, b in enumerate(right):
+                solver.add_clause([-b, outputs[j]])
+            merged.append(outputs)
+        if len(layer) % 2:
+            merged.append(layer[-1])
+        layer = merged
+    return layer[0]
+
+
+def find_minimum_products(root_feature, constraints=(), k=1, weighted=False, simplified=None):
+    """
+    Finds the k cheapest valid products of a feature model with a core-guided search.
+
+    The search runs on the simplified model (see model_simplifier), so core,
+    dead and equivalent features cost nothing. Every costly literal becomes a
+    soft assumption that it is deselected. While the assumptions cannot hold
+    together, the solver returns an unsatisfiable core: the cheapest weight in
+    it is certainly paid, so it is added to the lower bound, taken off the
+    assumptions of the core, and a totalizer over the core charges that weight
+    again for every further literal of the core that is selected (the OLL
+    algorithm). Once the assumptions are satisfiable the model is a cheapest
+    product. It is then blocked and the search goes on from the same state, so
+    the products come out cheapest first and the configuration space is never
+    enumerated.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints in propositional logic, including
+                            aggregates over feature attributes such as "sum(memory) <= 512".
+        k (int): The number of products to return.
+        weighted (bool): Minimize the total `cost` attribute instead of the number of features.
+                         Ties are broken by the number of features.
+        simplified (SimplifiedModel): The result of simplify_model, if already computed.
+
+    Returns:
+        list: Up to k (cost, product) tuples, cheapest first, where product is a
+              frozenset of feature names and cost is the total weight or feature count.
+    """
+    # Aggregate constraints have no clauses, products are checked against them when found
+    constraints, aggregate_constraints = split_constraints(constraints)
+    accepts = None
+    if aggregate_constraints:
+        accepts = BatchEvaluator(aggregate_constraints, AttributeTable(root_feature)).accepts
+    if simplified is None:
+        simplified = simplify_model(root_feature, constraints)
+    if simplified.void or k <= 0:
+        return []
+    cnf = simplified.cnf
+    solver = simplified.to_solver()
+    costs = feature_costs(cnf, weighted)
+
+    # Weights are (cost, feature count) pairs compared in that order, so the
+    # feature count breaks ties. Weighted costs are summed as exact fractions.
+    zero = (0, 0)
+    weights = {}  # Simplified literal -> weight of the features it selects
+    for var, cost in costs.items():
+        lit = simplified.literals[var]
+        if not isinstance(lit, bool):
+            weights[lit] = add_weights(weights.get(lit, zero), (Fraction(cost) if weighted else cost, 1))
+    softs = {}  # Assumption literal -> remaining weight, only while it is not 0
+    for lit, weight in weights.items():
+        if -lit in weights:
+            # A literal and its negation both cost, the cheaper side is always paid
+            weight = subtract_weights(weight, min(weight, weights[-lit]))
+        if weight > zero:
+            softs[-lit] = weight
+    counters = {}  # Assumption on a totalizer output -> (outputs, index, weight of the totalizer)
+    feature_vars = sorted(simplified.members)
+
+    def score(product):
+        vars_ = [cnf.variables[name] for name in product]
+        return (sum(costs[var] for var in vars_), len(vars_))
+
+    best = []
+    while len(best) < k:
+        if solver.solve(list(softs)):
+            model = solver.model
+            product = simplified.expand(model)
+            if accepts is None or accepts(product):
+                best.append((score(product)[0], product))
+            # Block the product, the next model is the cheapest of the others
+            solver.add_clause([-var if model[var] else var for var in feature_vars])
+            continue
+
+        core = solver.core
+        if not core:
+            break  # No product is left
+        weight = min(softs[lit] for lit in core)
+        for lit in core:
+            softs[lit] = subtract_weights(softs[lit], weight)
+            if softs[lit] == zero:
+                del softs[lit]
+            if lit in counters:
+                # The count of this totalizer exceeds its bound, the next one costs again
+                outputs, index, counter_weight = counters.pop(lit)
+                if index + 1 < len(outputs):
+                    next_lit = -outputs[index + 1]
+                    softs[next_lit] = add_weights(softs.get(next_lit, zero), counter_weight)
+                    counters[next_lit] = (outputs, index + 1, counter_weight)
+        if len(core) == 1:
+            solver.add_clause([-core[0]])
+            continue
+        # One literal of the core is selected, each further one costs the weight again
+        outputs = totalizer(solver, [-lit for lit in core])
+        softs[-outputs[1]] = weight
+        counters[-outputs[1]] = (outputs, 1, weight)
+
+    return best
@@ -0,0 +1,347 @@
+from collections import ChainMap
+from itertools import product as cartesian_product
+
+from boolean_expression import evaluate_expression, expression_aggregates, expression_variables, parse_expression
+from feature_model import group_bounds, group_kind
+
+
+def feature_slots(feature):
+    """
+    Splits the children of a feature into independent choices ("slots").
+
+    A slot is a (kind, members, bounds) tuple where kind is "mandatory" or
+    "optional" for a single child, or "xor"/"or"/"card" for the members of a
+    group, whose (min, max) selected members are in bounds (None for a single
+    child). Nodes created from <group> elements are transparent: their members
+    become a slot of the feature that owns the group.
+
+    Args:
+        feature (Feature): A concrete (non-group) feature.
+
+    Returns:
+        list: The slots of the feature.
+    """
+    slots = []
+    kind = group_kind(feature)
+    if kind is not None:
+        members = [child for child in feature.children if not child.is_group]
+        if members:
+            slots.append((kind, members, group_bounds(feature)))
+
+    pending = [child for child in reversed(feature.children)]
+    while pending:
+        child = pending.pop()
+        if child.is_group:
+            child_kind = group_kind(child)
+            if child_kind is None:
+                # An "and" group, its members are plain children
+                pending.extend(reversed(child.children))
+            else:
+                members = [member for member in child.children if not member.is_group]
+                if members:
+                    slots.append((child_kind, members, group_bounds(child)))
+        elif kind is None:
+            slots.append(("mandatory" if child.mandatory else "optional", [child], None))
+    return slots
+
+
+def selection_counts(members, high, sel, unsel):
+    """
+    Counts the configurations of every suffix of a group by number of selected members.
+
+    Args:
+        members (list): The features in the group.
+        high (int): The largest number of selected members that matters.
+        sel (dict): Configurations of each feature's subtree when it is selected.
+        unsel (dict): 1 if the feature may be deselected, 0 if something below it is forced.
+
+    Returns:
+        list: ways[i][j] is the number of configurations of members[i:] with
+              exactly j of them selected, for j up to `high`.
+    """
+    ways = [None] * len(members) + [[1]]
+    for i in range(len(members) - 1, -1, -1):
+        member = members[i]
+        rest = ways[i + 1]
+        row = [0] * min(len(rest) + 1, high + 1)
+        for j, count in enumerate(rest):
+            row[j] += count * unsel[member]
+            if j < high:
+                row[j + 1] += count * sel[member]
+        ways[i] = row
+    return ways
+
+
+def slot_count(kind, members, bounds, sel, unsel):
+    """
+    Counts the ways to configure one slot of a selected feature.
+
+    Args:
+        kind (str): The slot kind from feature_slots.
+        members (list): The features in the slot.
+        bounds (tuple): The (min, max) selected members of a group slot.
+        sel (dict): Configurations of each feature's subtree when it is selected.
+        unsel (dict): 1 if the feature may be deselected, 0 if something below it is forced.
+
+    Returns:
+        int: The number of configurations of the slot.
+    """
+    if kind == "mandatory":
+        return sel[members[0]]
+    if kind == "optional":
+        return sel[members[0]] + unsel[members[0]]
+    if kind == "xor":
+        forced = [member for member in members if not unsel[member]]
+        if not forced:
+            return sum(sel[member] for member in members)
+        return sel[forced[0]] if len(forced) == 1 else 0
+    if kind == "card":
+        low, high = bounds
+        return sum(selection_counts(members, high, sel, unsel)[0][low:])
+    total, empty = 1, 1
+    for member in members:
+        total *= sel[member] + unsel[member]
+        empty *= unsel[member]
+    return total - empty
+
+
+class ProductCounter:
+    """
+    Counts and enumerates the products of a feature model by dynamic programming
+    over the feature tree.
+
+    For a pure tree, the number of configurations of a selected feature is the
+    product of its slot counts: the child count for mandatory children, one more
+    for optional ones, the sum over members for XOR groups, the product of
+    (count + 1) minus the empty selection for OR groups, and a count by number
+    of selected members for cardinality groups. Cross-tree constraints
+    are handled by conditioning: every assignment of the features they mention
+    that satisfies them is counted separately with those features forced, so
+    the cost grows with 2^(constrained features), not with the model size.
+    """
+    def __init__(self, root_feature, constraints=(), max_conditioned=20):
+        self.root = root_feature
+        self.slots = {}
+        self.postorder = []
+        aliases = {}  # Feature or group name -> concrete feature name
+
+        stack = [(root_feature, False)]
+        while stack:
+            feature, visited = stack.pop()
+            if visited:
+                self.postorder.append(feature)
+                continue
+            self.slots[feature] = feature_slots(feature)
+            aliases[feature.name] = feature.name
+            stack.append((feature, True))
+            for kind, members, bounds in reversed(self.slots[feature]):
+                stack.extend((member, False) for member in reversed(members))
+            for child in feature.children:
+                if child.is_group:
+                    aliases[child.name] = feature.name
+
+        self.expressions = [parse_expression(text) for text in constraints]
+        if any(expression_aggregates(expression) for expression in self.expressions):
+            raise ValueError("The product counter does not support aggregate constraints over feature attributes.")
+        names = set()
+        for expression in self.expressions:
+            names.update(expression_variables(expression))
+        unknown = sorted(names - aliases.keys())
+        if unknown:
+            raise ValueError(f"Unknown feature '{unknown[0]}' in the constraints")
+        self.conditioned = sorted({aliases[name] for name in names})
+        self.spellings = {name: [] for name in self.conditioned}
+        for name in names:
+            self.spellings[aliases[name]].append(name)
+        if len(self.conditioned) > max_conditioned:
+            raise ValueError(
+                f"The constraints mention {len(self.conditioned)} features, more than the "
+                f"{max_conditioned} this counter conditions on.")
+
+        self.base_sel, self.base_unsel = self.tables({})
+        self.spine = self.spine_nodes()
+
+    def spine_nodes(self):
+        """
+        Returns the features, in post-order, that are conditioned or have a conditioned descendant.
+        """
+        conditioned = set(self.conditioned)
+        marked = set()
+        spine = []
+        for feature in self.postorder:
+            below = any(member in marked
+                        for kind, members, bounds in self.slots[feature] for member in members)
+            if below or feature.name in conditioned:
+                marked.add(feature)
+                spine.append(feature)
+        return spine
+
+    def tables(self, forced, nodes=None, sel=None, unsel=None):
+        """
+        Computes the sel/unsel counts bottom-up with some features forced.
+
+        Args:
+            forced (dict): Feature name -> True/False for the conditioned features.
+            nodes (list): The features to recompute, in post-order (default: all).
+            sel (dict): Existing counts to fall back on, for features not recomputed.
+            unsel (dict): Existing counts to fall back on, for features not recomputed.
+
+        Returns:
+            tuple: The sel and unsel mappings, keyed by feature.
+        """
+        # Recomputed values are layered over the existing ones instead of copying them
+        sel = ChainMap({}, sel) if sel is not None else {}
+        unsel = ChainMap({}, unsel) if unsel is not None else {}
+        for feature in (self.postorder if nodes is None else nodes):
+            slots = self.slots[feature]
+            state = forced.get(feature.name)
+            unsel[feature] = 0 if state is True else 1
+            for kind, members, bounds in slots:
+                for member in members:
+                    if not unsel[member]:
+                        unsel[feature] = 0
+            if state is False:
+                sel[feature] = 0
+                continue
+            count = 1
+            for kind, members, bounds in slots:
+                count *= slot_count(kind, members, bounds, sel, unsel)
+                if not count:
+                    break
+            sel[feature] = count
+        return sel, unsel
+
+    def assignments(self):
+        """
+        Yields the assignments of the conditioned features that satisfy every constraint.
+        """
+        for values in cartesian_product((False, True), repeat=len(self.conditioned)):
+            forced = dict(zip(self.conditioned, values))
+            selected = {spelling for name in self.conditioned if forced[name]
+                        for spelling in self.spellings[name]}
+            if all(evaluate_expression(expression, selected) for expression in self.expressions):
+                yield forced
+
+    def count(self):
+        """
+        Counts the valid products of the model.
+
+        Returns:
+            int: The number of products.
+        """
+        total = 0
+        for forced in self.assignments():
+            sel, unsel = self.tables(forced, self.spine, self.base_sel, self.base_unsel)
+            total += sel[self.root]
+        return total
+
+    def products(self, offset=0, limit=None):
+        """
+        Enumerates products lazily, in a fixed order.
+
+        Each product is decoded from its index in the counted space, so skipping
+        ahead with `offset` costs nothing per skipped product.
+
+        Args:
+            offset (int): The index of the first product to return.
+            limit (int): The maximum number of products, or None for all of them.
+
+        Yields:
+            frozenset: The names of the features in each product.
+        """
+        emitted = 0
+        for forced in self.assignments():
+            sel, unsel = self.tables(forced, self.spine, self.base_sel, self.base_unsel)
+            count = sel[self.root]
+            if offset >= count:
+                offset -= count
+                continue
+            for index in range(offset, count):
+                if limit is not None and emitted >= limit:
+                    return
+                yield self.unrank(index, sel, unsel)
+                emitted += 1
+            offset = 0
+
+    def unrank(self, index, sel, unsel):
+        """
+        Decodes one product from its index, using the counts of one assignment.
+        """
+        selected = []
+        stack = [(self.root, index)]
+        while stack:
+            feature, index = stack.pop()
+            selected.append(feature.name)
+            for kind, members, bounds in self.slots[feature]:
+                index, digit = divmod(index, slot_count(kind, members, bounds, sel, unsel))
+                if kind == "mandatory":
+                    stack.append((members[0], digit))
+                elif kind == "optional":
+                    member = members[0]
+                    if unsel[member]:
+                        if digit == 0:
+                            continue
+                        digit -= 1
+                    stack.append((member, digit))
+                elif kind == "xor":
+                    forced = [member for member in members if not unsel[member]]
+                    for member in (forced or members):
+                        if digit < sel[member]:
+                            stack.append((member, digit))
+                            break
+                        digit -= sel[member]
+                elif kind == "card":
+                    low, high = bounds
+                    ways = selection_counts(members, high, sel, unsel)
+                    chosen = 0
+                    for i, member in enumerate(members):
+                        rest = ways[i + 1]
+                        # Products that deselect this member come first, then those selecting it
+                        skip = unsel[member] * sum(rest[max(low - chosen, 0):high - chosen + 1])
+                        if digit < skip:
+                            continue
+                        digit -= skip
+                        member_digit, digit = divmod(digit, sum(rest[max(low - chosen - 1, 0):high - chosen]))
+                        stack.append((member, member_digit))
+                        chosen += 1
+                else:
+                    if all(unsel[member] for member in members):
+                        digit += 1  # Skip the empty selection
+                    for member in members:
+                        digit, member_digit = divmod(digit, sel[member] + unsel[member])
+                        if unsel[member]:
+                            if member_digit == 0:
+                                continue
+                            member_digit -= 1
+                        stack.append((member, member_digit))
+        return frozenset(selected)
+
+
+def count_products(root_feature, constraints=()):
+    """
+    Counts the valid products of a feature model without enumerating them.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints in propositional logic.
+
+    Returns:
+        int: The number of products.
+    """
+    return ProductCounter(root_feature, constraints).count()
+
+
+def enumerate_products(root_feature, constraints=(), offset=0, limit=None):
+    """
+    Lazily enumerates the valid products of a feature model.
+
+    Args:
+        root_feature (Feature): The root feature of the feature model.
+        constraints (list): Cross-tree constraints in propositional logic.
+        offset (int): The index of the first product to return.
+        limit (int): The maximum number of products, or None for all of them.
+
+    Yields:
+        frozenset: The names of the features in each product.
+    """
+    return ProductCounter(root_feature, constraints).products(offset, limit)
@@ -0,0 +1,366 @@
+import heapq
+
+
+class Solver:
+    """
+    A small CDCL SAT solver for the feature model analyses.
+
+    Variables are positive integers and literals are signed integers, as in
+    DIMACS. The solver is incremental: clauses can be added between calls and
+    every call to `solve` accepts assumption literals. After an unsatisfiable
+    call, `core` holds the subset of the assumptions that caused the conflict.
+    """
+    def __init__(self):
+        self.num_vars = 0
+        self.assigns = [None]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.watches = [[], []]
+        self.trail = []
+        self.trail_lim = []
+        self.queue_head = 0
+        self.order_heap = []
+        self.bump = 1.0
+        self.ok = True
+        self.model = None
+        self.core = None
+        self.conflicts = 0
+
+    # Variables and clauses
+
+    def new_var(self):
+        """
+        Creates a new variable.
+
+        Returns:
+            int: The index of the variable.
+        """
+        self.num_vars += 1
+        self.assigns.append(None)
+        self.level.append(0)
+        self.reason.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        self.watches.extend(([], []))
+        heapq.heappush(self.order_heap, (0.0, self.num_vars))
+        return self.num_vars
+
+    def ensure_vars(self, count):
+        """
+        Creates variables until at least `count` exist.
+        """
+        while self.num_vars < count:
+            self.new_var()
+
+    def add_clause(self, literals):
+        """
+        Adds a clause to the solver.
+
+        Args:
+            literals (list): The literals of the clause.
+
+        Returns:
+            bool: False if the clause made the formula unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        self.ensure_vars(max((abs(lit) for lit in literals), default=0))
+
+        clause = []
+        for lit in set(literals):
+            if -lit in clause or self.value(lit) is True:
+                return True  # Tautology or already satisfied
+            if self.value(lit) is None:
+                clause.append(lit)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+        return self.ok
+
+    def attach(self, clause):
+        self.watches[self.index(clause[0])].append(clause)
+        self.watches[self.index(clause[1])].append(clause)
+
+    # Assignment
+
+    @staticmethod
+    def index(lit):
+        return 2 * lit if lit > 0 else -2 * lit + 1
+
+    def value(self, lit):
+        """
+        Returns the current value of a literal: True, False or None if unassigned.
+        """
+        assigned = self.assigns[abs(lit)]
+        if assigned is None:
+            return None
+        return assigned if lit > 0 else not assigned
+
+    def decision_level(self):
+        return len(self.trail_lim)
+
+    def enqueue(self, lit, reason):
+        var = abs(lit)
+        self.assigns[var] = lit > 0
+        self.level[var] = self.decision_level()
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def backtrack(self, level):
+        """
+        Undoes all assignments above the given decision level.
+        """
+        if self.decision_level() <= level:
+            return
+        limit = self.trail_lim[level]
+        for lit in self.trail[limit:]:
+            var = abs(lit)
+            self.phase[var] = lit > 0
+            self.assigns[var] = None
+            self.reason[var] = None
+            heapq.heappush(self.order_heap, (-self.activity[var], var))
+        del self.trail[limit:]
+        del self.trail_lim[level:]
+        self.queue_head = min(self.queue_head, limit)
+
+    def propagate(self):
+        """
+        Runs unit propagation over the watched literals.
+
+        Returns:
+            list: The conflicting clause, or None if no conflict was found.
+        """
+        while self.queue_head < len(self.trail):
+            false_lit = -self.trail[self.queue_head]
+            self.queue_head += 1
+            watchers = self.watches[self.index(false_lit)]
+            i = j = 0
+            while i < len(watchers):
+                clause = watchers[i]
+                i += 1
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                if self.value(first) is True:
+                    watchers[j] = clause
+                    j += 1
+                    continue
+
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], false_lit
+                        self.watches[self.index(clause[1])].append(clause)
+                        break
+                else:
+                    watchers[j] = clause
+                    j += 1
+                    if self.value(first) is False:
+                        # Conflict, keep the remaining watchers and stop
+                        while i < len(watchers):
+                            watchers[j] = watchers[i]
+                            j += 1
+                            i += 1
+                        del watchers[j:]
+                        self.queue_head = len(self.trail)
+                        return clause
+                    self.enqueue(first, clause)
+            del watchers[j:]
+        return None
+
+    def propagate_assumptions(self, assumptions):
+        """
+        Assigns the assumptions and propagates them, without searching further.
+
+        The resulting partial assignment stays in place and can be read with
+        `value` until the next call that modifies the solver.
+
+        Args:
+            assumptions (list): The literals to assume.
+
+        Returns:
+            bool: False if propagation ran into a conflict.
+        """
+        self.backtrack(0)
+        if not self.ok:
+            return False
+        for lit in assumptions:
+            value = self.value(lit)
+            if value is False:
+                return False
+            if value is None:
+                self.trail_lim.append(len(self.trail))
+                self.enqueue(lit, None)
+                if self.propagate() is not None:
+                    return False
+        return True
+
+    # Conflict analysis
+
+    def bump_activity(self, var):
+        self.activity[var] += self.bump
+        if self.activity[var] > 1e100:
+            # Rescale all activities and rebuild the order heap
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.bump *= 1e-100
+            self.order_heap = [(-self.activity[v], v) for v in range(1, self.num_vars + 1)
+                               if self.assigns[v] is None]
+            heapq.heapify(self.order_heap)
+
+    def analyze(self, conflict):
+        """
+        Derives a first-UIP learnt clause from a conflict.
+
+        Returns:
+            tuple: The learnt clause (asserting literal first) and the level to backtrack to.
+        """
+        seen = set()
+        learnt = [None]
+        pending = 0
+        lit = None
+        index = len(self.trail) - 1
+        clause = conflict
+        current = self.decision_level()
+        while True:
+            for q in (clause if lit is None else clause[1:]):
+                var = abs(q)
+                if var not in seen and self.level[var] > 0:
+                    seen.add(var)
+                    self.bump_activity(var)
+                    if self.level[var] == current:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reason[abs(lit)]
+        learnt[0] = -lit
+
+        if len(learnt) == 1:
+            return learnt, 0
+        # Watch the literal from the highest remaining level second
+        best = max(range(1, len(learnt)), key=lambda i: self.level[abs(learnt[i])])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+    def analyze_final(self, lit):
+        """
+        Finds the assumptions responsible for `lit` being false.
+
+        Args:
+            lit (int): The assumption that could not be satisfied.
+
+        Returns:
+            list: The subset of the assumptions that implies the conflict.
+        """
+        core = [lit]
+        if self.decision_level() == 0:
+            return core
+        seen = {abs(lit)}
+        for assigned in reversed(self.trail[self.trail_lim[0]:]):
+            var = abs(assigned)
+            if var not in seen:
+                continue
+            if self.reason[var] is None:
+                if self.level[var] > 0:
+                    core.append(assigned)
+            else:
+                for q in self.reason[var][1:]:
+                    if self.level[abs(q)] > 0:
+                        seen.add(abs(q))
+        return core
+
+    # Search
+
+    def pick_branch_literal(self):
+        while self.order_heap:
+            activity, var = heapq.heappop(self.order_heap)
+            if self.assigns[var] is None:
+                return var if self.phase[var] else -var
+        return None
+
+    def solve(self, assumptions=(), max_conflicts=None):
+        """
+        Searches for a satisfying assignment under the given assumptions.
+
+        Args:
+            assumptions (list): Literals that must hold in the model.
+            max_conflicts (int): Optional conflict budget for this call.
+
+        Returns:
+            bool: True if satisfiable, False if not, None if the budget ran out.
+                  On True, `model` maps every variable to its value; on False,
+                  `core` lists the assumptions that cannot hold together.
+        """
+        self.model = None
+        self.core = None
+        self.backtrack(0)
+        if not self.ok:
+            self.core = []
+            return False
+
+        assumptions = list(assumptions)
+        conflicts = 0
+        restart_limit = 100
+        restart_conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                conflicts += 1
+                restart_conflicts += 1
+                self.conflicts += 1
+                if self.decision_level() == 0:
+                    self.ok = False
+                    self.core = []
+                    return False
+                learnt, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.attach(learnt)
+                    self.enqueue(learnt[0], learnt)
+                self.bump *= 1.05
+                continue
+
+            if max_conflicts is not None and conflicts >= max_conflicts:
+                self.backtrack(0)
+                return None
+            if restart_conflicts >= restart_limit:
+                restart_conflicts = 0
+                restart_limit = int(restart_limit * 1.5)
+                self.backtrack(0)
+                continue
+
+            if self.decision_level() < len(assumptions):
+                lit = assumptions[self.decision_level()]
+                value = self.value(lit)
+                if value is False:
+                    self.core = self.analyze_final(lit)
+                    self.backtrack(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if value is None:
+                    self.enqueue(lit, None)
+                continue
+
+            lit = self.pick_branch_literal()
+            if lit is None:
+                self.model = list(self.assigns)
+                self.backtrack(0)
+                return True
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(lit, None)
@@ -0,0 +1,108 @@
+"""
+Clients that translate English constraints into propositional logic for /translate.
+
+The backend only needs an object with translate(prompt) -> str. Which one it
+gets is decided by FM_TRANSLATION_CLIENT:
+
+- "gemini": Google Gemini through google.generativeai. The library is only
+  imported, configured and the model only built on the first translation, so
+  workers that never translate never pay for it.
+- "static": always answers FM_STATIC_TRANSLATION (default "A -> B"), for
+  tests and load tests that must not reach the network.
+- "disabled": refuses every translation, the backend answers 503.
+
+Without FM_TRANSLATION_CLIENT, Gemini is used when GEMINI_API_KEY is set and
+the client is disabled otherwise, so the server also starts offline.
+"""
+import os
+import threading
+
+TRANSLATION_CLIENTS = ("gemini", "static", "disabled")
+GEMINI_MODEL = "gemini-1.5-flash"
+
+
+class TranslationUnavailable(Exception):
+    """
+    Raised when no translation service is configured or it cannot be reached.
+    """
+
+
+class GeminiTranslationClient:
+    """
+    Translates with Google Gemini, set up on first use.
+    """
+    def __init__(self, api_key, model_name=GEMINI_MODEL):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.model = None
+        self.lock = threading.Lock()
+
+    def get_model(self):
+        # Request threads may race for the first translation, only one builds the model
+        with self.lock:
+            if self.model is None:
+                try:
+                    import google.generativeai as genai
+                except ImportError as e:
+                    raise TranslationUnavailable(f"google-generativeai is not installed: {e}")
+                genai.configure(api_key=self.api_key)
+                self.model = genai.GenerativeModel(self.model_name)
+            return self.model
+
+    def translate(self, prompt):
+        """
+        Sends the prompt to Gemini and returns the text of its answer.
+        """
+        response = self.get_model().generate_content(prompt)
+        print(response.prompt_feedback)
+        return response.text
+
+
+class StaticTranslationClient:
+    """
+    Answers every prompt with the same text, so the backend can run offline.
+    """
+    def __init__(self, text="A -> B"):
+        self.text = text
+
+    def translate(self, prompt):
+        return self.text
+
+
+class DisabledTranslationClient:
+    """
+    Refuses to translate, used when no translation service is configured.
+    """
+    def __init__(self, reason="No translation client is configured, set GEMINI_API_KEY to use Gemini."):
+        self.reason = reason
+
+    def translate(self, prompt):
+        raise TranslationUnavailable(self.reason)
+
+
+def create_translation_client(name=None):
+    """
+    Creates the translation client selected by the environment.
+
+    Args:
+        name (str): One of TRANSLATION_CLIENTS, FM_TRANSLATION_CLIENT if None.
+
+    Returns:
+        An object with a translate(prompt) method.
+
+    Raises:
+        ValueError: If the client name is unknown or Gemini has no API key.
+    """
+    name = (name or os.environ.get("FM_TRANSLATION_CLIENT", "")).lower()
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not name:
+        name = "gemini" if api_key else "disabled"
+    if name == "gemini":
+        if not api_key:
+            raise ValueError("The Gemini translation client needs GEMINI_API_KEY to be set.")
+        return GeminiTranslationClient(api_key)
+    if name == "static":
+        return StaticTranslationClient(os.environ.get("FM_STATIC_TRANSLATION", "A -> B"))
+    if name == "disabled":
+        return DisabledTranslationClient()
+    raise ValueError(f"Unknown translation client '{name}', expected one of {', '.join(TRANSLATION_CLIENTS)}")
@@ -0,0 +1,85 @@
+from collections import deque
+
+
+def feature_children(feature):
+    """
+    Returns the children of a Feature, the default for all traversals.
+    """
+    return feature.children
+
+
+def preorder(root, children=feature_children):
+    """
+    Yields the nodes of a tree in pre-order, using an explicit stack.
+
+    Args:
+        root: The root node.
+        children (callable): Returns the list of children of a node.
+
+    Yields:
+        The nodes, parents before their children and siblings left to right.
+    """
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(children(node)))
+
+
+def preorder_edges(root, children=feature_children, max_depth=None):
+    """
+    Yields the nodes of a tree in pre-order together with their parent and depth.
+
+    Args:
+        root: The root node.
+        children (callable): Returns the list of children of a node.
+        max_depth (int): Do not descend below this depth (the root has depth 0).
+
+    Yields:
+        tuple: (node, parent, depth), with parent None for the root.
+    """
+    stack = [(root, None, 0)]
+    while stack:
+        node, parent, depth = stack.pop()
+        yield node, parent, depth
+        if max_depth is None or depth < max_depth:
+            stack.extend((child, node, depth + 1) for child in reversed(children(node)))
+
+
+def postorder(root, children=feature_children):
+    """
+    Yields the nodes of a tree in post-order, using an explicit stack.
+
+    Args:
+        root: The root node.
+        children (callable): Returns the list of children of a node.
+
+    Yields:
+        The nodes, children before their parents and siblings left to right.
+    """
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            yield node
+            continue
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(children(node)))
+
+
+def level_order(root, children=feature_children):
+    """
+    Yields the nodes of a tree level by level.
+
+    Args:
+        root: The root node.
+        children (callable): Returns the list of children of a node.
+
+    Yields:
+        The nodes, ordered by depth and left to right within a level.
+    """
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        yield node
+        queue.extend(children(node))
@@ -0,0 +1,180 @@
+import json
+
+from traversal import preorder_edges
+
+# Columns of the flat encoding, one row per node in pre-order
+FLAT_FIELDS = ["id", "label", "groupType", "mandatory", "childCount", "parent", "cardinality"]
+
+CHUNK_SIZE = 16 * 1024
+
+
+def feature_to_dict(feature, depth=None):
+    """
+    Convert the Feature object to a dictionary for serialization.
+
+    Args:
+        feature (Feature): The feature to convert.
+        depth (int): How many levels of children to include, or None for the whole subtree.
+                     Nodes at the cut-off only carry their `childCount`.
+    """
+    nodes = {}
+    for node, parent, level in preorder_edges(feature, max_depth=depth):
+        nodes[node] = {
+            "id": node.node_id,
+            "label": node.name,
+            "value": node.name,
+            "groupType": node.group_type,
+            "mandatory": node.mandatory,
+            "childCount": len(node.children),
+            "cardinality": _cardinality(node)
+        }
+        if depth is None or level < depth:
+            nodes[node]["children"] = []
+        if parent is not None:
+            nodes[parent]["children"].append(nodes[node])
+    return nodes[feature]
+
+
+def _node_fields(node):
+    # Same keys and order as feature_to_dict, without the children
+    return (
+        f'"id": {json.dumps(node.node_id)}, "label": {json.dumps(node.name)}, '
+        f'"value": {json.dumps(node.name)}, "groupType": {json.dumps(node.group_type)}, '
+        f'"mandatory": {json.dumps(node.mandatory)}, "childCount": {len(node.children)}, '
+        f'"cardinality": {json.dumps(_cardinality(node))}'
+    )
+
+
+def _cardinality(node):
+    # [min, max] of a cardinality group or feature, max None if unbounded
+    return list(node.cardinality) if node.cardinality is not None else None
+
+
+def iter_nested_json(feature, depth=None):
+    """
+    Streams the JSON of feature_to_dict(feature, depth) without building the dictionaries.
+
+    Args:
+        feature (Feature): The root of the subtree to serialize.
+        depth (int): How many levels of children to include, or None for all.
+
+    Yields:
+        str: Pieces of the JSON document, in order.
+    """
+    # Each entry is either a node to open or the text closing a node
+    stack = [(feature, 0, True)]
+    try:
+        while stack:
+            node, level, first = stack.pop()
+            if isinstance(node, str):
+                yield node
+                continue
+            prefix = "" if first else ", "
+            if depth is not None and level >= depth:
+                yield f"{prefix}{{{_node_fields(node)}}}"
+                continue
+            yield f'{prefix}{{{_node_fields(node)}, "children": ['
+            stack.append(("]}", level, True))
+            for index in range(len(node.children) - 1, -1, -1):
+                stack.append((node.children[index], level + 1, index == 0))
+    except Exception:
+        # Close the nodes already opened, so the document stays well-formed
+        closing = "".join(node for node, _, _ in reversed(stack) if isinstance(node, str))
+        if closing:
+            yield closing
+        raise
+
+
+def iter_flat_json(feature, depth=None):
+    """
+    Streams a compact flat encoding of a subtree.
+
+    The nodes are listed in pre-order as rows of FLAT_FIELDS, where `parent`
+    is the row index of the node's parent (-1 for the subtree root). Nodes
+    whose children were cut off by `depth` report a childCount larger than the
+    number of rows pointing at them.
+
+    Args:
+        feature (Feature): The root of the subtree to serialize.
+        depth (int): How many levels of children to include, or None for all.
+
+    Yields:
+        str: Pieces of the JSON document, in order.
+    """
+    yield f'{{"fields": {json.dumps(FLAT_FIELDS)}, "nodes": ['
+    rows = {}
+    try:
+        for node, parent, level in preorder_edges(feature, max_depth=depth):
+            prefix = ", " if rows else ""
+            row = [node.node_id, node.name, node.group_type, node.mandatory, len(node.children),
+                   rows[parent] if parent is not None else -1, _cardinality(node)]
+            rows[node] = len(rows)
+            yield prefix + json.dumps(row)
+    except Exception:
+        # Close the rows already sent, so the document stays well-formed
+        yield "]}"
+        raise
+    yield "]}"
+
+
+def iter_chunks(pieces, chunk_size=CHUNK_SIZE):
+    """
+    Groups small JSON pieces into chunks of roughly `chunk_size` characters.
+    """
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_tree_response(fields, feature, depth=None, encoding="nested"):
+    """
+    Streams a JSON object made of some small fields plus the serialized tree.
+
+    The tree goes under "treeData" for the nested encoding and under
+    "flatTree" for the flat one. The arguments are checked before anything is
+    sent. The status of a streamed response is sent before the tree, so if
+    serializing fails halfway the tree is closed where it stopped (null if
+    nothing was sent) and the object ends with an "error" field.
+
+    Args:
+        fields (dict): Small JSON-serializable fields written before the tree.
+        feature (Feature): The root of the subtree to serialize.
+        depth (int): How many levels of children to include, or None for all.
+        encoding (str): "nested" (the feature_to_dict shape) or "flat".
+
+    Returns:
+        iterator: Chunks of the JSON document.
+
+    Raises:
+        ValueError: If the encoding is unknown or the depth is not a non-negative integer.
+    """
+    if encoding not in ("nested", "flat"):
+        raise ValueError(f"Unknown tree encoding '{encoding}'")
+    if depth is not None and (not isinstance(depth, int) or isinstance(depth, bool) or depth < 0):
+        raise ValueError(f"Invalid tree depth {depth!r}, expected a non-negative integer")
+
+    key, serializer = ("treeData", iter_nested_json) if encoding == "nested" else ("flatTree", iter_flat_json)
+
+    def pieces():
+        yield "{"
+        for name, value in fields.items():
+            yield f"{json.dumps(name)}: {json.dumps(value)}, "
+        yield f"{json.dumps(key)}: "
+        started = False
+        try:
+            for piece in serializer(feature, depth):
+                started = True
+                yield piece
+        except Exception as error:
+            yield ("" if started else "null") + f', "error": {json.dumps(f"{type(error).__name__}: {error}")}'
+        yield "}"
+
+    return iter_chunks(pieces())
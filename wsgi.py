@@ -0,0 +1,25 @@
+"""
+Production entry point for the feature model backend.
+
+Run it behind gunicorn instead of the Flask development server:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The worker and thread counts are read from the environment by gunicorn.conf.py
+(FM_WORKERS, FM_THREADS, FM_BIND, FM_TIMEOUT). Parsed models live in a
+per-process registry, so a model id handed out by one worker is unknown to the
+others; keep FM_WORKERS at 1 and scale with FM_THREADS when the checkbox viewer
+relies on diffs and lazy subtrees, or put a sticky load balancer in front of
+several workers. Clients that hit a worker without their model simply get the
+full tree (or a 404 from /subtree) and re-upload. The incremental validators
+behind /toggle-feature are per process as well; a client whose session is
+unknown gets a 404 and starts a new one from its whole selection.
+
+The translation client is chosen by FM_TRANSLATION_CLIENT (gemini, static or
+disabled, see translation_clients.py); by default Gemini is used when
+GEMINI_API_KEY is set and translation is disabled otherwise.
+"""
+from backend import create_app
+
+app = create_app()
+application = app
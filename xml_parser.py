@@ -1,9 +1,14 @@
 import xml.etree.ElementTree as ET
+from feature_attributes import element_attributes
 from feature_model import Feature
+from traversal import preorder_edges
 
 def parse_features(element, parent_path=""):
     """
-    Recursively parses features from an XML element and builds the feature hierarchy.
+    Parses features from an XML element and builds the feature hierarchy.
+
+    The XML tree is walked iteratively, so the depth of the model is not limited
+    by Python's recursion limit.
     
     Args:
         element (ET.Element): The current XML element.
@@ -12,51 +17,88 @@ def parse_features(element, parent_path=""):
     Returns:
         Feature: A Feature instance representing the parsed element.
     """
-    # feature_name = element.attrib.get("name", "Group")
-    feature_name = element.attrib.get("name")
-    mandatory = element.attrib.get("mandatory", "false").lower() == "true"
-    group_type = element.attrib.get("group", "").lower()
-
-    # Generate a unique path for this node
-    # unique_path = f"{parent_path}/{feature_name}" if parent_path else feature_name
-
-    # Create the current feature
-    # feature = Feature(name=unique_path, mandatory=mandatory, group_type=group_type)
-    feature = Feature(name=feature_name, mandatory=mandatory, group_type=group_type)
-
-
-
-    for child in element.findall("feature"):
-        child_feature = parse_features(child)
-        feature.add_child(child_feature)
-
-    for group in element.findall("group"):
-        group_type = group.attrib.get("type", "").lower()
-        group_feature = Feature(name=f"{feature_name}-Group-{group_type}", group_type=group_type)
-        for group_child in group.findall("feature"):
-            group_feature.add_child(parse_features(group_child))
-        feature.add_child(group_feature)
-    # # Process child features
-    # for index, child in enumerate(element, start=1):
-    #     if child.tag == "group":  # Handle groups explicitly
-    #         group_features = []
-    #         group_type = child.attrib.get("type", "and").lower()
+    def element_children(node):
+        # Child features come first, then one node per group
+        if node.tag == "group":
+            return node.findall("feature")
+        return node.findall("feature") + node.findall("group")
+
+    features = {}
+    for node, parent, depth in preorder_edges(element, element_children):
+        if node.tag == "group":
+            group_type = node.attrib.get("type", "").lower()
+            feature_name = parent.attrib.get("name")
+            cardinality = group_cardinality(node) if group_type == "card" else None
+            feature = Feature(name=f"{feature_name}-Group-{group_type}", group_type=group_type, is_group=True,
+                              cardinality=cardinality)
+        else:
+            # feature_name = element.attrib.get("name", "Group")
+            feature_name = node.attrib.get("name")
+            if feature_name is None:
+                owner = f" under '{features[parent].name}'" if parent is not None else ""
+                raise ValueError(f"<feature> element without a name{owner}")
+            mandatory = node.attrib.get("mandatory", "false").lower() == "true"
+            group_type = node.attrib.get("group", "").lower()
+            cost = node.attrib.get("cost")
+            cost = float(cost) if cost is not None else None
+            if group_type == "card" and element_children(node):
+                # The feature owns a cardinality group, its bounds are read like those of <group>
+                cardinality = group_cardinality(node)
+            else:
+                # A feature cardinality [m..n] with m >= 1 makes the feature mandatory
+                cardinality = parse_cardinality(node.attrib["card"], feature_name) if "card" in node.attrib else None
+                if cardinality is not None and cardinality[0] >= 1:
+                    mandatory = True
+            feature = Feature(name=feature_name, mandatory=mandatory, group_type=group_type, cost=cost,
+                              attributes=element_attributes(node), cardinality=cardinality)
+
+        features[node] = feature
+        if parent is not None:
+            features[parent].add_child(feature)
+
+    return features[element]
+
+
+
+def parse_cardinality(text, feature_name=None):
+    """
+    Parses a cardinality such as "2..4", "1..*" or "3".
 
-    #         # Parse all features within this group
-    #         for group_child in child.findall("feature"):
-    #             group_features.append(parse_features(group_child, parent_path=feature_name))
+    Args:
+        text (str): The cardinality from the XML.
+        feature_name (str): The feature it belongs to, if it is a feature cardinality.
+                            A feature must allow at least one instance.
 
-    #         # Add the group to the feature
-    #         group_feature = Feature(name=f"{feature_name}/Group ({group_type}-{index})", mandatory=False)
-    #         for gf in group_features:
-    #             group_feature.add_child(gf)
-    #         feature.add_child(group_feature)
-    #     elif child.tag == "feature":  # Standard feature processing
-    #         child_feature = parse_features(child, parent_path=feature_name)
-    #         feature.add_child(child_feature)
+    Returns:
+        tuple: (min, max), where max is None if unbounded.
 
-    return feature
+    Raises:
+        ValueError: If the text is not a valid cardinality.
+    """
+    low, separator, high = text.strip().partition("..")
+    try:
+        low = int(low)
+        high = int(low if not separator else high) if high.strip() != "*" else None
+    except ValueError:
+        raise ValueError(f"Invalid cardinality '{text}', expected a range like 2..4 or 1..*")
+    if low < 0 or (high is not None and high < low):
+        raise ValueError(f"Invalid cardinality '{text}', the bounds must satisfy 0 <= min <= max")
+    if feature_name is not None and high == 0:
+        raise ValueError(f"Feature '{feature_name}' has cardinality '{text}', which never allows it")
+    return (low, high)
+
+
+def group_cardinality(node):
+    """
+    Reads the bounds of a <group type="card"> element, or of a <feature group="card">
+    that owns its group, given as min/max attributes or card="m..n".
 
+    Returns:
+        tuple: (min, max), where max is None if unbounded.
+    """
+    if "card" in node.attrib:
+        return parse_cardinality(node.attrib["card"])
+    return parse_cardinality(f"{node.attrib.get('min', '0')}..{node.attrib.get('max', '*')}")
 
 
 # Create the feature model hierarchy
@@ -90,8 +132,32 @@ def load_and_parse_xml(file_path):
     """
     tree = ET.parse(file_path)
     root = tree.getroot()
-    # get the name of the tree root
+    return parse_feature_model_root(root)
+
+
+def load_and_parse_xml_string(xml_data):
+    """
+    Parses XML text and builds the feature model hierarchy, without going through a file.
+
+    Args:
+        xml_data (str): The XML document.
+
+    Returns:
+        tuple: The root XML element and the root feature of the feature model.
+    """
+    return parse_feature_model_root(ET.fromstring(xml_data))
+
+
+def parse_feature_model_root(root):
+    """
+    Builds the feature model hierarchy below a <featureModel> element.
 
+    Args:
+        root (ET.Element): The <featureModel> element.
+
+    Returns:
+        tuple: The root XML element and the root feature of the feature model.
+    """
     # Skip the <featureModel> element and process its first child (<feature>)
     feature_element = root.find('feature')
     if feature_element is None:
@@ -105,7 +171,7 @@ def load_and_parse_xml(file_path):
 
 def parse_features_with_relationships(element):
     """
-    Parses features and handles relationships like XOR and OR groups.
+    Parses features and handles relationships like XOR, OR and cardinality groups.
 
     Args:
         element (ET.Element): The current XML element.
@@ -115,7 +181,7 @@ def parse_features_with_relationships(element):
     """
     feature = parse_features(element)
 
-    # Handle group types (XOR, OR)
+    # Handle group types (XOR, OR, card)
     group_type = element.attrib.get("group", "").lower()
     if group_type == "xor":
         # Only one child can be selected
@@ -123,6 +189,9 @@ def parse_features_with_relationships(element):
     elif group_type == "or":
         # One or more children can be selected
         feature.group_type = "OR"
+    elif group_type == "card":
+        # Between min and max children, parse_features already read the bounds
+        feature.group_type = "card"
     else:
         feature.group_type = "None"  # Default to "None" if no group specified
 
@@ -229,13 +298,15 @@ def translate_constraint_to_logic(english_statement, default_translation):
         return user_input
 
 
-def parse_constraints(root, new_constraint=None):
+def parse_constraints(root, new_constraint=None, interactive=True):
     """
     Parses cross-tree constraints from the XML and handles new constraints entered by the user.
     
     Args:
         root (ET.Element): The root XML element.
         new_constraint (str): Optional new constraint entered by the user.
+        interactive (bool): Whether to ask the user to confirm English translations.
+                            When False (e.g. in the web backend) the defaults are used.
     
     Returns:
         list: A list of constraints in propositional logic format.
@@ -287,7 +358,8 @@ def parse_constraints(root, new_constraint=None):
         english_statement = constraint.find("englishStatement")
         if english_statement is not None and english_statement.text:
             text = english_statement.text.strip()
-            print(f"Parsed statement (English): {text}")
+            if interactive:
+                print(f"Parsed statement (English): {text}")
 
             if "requires" in text or "required" in text:
                 parts = text.split("requires" if "requires" in text else "required")
@@ -295,7 +367,9 @@ def parse_constraints(root, new_constraint=None):
                     feature_a = extract_feature_name(parts[0].strip())
                     feature_b = extract_feature_name(parts[1].strip())
                     default_translation = f"{feature_a} → {feature_b}"
-                    user_input = input(f"Use default translation '{default_translation}'? (Press Enter to accept, or provide your own logic): ").strip()
+                    user_input = ""
+                    if interactive:
+                        user_input = input(f"Use default translation '{default_translation}'? (Press Enter to accept, or provide your own logic): ").strip()
                     if not user_input:
                         constraints.append(default_translation)
                     else:
@@ -307,7 +381,9 @@ def parse_constraints(root, new_constraint=None):
                     feature_a = extract_feature_name(parts[0].strip())
                     feature_b = extract_feature_name(parts[1].strip())
                     default_translation = f"{feature_a} → !{feature_b}"
-                    user_input = input(f"Use default translation '{default_translation}'? (Press Enter to accept, or provide your own logic): ").strip()
+                    user_input = ""
+                    if interactive:
+                        user_input = input(f"Use default translation '{default_translation}'? (Press Enter to accept, or provide your own logic): ").strip()
                     if not user_input:
                         constraints.append(default_translation)
                     else: